@@ -33,8 +33,30 @@ Variables:
 \b
 {config.describe('OCRD_METS_CACHING')}
 \b
+{config.describe('OCRD_METS_JOURNAL')}
+\b
+{config.describe('OCRD_METS_INDEX')}
+\b
+{config.describe('OCRD_METS_BACKEND')}
+\b
 {config.describe('OCRD_MAX_PROCESSOR_CACHE')}
 \b
+{config.describe('OCRD_MAX_IMAGE_CACHE')}
+\b
+{config.describe('OCRD_WRITE_BEHIND')}
+\b
+{config.describe('OCRD_IMAGE_ENCODING')}
+\b
+{config.describe('OCRD_PROCESSOR_CHDIR')}
+\b
+{config.describe('OCRD_EXIF_IDENTIFY')}
+\b
+{config.describe('OCRD_EXIF_CACHE')}
+\b
+{config.describe('OCRD_MAX_PARALLEL_PAGES')}
+\b
+{config.describe('OCRD_MISSING_OUTPUT')}
+\b
 {config.describe('OCRD_NETWORK_SERVER_ADDR_PROCESSING')}
 \b
 {config.describe('OCRD_NETWORK_SERVER_ADDR_WORKFLOW')}
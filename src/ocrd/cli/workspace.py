@@ -23,6 +23,7 @@ from ocrd.mets_server import OcrdMetsServer
 from ocrd_utils import getLogger, initLogging, pushd_popd, EXT_TO_MIME, safe_filename, parse_json_string_or_file, partition_list, DEFAULT_METS_BASENAME
 from ocrd.decorators import mets_find_options
 from . import command_with_replaced_help
+from ocrd_models import OcrdMetsJournal, ReadOnlyOcrdMets
 from ocrd_models.constants import METS_PAGE_DIV_ATTRIBUTE
 
 
@@ -336,6 +337,7 @@ def workspace_cli_bulk_add(ctx, regex, mimetype, page_id, file_id, url, local_fi
             else:
                 file_paths += [Path(x) for x in expanded]
 
+    records = []
     for i, file_path in enumerate(file_paths):
         log.info("[%4d/%d] %s" % (i + 1, len(file_paths), file_path))
 
@@ -403,11 +405,14 @@ def workspace_cli_bulk_add(ctx, regex, mimetype, page_id, file_id, url, local_fi
                     destpath.write_bytes(srcpath.read_bytes())
 
         # Add to workspace (or not)
-        fileGrp = file_dict.pop('file_grp')
         if dry_run:
+            fileGrp = file_dict.pop('file_grp')
             log.info('workspace.add_file(%s)' % file_dict)
         else:
-            workspace.add_file(fileGrp, ignore=ignore, force=force, **file_dict)
+            records.append(file_dict)
+
+    if records:
+        workspace.add_files(records, ignore=ignore, force=force)
 
     # save changes to disk
     workspace.save_mets()
@@ -451,12 +456,19 @@ def workspace_find(ctx, file_grp, mimetype, page_id, file_id, output_field, incl
     output_field = [snake_to_camel.get(x, x) for x in output_field]
     modified_mets = False
     ret = list()
+    mets = None
+    if not (download or undo_download or ctx.mets_server_url or
+            OcrdMetsJournal(str(Path(ctx.directory, ctx.mets_basename))).exists):
+        # nothing to write back, so stream the METS instead of parsing the full tree
+        mets = ReadOnlyOcrdMets(filename=str(Path(ctx.directory, ctx.mets_basename)))
     workspace = Workspace(
         ctx.resolver,
         directory=ctx.directory,
+        mets=mets,
         mets_basename=ctx.mets_basename,
         mets_server_url=ctx.mets_server_url,
     )
+    to_download = []
     for f in workspace.find_files(
             file_id=file_id,
             file_grp=file_grp,
@@ -464,18 +476,24 @@ def workspace_find(ctx, file_grp, mimetype, page_id, file_id, output_field, incl
             page_id=page_id,
             include_fileGrp=include_fileGrp,
             exclude_fileGrp=exclude_fileGrp,
+            as_records=not (download or undo_download),
         ):
         ret_entry = [f.ID if field == 'pageId' else str(getattr(f, field)) or '' for field in output_field]
         if download and not f.local_filename:
-            workspace.download_file(f)
-            modified_mets = True
             if wait:
+                # throttled: one at a time
+                workspace.download_file(f)
                 time.sleep(wait)
+            else:
+                to_download.append(f)
+            modified_mets = True
         if undo_download and f.local_filename:
             ret_entry = [f'Removed local_filename {f.local_filename}']
             f.local_filename = None
             modified_mets = True
         ret.append(ret_entry)
+    if to_download:
+        workspace.download_files(to_download)
     if modified_mets:
         workspace.save_mets()
     if 'pageId' in output_field:
@@ -571,6 +589,7 @@ def prune_files(ctx, file_grp, mimetype, page_id, file_id):
             file_grp=file_grp,
             mimetype=mimetype,
             page_id=page_id,
+            as_records=True,
         ):
             try:
                 if not f.local_filename or not exists(f.local_filename):
@@ -616,11 +635,15 @@ def list_pages(ctx, output_field, output_format, chunk_number, chunk_index, page
     (If any ``FILTER`` starts with ``//``, then its remainder
      will be interpreted as a regular expression.)
     """
-    workspace = Workspace(ctx.resolver, directory=ctx.directory, mets_basename=ctx.mets_basename)
+    mets = None
+    if not OcrdMetsJournal(str(Path(ctx.directory, ctx.mets_basename))).exists:
+        # stream the METS instead of parsing the full tree (unless changes need to be replayed)
+        mets = ReadOnlyOcrdMets(filename=str(Path(ctx.directory, ctx.mets_basename)))
+    workspace = Workspace(ctx.resolver, directory=ctx.directory, mets_basename=ctx.mets_basename, mets=mets)
     find_kwargs = {}
     if page_id_range and 'ID' in output_field:
         find_kwargs['pageId'] = page_id_range
-    page_ids = sorted({x.pageId for x in workspace.mets.find_files(**find_kwargs) if x.pageId})
+    page_ids = sorted({x.pageId for x in workspace.mets.find_files(as_records=True, **find_kwargs) if x.pageId})
     ret = []
 
     if output_field == ['ID']:
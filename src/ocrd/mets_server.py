@@ -18,7 +18,7 @@ from pydantic import BaseModel, Field, ValidationError
 
 import uvicorn
 
-from ocrd_models import OcrdFile, ClientSideOcrdFile, OcrdAgent, ClientSideOcrdAgent
+from ocrd_models import OcrdFile, ClientSideOcrdFile, OcrdAgent, ClientSideOcrdAgent, OcrdFileRecord
 from ocrd_utils import getLogger, deprecated_alias
 
 #
@@ -54,7 +54,7 @@ class OcrdFileListModel(BaseModel):
     files : List[OcrdFileModel] = Field()
 
     @staticmethod
-    def create(files : List[OcrdFile]):
+    def create(files : List[Union[OcrdFile, OcrdFileRecord]]):
         ret = OcrdFileListModel(
             files=[OcrdFileModel.create(
                 file_grp=f.fileGrp,
@@ -94,7 +94,8 @@ class ClientSideOcrdMets():
     :py:meth:`ocrd_models.ocrd_mets.OcrdMets.find_all_files`, and
     :py:meth:`ocrd_models.ocrd_mets.OcrdMets.add_agent`,
     :py:meth:`ocrd_models.ocrd_mets.OcrdMets.agents`,
-    :py:meth:`ocrd_models.ocrd_mets.OcrdMets.add_file` to query via HTTP a
+    :py:meth:`ocrd_models.ocrd_mets.OcrdMets.add_file`,
+    :py:meth:`ocrd_models.ocrd_mets.OcrdMets.add_files` to query via HTTP a
     :py:class:`ocrd.mets_server.OcrdMetsServer`.
     """
 
@@ -120,11 +121,20 @@ class ClientSideOcrdMets():
     def reload(self):
         return self.session.request('POST', f'{self.url}/reload').text
 
+    @property
+    def generation(self) -> int:
+        """
+        Number of changes to the METS on the server so far (see :py:attr:`ocrd_models.ocrd_mets.OcrdMets.generation`)
+        """
+        return int(self.session.request('GET', f'{self.url}/generation').text)
+
     @deprecated_alias(ID="file_id")
     @deprecated_alias(pageId="page_id")
     @deprecated_alias(fileGrp="file_grp")
     def find_files(self, **kwargs):
         self.log.debug('find_files(%s)', kwargs)
+        # results are always lightweight ClientSideOcrdFile
+        kwargs.pop('as_records', None)
         if 'pageId' in kwargs:
             kwargs['page_id'] = kwargs.pop('pageId')
         if 'ID' in kwargs:
@@ -177,6 +187,26 @@ class ClientSideOcrdMets():
                 local_filename=local_filename)
 
 
+    def add_files(self, records, force=False, ignore=False):
+        records = [r._asdict() if isinstance(r, OcrdFileRecord) else r for r in records]
+        data = OcrdFileListModel(files=[OcrdFileModel(
+            file_grp=r['fileGrp'],
+            file_id=r['ID'],
+            page_id=r.get('pageId'),
+            mimetype=r.get('mimetype'),
+            url=r.get('url') or None,
+            local_filename=str(r['local_filename']) if r.get('local_filename') else None) for r in records])
+        r = self.session.request('POST', f'{self.url}/files', json=data.dict(), params={'force': force, 'ignore': ignore})
+        r.raise_for_status()
+        return [ClientSideOcrdFile(
+                None,
+                ID=f.file_id,
+                fileGrp=f.file_grp,
+                url=f.url,
+                pageId=f.page_id,
+                mimetype=f.mimetype,
+                local_filename=f.local_filename) for f in data.files]
+
     def save(self):
         self.session.request('PUT', self.url)
 
@@ -229,8 +259,14 @@ class OcrdMetsServer():
         async def exception_handler_invalid_regex(request: Request, exc: re.error):
             return JSONResponse(status_code=400, content=f'invalid regex: {exc}')
 
+        # Queries are answered from an immutable snapshot of the METS in the threadpool of the server,
+        # so they can proceed concurrently with each other and with changes (on the event loop).
+        # (Without caching, snapshots cannot be updated incrementally, so the METS is locked instead.)
+        # The generation of the snapshot is sent as ETag to validate results cached by clients.
+
         @app.get("/file", response_model=OcrdFileListModel)
-        async def find_files(
+        def find_files(
+            response : Response,
             file_grp : Optional[str] = None,
             file_id : Optional[str] = None,
             page_id : Optional[str] = None,
@@ -241,7 +277,9 @@ class OcrdMetsServer():
             """
             Find files in the mets
             """
-            found = workspace.mets.find_all_files(fileGrp=file_grp, ID=file_id, pageId=page_id, mimetype=mimetype, local_filename=local_filename, url=url)
+            with workspace.mets.reading() as mets:
+                found = mets.find_all_files(fileGrp=file_grp, ID=file_id, pageId=page_id, mimetype=mimetype, local_filename=local_filename, url=url, as_records=True)
+                response.headers['ETag'] = f'"{mets.generation}"'
             return OcrdFileListModel.create(found)
 
         @app.put('/')
@@ -267,9 +305,19 @@ class OcrdMetsServer():
             workspace.add_file(**kwargs)
             return file_resource
 
+        @app.post('/files', response_model=OcrdFileListModel)
+        async def add_files(files : OcrdFileListModel, force : bool = False, ignore : bool = False):
+            """
+            Add many files at once
+            """
+            workspace.add_files([f.dict() for f in files.files], force=force, ignore=ignore)
+            return files
+
         @app.get('/file_groups', response_model=OcrdFileGroupListModel)
-        async def file_groups():
-            return {'file_groups': workspace.mets.file_groups}
+        def file_groups(response : Response):
+            with workspace.mets.reading() as mets:
+                response.headers['ETag'] = f'"{mets.generation}"'
+                return {'file_groups': mets.file_groups}
 
         @app.post('/agent', response_model=OcrdAgentModel)
         async def add_agent(agent : OcrdAgentModel):
@@ -279,12 +327,18 @@ class OcrdMetsServer():
             return agent
 
         @app.get('/agent', response_model=OcrdAgentListModel)
-        async def agents():
-            return OcrdAgentListModel.create(workspace.mets.agents)
+        def agents():
+            with workspace.mets.reading() as mets:
+                return OcrdAgentListModel.create(mets.agents)
 
         @app.get('/unique_identifier', response_model=str)
-        async def unique_identifier():
-            return Response(content=workspace.mets.unique_identifier, media_type='text/plain')
+        def unique_identifier():
+            with workspace.mets.reading() as mets:
+                return Response(content=mets.unique_identifier, media_type='text/plain')
+
+        @app.get('/generation', response_model=str)
+        def generation():
+            return Response(content=str(workspace.mets.generation), media_type='text/plain')
 
         @app.get('/workspace_path', response_model=str)
         async def workspace_path():
@@ -301,7 +355,7 @@ class OcrdMetsServer():
             Stop the server
             """
             getLogger('ocrd.models.ocrd_mets').info(f'Shutting down METS Server {self.url}')
-            workspace.save_mets()
+            workspace.save_mets(compact=True)
             self.shutdown()
 
         # ------------- #
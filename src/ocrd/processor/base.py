@@ -18,6 +18,7 @@ from pathlib import Path
 import sys
 import tarfile
 import io
+from typing import List, Optional
 from ocrd.workspace import Workspace
 
 from ocrd_utils import (
@@ -31,12 +32,15 @@ from ocrd_utils import (
     list_all_resources,
     get_processor_resource_types,
     resource_filename,
+    config,
 )
 from ocrd_validators import ParameterValidator
+from ocrd_models import OcrdFile
 from ocrd_models.ocrd_page import MetadataItemType, LabelType, LabelsType
 
 # XXX imports must remain for backwards-compatibility
 from .helpers import run_cli, run_processor, generate_processor_help # pylint: disable=unused-import
+from .helpers import process_pages
 
 class Processor():
     """
@@ -140,7 +144,8 @@ class Processor():
         # FIXME HACK would be better to use pushd_popd(self.workspace.directory)
         # but there is no way to do that in process here since it's an
         # overridden method. chdir is almost always an anti-pattern.
-        if self.workspace:
+        # (Processors should use self.workspace.resolve_path instead, see OCRD_PROCESSOR_CHDIR.)
+        if self.workspace and config.OCRD_PROCESSOR_CHDIR:
             self.old_pwd = getcwd()
             os.chdir(self.workspace.directory)
         self.input_file_grp = input_file_grp
@@ -172,10 +177,25 @@ class Processor():
         for the given :py:attr:`page_id`
         under the given :py:attr:`parameter`.
         
-        (This contains the main functionality and needs to be overridden by subclasses.)
+        (This contains the main functionality and needs to be overridden by subclasses,
+        unless they implement :py:meth:`process_page` instead, which is then run for
+        each page, see :py:func:`~ocrd.processor.helpers.process_pages`.)
         """
-        raise Exception("Must be implemented")
+        if type(self).process_page is Processor.process_page:
+            raise Exception("Must be implemented")
+        process_pages(self)
+
+    def process_page(self, input_files : List[Optional[OcrdFile]], page_id : str) -> None:
+        """
+        Process the physical page :py:attr:`page_id` from its :py:attr:`input_files`
+        (one per :py:attr:`input_file_grp`, or ``None`` if missing, cf. :py:meth:`zip_input_files`)
+        into the :py:attr:`output_file_grp` of :py:attr:`workspace`.
 
+        (Override this instead of :py:meth:`process` to have pages processed in parallel
+        with ``OCRD_MAX_PARALLEL_PAGES``. Then this may run in a separate process per page,
+        so it must not depend on changes made while processing other pages.)
+        """
+        raise Exception("Must be implemented")
 
     def add_metadata(self, pcgts):
         """
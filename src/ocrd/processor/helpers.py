@@ -1,7 +1,10 @@
 """
 Helper methods for running and documenting processors
 """
-from os import chdir, getcwd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from multiprocessing import get_context
+from os import chdir, cpu_count, getcwd
 from time import perf_counter, process_time
 from functools import lru_cache
 import json
@@ -10,12 +13,16 @@ from subprocess import run
 from typing import List
 
 from click import wrap_text
+from ocrd.mets_server import ClientSideOcrdMets
 from ocrd.workspace import Workspace
+from ocrd.workspace_writer import WorkspaceWriter
+from ocrd_models import OcrdMets
 from ocrd_utils import freeze_args, getLogger, config, setOverrideLogLevel, getLevelName, sparkline
 
 
 __all__ = [
     'generate_processor_help',
+    'process_pages',
     'run_cli',
     'run_processor'
 ]
@@ -30,6 +37,105 @@ def _get_workspace(workspace=None, resolver=None, mets_url=None, working_dir=Non
         workspace = resolver.workspace_from_url(mets_url, dst_dir=working_dir, mets_server_url=mets_server_url)
     return workspace
 
+# processor and (input files, page ID) of each page for the forked workers of process_pages
+_page_processor = None
+_page_tasks : List = []
+
+def _page_worker_init():
+    workspace = _page_processor.workspace
+    if workspace.writer is not None:
+        # threads of the parent process do not exist in the forked worker
+        workspace.writer = WorkspaceWriter(workspace.writer.max_workers)
+    if isinstance(workspace.mets, OcrdMets):
+        workspace.mets.start_journal()
+
+def _page_worker(index):
+    input_files, page_id = _page_tasks[index]
+    workspace = _page_processor.workspace
+    journaled = isinstance(workspace.mets, OcrdMets)
+    if journaled:
+        # forget changes of any previous page which failed
+        workspace.mets.pop_journal()
+    _page_processor.process_page(list(input_files), page_id)
+    if workspace.writer is not None:
+        workspace.writer.wait()
+    return workspace.mets.pop_journal() if journaled else []
+
+def process_pages(processor, max_workers=None):
+    """
+    Run :py:meth:`~ocrd.processor.base.Processor.process_page` of :py:attr:`processor` for each
+    page of :py:meth:`~ocrd.processor.base.Processor.zip_input_files`, processing up to
+    :py:attr:`max_workers` pages in parallel in forked worker processes (by default
+    ``OCRD_MAX_PARALLEL_PAGES``, ``0`` for one per CPU).
+
+    Workers do not change the METS of this process: each page's changes are recorded in the
+    worker (cf. :py:meth:`ocrd_models.ocrd_mets.OcrdMets.pop_journal`) and replayed here in
+    page order, so the METS has a single writer. (With a METS server, the workers send their
+    changes to the server, which serializes them.) Other METS implementations are processed
+    sequentially.
+
+    If a page fails, ``OCRD_MISSING_OUTPUT`` decides: ``ABORT`` (the default) stops processing
+    and raises the error, ``SKIP`` logs it and continues with the other pages. Either way, the
+    failed page's changes to the METS are discarded (in sequential mode by reverting them, cf.
+    :py:meth:`ocrd_models.ocrd_mets.OcrdMets.savepoint`), except for changes sent to a METS
+    server and changes to other METS implementations.
+    """
+    global _page_processor, _page_tasks # pylint: disable=global-statement
+    log = getLogger('ocrd.processor.helpers.process_pages')
+    if max_workers is None:
+        max_workers = config.OCRD_MAX_PARALLEL_PAGES
+    if max_workers <= 0:
+        max_workers = cpu_count()
+    workspace = processor.workspace
+    tasks = [(input_files, next(f.pageId for f in input_files if f))
+             for input_files in processor.zip_input_files()]
+    if max_workers > 1 and type(workspace.mets) not in (OcrdMets, ClientSideOcrdMets):
+        log.warning("Cannot process pages of %s in parallel, processing them sequentially", type(workspace.mets).__name__)
+        max_workers = 1
+    max_workers = min(max_workers, len(tasks))
+    failed = []
+
+    def page_failed(page_id, err):
+        if config.OCRD_MISSING_OUTPUT == 'ABORT':
+            raise err
+        log.error("Failed to process page '%s': %s", page_id, err, exc_info=err)
+        failed.append(page_id)
+
+    if max_workers <= 1:
+        savepoint = workspace.mets.savepoint if type(workspace.mets) is OcrdMets else nullcontext
+        for input_files, page_id in tasks:
+            try:
+                with savepoint():
+                    processor.process_page(list(input_files), page_id)
+            except Exception as err: # pylint: disable=broad-except
+                page_failed(page_id, err)
+    else:
+        log.info("Processing %d pages with %d processes", len(tasks), max_workers)
+        if workspace.writer is not None:
+            # input files of the workers must be written
+            workspace.writer.wait()
+        _page_processor, _page_tasks = processor, tasks
+        try:
+            with ProcessPoolExecutor(max_workers, mp_context=get_context('fork'),
+                                     initializer=_page_worker_init) as executor:
+                futures = [executor.submit(_page_worker, index) for index in range(len(tasks))]
+                try:
+                    for (_, page_id), future in zip(tasks, futures):
+                        try:
+                            entries = future.result()
+                        except Exception as err: # pylint: disable=broad-except
+                            page_failed(page_id, err)
+                            continue
+                        if entries:
+                            workspace.mets.replay_journal(entries)
+                finally:
+                    for future in futures:
+                        future.cancel()
+        finally:
+            _page_processor, _page_tasks = None, []
+    if failed:
+        log.error("Failed to process %d of %d pages: %s", len(failed), len(tasks), ', '.join(failed))
+
 def run_processor(
         processorClass,
         mets_url=None,
@@ -94,7 +200,10 @@ def run_processor(
         instance_caching=instance_caching
     )
     processor.workspace = workspace
-    chdir(processor.workspace.directory)
+    chdir_workspace = config.OCRD_PROCESSOR_CHDIR
+    if chdir_workspace:
+        # compatibility for processors which open files relative to the workspace
+        chdir(processor.workspace.directory)
 
     ocrd_tool = processor.ocrd_tool
     name = '%s v%s' % (ocrd_tool['executable'], processor.version)
@@ -119,7 +228,8 @@ def run_processor(
             log.exception("Failure in processor '%s'" % ocrd_tool['executable'])
             raise err
         finally:
-            chdir(old_cwd)
+            if chdir_workspace:
+                chdir(old_cwd)
         mem_usage_values = [mem for mem, _ in mem_usage]
         mem_output = 'memory consumption: '
         mem_output += sparkline(mem_usage_values)
@@ -132,7 +242,8 @@ def run_processor(
             log.exception("Failure in processor '%s'" % ocrd_tool['executable'])
             raise err
         finally:
-            chdir(old_cwd)
+            if chdir_workspace:
+                chdir(old_cwd)
 
     t1_wall = perf_counter() - t0_wall
     t1_cpu = process_time() - t0_cpu
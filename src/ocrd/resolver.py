@@ -26,7 +26,50 @@ class Resolver():
     Handle uploads, downloads, repository access, and manage temporary directories
     """
 
-    def download_to_directory(self, directory, url, basename=None, if_exists='skip', subdir=None, retries=None, timeout=None):
+    def download_session(self, retries=None, pool_maxsize=10):
+        """
+        Create a ``requests.Session`` for downloads, which can be shared between threads.
+
+        Keyword Args:
+            retries (int, None): Number of retries for each request on transient failures
+                (by default ``OCRD_DOWNLOAD_RETRIES``)
+            pool_maxsize (int): Number of connections to keep open for each host
+
+        Returns:
+            a new ``requests.Session``
+        """
+        if not retries and config.is_set('OCRD_DOWNLOAD_RETRIES'):
+            retries = config.OCRD_DOWNLOAD_RETRIES
+        session = requests.Session()
+        retries = Retry(total=retries or 0,
+                        status_forcelist=[
+                            # probably too wide (only transient failures):
+                            408, # Request Timeout
+                            409, # Conflict
+                            412, # Precondition Failed
+                            417, # Expectation Failed
+                            423, # Locked
+                            424, # Fail
+                            425, # Too Early
+                            426, # Upgrade Required
+                            428, # Precondition Required
+                            429, # Too Many Requests
+                            440, # Login Timeout
+                            500, # Internal Server Error
+                            503, # Service Unavailable
+                            504, # Gateway Timeout
+                            509, # Bandwidth Limit Exceeded
+                            529, # Site Overloaded
+                            598, # Proxy Read Timeout
+                            599, # Proxy Connect Timeout
+                ])
+        adapter = HTTPAdapter(max_retries=retries, pool_maxsize=pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def download_to_directory(self, directory, url, basename=None, if_exists='skip', subdir=None, retries=None, timeout=None,
+                              session=None):
         """
         Download a URL ``url`` to a local file in ``directory``.
 
@@ -53,6 +96,8 @@ class Resolver():
             subdir (string, None): Subdirectory to create within the directory. Think ``mets:fileGrp[@USE]``.
             retries (int, None): Number of retries to attempt on network failure.
             timeout (tuple, None): Timeout in seconds for establishing a connection and reading next chunk of data.
+            session (requests.Session, None): Session to download with (see :py:meth:`download_session`),
+                by default a new one with ``retries``.
 
         Returns:
             Local filename string, *relative* to directory
@@ -113,37 +158,13 @@ class Resolver():
         else:
             # src_path not set, it's an http URL, try to download
             log.debug("Downloading URL '%s' to '%s'", url, dst_path)
-            if not retries and config.is_set('OCRD_DOWNLOAD_RETRIES'):
-                retries = config.OCRD_DOWNLOAD_RETRIES
             if timeout is None and config.is_set('OCRD_DOWNLOAD_TIMEOUT'):
                 timeout = config.OCRD_DOWNLOAD_TIMEOUT
-            session = requests.Session()
-            retries = Retry(total=retries or 0,
-                            status_forcelist=[
-                                # probably too wide (only transient failures):
-                                408, # Request Timeout
-                                409, # Conflict
-                                412, # Precondition Failed
-                                417, # Expectation Failed
-                                423, # Locked
-                                424, # Fail
-                                425, # Too Early
-                                426, # Upgrade Required
-                                428, # Precondition Required
-                                429, # Too Many Requests
-                                440, # Login Timeout
-                                500, # Internal Server Error
-                                503, # Service Unavailable
-                                504, # Gateway Timeout
-                                509, # Bandwidth Limit Exceeded
-                                529, # Site Overloaded
-                                598, # Proxy Read Timeout
-                                599, # Proxy Connect Timeout
-                    ])
-            adapter = HTTPAdapter(max_retries=retries)
-            session.mount('http://', adapter)
-            session.mount('https://', adapter)
-            response = session.get(url, timeout=timeout)
+            if session is None:
+                with self.download_session(retries=retries) as session:
+                    response = session.get(url, timeout=timeout)
+            else:
+                response = session.get(url, timeout=timeout)
             response.raise_for_status()
             contents = handle_oai_response(response)
             dst_path.write_bytes(contents)
@@ -220,8 +241,7 @@ class Resolver():
         workspace = Workspace(self, dst_dir, mets_basename=mets_basename, baseurl=src_baseurl, mets_server_url=mets_server_url)
 
         if download:
-            for f in workspace.mets.find_files(**kwargs):
-                workspace.download_file(f)
+            workspace.download_files(workspace.mets.find_files(**kwargs))
 
         return workspace
 
@@ -1,22 +1,34 @@
 import io
-from os import makedirs, unlink, listdir, path
+from os import cpu_count, makedirs, unlink, listdir, path, rmdir, stat
 from pathlib import Path
-from shutil import move, copyfileobj
+from shutil import move, copyfile
 from re import sub
+from fnmatch import fnmatchcase
 from tempfile import NamedTemporaryFile
-from contextlib import contextmanager
-from typing import Optional, Union
-
-from cv2 import COLOR_GRAY2BGR, COLOR_RGB2BGR, cvtColor
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Union
+
+from cv2 import (
+    COLOR_GRAY2BGR,
+    COLOR_RGB2BGR,
+    COLOR_RGBA2BGRA,
+    IMWRITE_JPEG_QUALITY,
+    IMWRITE_PNG_COMPRESSION,
+    IMWRITE_PXM_BINARY,
+    IMWRITE_TIFF_COMPRESSION,
+    cvtColor,
+    imencode
+)
 from PIL import Image
 import numpy as np
 from deprecated.sphinx import deprecated
 import requests
 
-from ocrd_models import OcrdMets, OcrdFile
+from ocrd_models import OcrdMets, OcrdFile, OcrdMetsIndex, OcrdMetsJournal, SqliteOcrdMets
 from ocrd_models.ocrd_file import ClientSideOcrdFile
 from ocrd_models.ocrd_page import parse, BorderType, to_xml
-from ocrd_modelfactory import exif_from_filename, page_from_file
+from ocrd_modelfactory import probe_image
 from ocrd_utils import (
     atomic_write,
     getLogger,
@@ -34,17 +46,22 @@ from ocrd_utils import (
     bbox_from_polygon,
     polygon_from_points,
     xywh_from_bbox,
-    pushd_popd,
+    get_local_filename,
     is_local_filename,
     deprecated_alias,
     DEFAULT_METS_BASENAME,
+    IMAGE_ENCODING_PROFILES,
     MIME_TO_EXT,
     MIME_TO_PIL,
     MIMETYPE_PAGE,
-    REGEX_PREFIX
+    REGEX_PREFIX,
+    config
 )
 
 from .workspace_backup import WorkspaceBackupManager
+from .workspace_exif_cache import WorkspaceExifCache
+from .workspace_image_cache import WorkspaceImageCache, shared_image
+from .workspace_writer import WorkspaceWriter
 from .mets_server import ClientSideOcrdMets
 
 __all__ = ['Workspace']
@@ -88,6 +105,7 @@ class Workspace():
         self.mets_target = str(Path(directory, mets_basename))
         self.overwrite_mode = False
         self.is_remote = bool(mets_server_url)
+        self.mets_journal = OcrdMetsJournal(self.mets_target)
         if mets is None:
             if self.is_remote:
                 mets = ClientSideOcrdMets(mets_server_url)
@@ -95,7 +113,7 @@ class Workspace():
                     raise ValueError(f"METS server {mets_server_url} workspace directory {mets.workspace_path} differs "
                             f"from local workspace directory {self.directory}. These are not the same workspaces.")
             else:
-                mets = OcrdMets(filename=self.mets_target)
+                mets = self._load_mets()
         self.mets = mets
         if automatic_backup:
             self.automatic_backup = WorkspaceBackupManager(self)
@@ -103,6 +121,10 @@ class Workspace():
         else:
             self.automatic_backup = None
         self.baseurl = baseurl
+        self.image_cache = WorkspaceImageCache(config.OCRD_MAX_IMAGE_CACHE * 1024 ** 2)
+        self.writer = WorkspaceWriter(config.OCRD_WRITE_BEHIND) if config.OCRD_WRITE_BEHIND else None
+        self.exif_cache = WorkspaceExifCache(self.directory, self.mets_target + '.exif.json'
+                                             if config.OCRD_EXIF_CACHE and not self.is_remote else None)
         #  print(mets.to_xml(xmllint=True).decode('utf-8'))
 
     def __str__(self):
@@ -114,17 +136,45 @@ class Workspace():
             [str(f) for f in self.mets.find_all_files()],
         )
 
+    def resolve_path(self, local_filename):
+        """
+        Absolute path of ``local_filename`` (relative to :py:attr:`directory`, or absolute).
+
+        All file access of the workspace resolves paths this way instead of changing
+        the current working directory, so several workspaces (or pages of one workspace)
+        can be processed in threads of the same process.
+        """
+        return path.abspath(path.join(self.directory, local_filename))
+
     def reload_mets(self):
         """
         Reload METS from the filesystem.
         """
-        self.mets = OcrdMets(filename=self.mets_target)
+        generation = self.mets.generation if isinstance(self.mets, OcrdMets) else 0
+        self.mets = self._load_mets()
+        # keep the generation increasing across reloads
+        self.mets._generation = generation + 1
+
+    def _load_mets(self) -> OcrdMets:
+        """
+        Load METS from the filesystem, replaying the changes from the journal (if any),
+        and start journaling changes if ``OCRD_METS_JOURNAL`` is set.
+        With ``OCRD_METS_BACKEND=sqlite``, load it as :py:class:`ocrd_models.ocrd_mets_sqlite.SqliteOcrdMets`.
+        """
+        if config.OCRD_METS_BACKEND == 'sqlite':
+            mets = SqliteOcrdMets(filename=self.mets_target)
+        else:
+            mets = OcrdMets(filename=self.mets_target)
+        mets.replay_journal(self.mets_journal.load())
+        if config.OCRD_METS_JOURNAL > 0:
+            mets.start_journal()
+        return mets
 
     @deprecated_alias(pageId="page_id")
     @deprecated_alias(ID="file_id")
     @deprecated_alias(fileGrp="file_grp")
     @deprecated_alias(fileGrp_mapping="filegrp_mapping")
-    def merge(self, other_workspace, copy_files=True, overwrite=False, **kwargs):
+    def merge(self, other_workspace, copy_files=True, overwrite=False, max_workers=None, **kwargs):
         """
         Merge ``other_workspace`` into this one
 
@@ -132,7 +182,11 @@ class Workspace():
 
         Keyword Args:
             copy_files (boolean): Whether to copy files from `other_workspace` to this one
+            max_workers (int): Number of threads to copy files in parallel
+                (default: see :py:class:`concurrent.futures.ThreadPoolExecutor`)
         """
+        # (source, destination) of the files to copy once the METS has been merged
+        copies = []
         def after_add_cb(f):
             """callback to run on merged OcrdFile instances in the destination"""
             if not f.local_filename:
@@ -149,10 +203,7 @@ class Workspace():
             if fpath_src.exists():
                 if fpath_dest.exists() and not overwrite:
                     raise FileExistsError("Copying %s to %s would overwrite the latter" % (fpath_src, fpath_dest))
-                if not fpath_dest.parent.is_dir():
-                    makedirs(str(fpath_dest.parent))
-                with open(str(fpath_src), 'rb') as fstream_in, open(str(fpath_dest), 'wb') as fstream_out:
-                    copyfileobj(fstream_in, fstream_out)
+                copies.append((fpath_src, fpath_dest))
         if 'page_id' in kwargs:
             kwargs['pageId'] = kwargs.pop('page_id')
         if 'file_id' in kwargs:
@@ -163,6 +214,11 @@ class Workspace():
             kwargs['fileGrp_mapping'] = kwargs.pop('filegrp_mapping')
 
         self.mets.merge(other_workspace.mets, after_add_cb=after_add_cb, **kwargs)
+        for dest_dir in {fpath_dest.parent for _, fpath_dest in copies}:
+            makedirs(str(dest_dir), exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # list() to propagate exceptions
+            list(executor.map(lambda copy: copyfile(*copy), copies))
 
 
     @deprecated(version='1.0.0', reason="Use workspace.download_file")
@@ -186,37 +242,94 @@ class Workspace():
         """
         Download a :py:class:`ocrd_models.ocrd_file.OcrdFile` to the workspace.
         """
+        url, local_filename = self._download_file(f)
+        _update_file_location(f, url, local_filename)
+        return f
+
+    def download_files(self, files, max_workers=None):
+        """
+        Download many :py:class:`ocrd_models.ocrd_file.OcrdFile` to the workspace in parallel
+        (like :py:meth:`download_file`).
+
+        All downloads share one pool of HTTP connections (see :py:meth:`ocrd.resolver.Resolver.download_session`),
+        and each is retried ``OCRD_DOWNLOAD_RETRIES`` times. The progress is logged. The locations
+        of all files in the METS are updated at once afterwards, even if some downloads failed
+        (then the first error is raised after the update).
+
+        Arguments:
+            files (list): files to download
+        Keyword Args:
+            max_workers (int): Number of threads to download files in parallel
+                (default: see :py:class:`concurrent.futures.ThreadPoolExecutor`)
+        Returns:
+            the list of files
+        """
+        log = getLogger('ocrd.workspace.download_files')
+        files = list(files)
+        locations = [None] * len(files)
+        errors = []
+        if max_workers is None:
+            # same default as ThreadPoolExecutor, also used for the connection pool size
+            max_workers = min(32, (cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+             self.resolver.download_session(pool_maxsize=max_workers) as session:
+            futures = {executor.submit(self._download_file, f, session): idx for idx, f in enumerate(files)}
+            for done, future in enumerate(as_completed(futures), 1):
+                f = files[futures[future]]
+                try:
+                    locations[futures[future]] = future.result()
+                    log.info("Downloaded %d/%d files: %s", done, len(files), f.ID)
+                except Exception as err: # pylint: disable=broad-except
+                    log.error("Failed to download %s: %s", f.ID, err)
+                    errors.append(err)
+        for f, location in zip(files, locations):
+            if location is not None:
+                _update_file_location(f, *location)
+        if errors:
+            raise errors[0]
+        return files
+
+    def _download_file(self, f, session=None):
+        """
+        Download or copy ``f`` into the workspace (unless it already is), without changing ``f``.
+
+        Returns:
+            the new ``url`` and ``local_filename`` of ``f``
+        """
         log = getLogger('ocrd.workspace.download_file')
-        with pushd_popd(self.directory):
-            if f.local_filename:
-                file_path = Path(f.local_filename).absolute()
-                if file_path.exists():
-                    try:
-                        file_path.relative_to(Path(self.directory).resolve()) # raises ValueError if not relative
-                        # If the f.local_filename exists and is within self.directory, nothing to do
-                        log.debug(f"'local_filename' {f.local_filename} already within {self.directory} - nothing to do")
-                    except ValueError:
-                        # f.local_filename exists, but not within self.directory, copy it
-                        log.debug("Copying 'local_filename' %s to workspace directory %s" % (f.local_filename, self.directory))
-                        f.local_filename = self.resolver.download_to_directory(self.directory, f.local_filename, subdir=f.fileGrp)
-                    return f
-                if f.url:
-                    log.debug("OcrdFile has 'local_filename' but it doesn't resolve - trying to download from 'url' %s", f.url)
-                elif self.baseurl:
-                    log.debug("OcrdFile has 'local_filename' but it doesn't resolve, and no 'url' - trying 'baseurl' %s with 'local_filename' %s",
-                              self.baseurl, f.local_filename)
-                    f.url = '%s/%s' % (self.baseurl, f.local_filename)
-                else:
-                    raise FileNotFoundError(f"'local_filename' {f.local_filename} points to non-existing file,"
-                                            "and no 'url' to download and no 'baseurl' set on workspace - nothing we can do.")
-            if f.url:
-                # If f.url is set, download the file to the workspace
-                basename = '%s%s' % (f.ID, MIME_TO_EXT.get(f.mimetype, '')) if f.ID else f.basename
-                f.local_filename = self.resolver.download_to_directory(self.directory, f.url, subdir=f.fileGrp, basename=basename)
+        url = f.url
+        if f.local_filename:
+            file_path = Path(self.resolve_path(f.local_filename))
+            if file_path.exists():
+                try:
+                    file_path.relative_to(Path(self.directory).resolve()) # raises ValueError if not relative
+                    # If the f.local_filename exists and is within self.directory, nothing to do
+                    log.debug(f"'local_filename' {f.local_filename} already within {self.directory} - nothing to do")
+                    return url, f.local_filename
+                except ValueError:
+                    # f.local_filename exists, but not within self.directory, copy it
+                    log.debug("Copying 'local_filename' %s to workspace directory %s" % (f.local_filename, self.directory))
+                    return url, self.resolver.download_to_directory(self.directory, str(file_path), subdir=f.fileGrp)
+            if url:
+                log.debug("OcrdFile has 'local_filename' but it doesn't resolve - trying to download from 'url' %s", url)
+            elif self.baseurl:
+                log.debug("OcrdFile has 'local_filename' but it doesn't resolve, and no 'url' - trying 'baseurl' %s with 'local_filename' %s",
+                          self.baseurl, f.local_filename)
+                url = '%s/%s' % (self.baseurl, f.local_filename)
             else:
-                # If neither f.local_filename nor f.url is set, fail
-                raise ValueError("OcrdFile {f} has neither 'url' nor 'local_filename', so cannot be downloaded")
-            return f
+                raise FileNotFoundError(f"'local_filename' {f.local_filename} points to non-existing file,"
+                                        "and no 'url' to download and no 'baseurl' set on workspace - nothing we can do.")
+        if not url:
+            # If neither f.local_filename nor f.url is set, fail
+            raise ValueError("OcrdFile {f} has neither 'url' nor 'local_filename', so cannot be downloaded")
+        # If url is set, download the file to the workspace
+        src_url = url
+        if is_local_filename(src_url):
+            # relative paths are relative to the workspace
+            src_url = self.resolve_path(get_local_filename(src_url))
+        basename = '%s%s' % (f.ID, MIME_TO_EXT.get(f.mimetype, '')) if f.ID else f.basename
+        return url, self.resolver.download_to_directory(self.directory, src_url, subdir=f.fileGrp, basename=basename,
+                                                        session=session)
 
     def remove_file(self, file_id, force=False, keep_file=False, page_recursive=False, page_same_group=False):
         """
@@ -248,24 +361,22 @@ class Workspace():
                     return None
                 raise FileNotFoundError("File %s not found in METS" % file_id)
             if page_recursive and ocrd_file.mimetype == MIMETYPE_PAGE:
-                with pushd_popd(self.directory):
-                    ocrd_page = parse(self.download_file(ocrd_file).local_filename, silence=True)
-                    for img_url in ocrd_page.get_AllAlternativeImagePaths():
-                        img_kwargs = {'local_filename': img_url}
-                        if page_same_group:
-                            img_kwargs['fileGrp'] = ocrd_file.fileGrp
-                        for img_file in self.mets.find_files(**img_kwargs):
-                            self.remove_file(img_file, keep_file=keep_file, force=force)
+                ocrd_page = parse(self.resolve_path(self.download_file(ocrd_file).local_filename), silence=True)
+                for img_url in ocrd_page.get_AllAlternativeImagePaths():
+                    img_kwargs = {'local_filename': img_url}
+                    if page_same_group:
+                        img_kwargs['fileGrp'] = ocrd_file.fileGrp
+                    for img_file in self.mets.find_files(**img_kwargs):
+                        self.remove_file(img_file, keep_file=keep_file, force=force)
             if not keep_file:
-                with pushd_popd(self.directory):
-                    if not ocrd_file.local_filename:
-                        if force:
-                            log.debug("File not locally available but --force is set: %s", ocrd_file)
-                        else:
-                            raise Exception("File not locally available %s" % ocrd_file)
+                if not ocrd_file.local_filename:
+                    if force:
+                        log.debug("File not locally available but --force is set: %s", ocrd_file)
                     else:
-                        log.debug("rm %s [cwd=%s]", ocrd_file.local_filename, self.directory)
-                        unlink(ocrd_file.local_filename)
+                        raise Exception("File not locally available %s" % ocrd_file)
+                else:
+                    log.debug("rm %s [directory=%s]", ocrd_file.local_filename, self.directory)
+                    unlink(self.resolve_path(ocrd_file.local_filename))
             # Remove from METS only after the recursion of AlternativeImages
             self.mets.remove_file(file_id)
             return ocrd_file
@@ -273,10 +384,14 @@ class Workspace():
             if not force:
                 raise e
 
-    def remove_file_group(self, USE, recursive=False, force=False, keep_files=False, page_recursive=False, page_same_group=False):
+    def remove_file_group(self, USE, recursive=False, force=False, keep_files=False, page_recursive=False, page_same_group=False,
+                          max_workers=None):
         """
         Remove a METS `fileGrp`.
 
+        When removing recursively, all files (and the images referenced by PAGE-XML documents)
+        are removed from the METS at once, and deleted from disk in parallel.
+
         Arguments:
             USE (string): `@USE` of the METS `fileGrp` to delete
         Keyword Args:
@@ -287,7 +402,10 @@ class Workspace():
                 if the file is a PAGE-XML document.
             page_same_group (boolean): Remove only images in the same file group as the PAGE-XML.
                 Has no effect unless ``page_recursive`` is `True`.
+            max_workers (int): Number of threads to delete files in parallel
+                (default: see :py:class:`concurrent.futures.ThreadPoolExecutor`)
         """
+        log = getLogger('ocrd.workspace.remove_file_group')
         if not force and self.overwrite_mode:
             force = True
 
@@ -296,26 +414,62 @@ class Workspace():
 
         file_dirs = []
         if recursive:
-            for f in self.mets.find_files(fileGrp=USE):
-                self.remove_file(f, force=force, keep_file=keep_files, page_recursive=page_recursive, page_same_group=page_same_group)
-                if f.local_filename:
-                    f_dir = path.dirname(f.local_filename)
-                    if f_dir:
-                        file_dirs.append(f_dir)
+            files = list(self.mets.find_files(fileGrp=USE))
+            if page_recursive:
+                files += self._find_page_images(files, same_group=page_same_group)
+            # each file only once, even if referenced by several PAGE-XML
+            files = list({(f.fileGrp, f.ID): f for f in files}.values())
+            if not keep_files:
+                local_filenames = []
+                for f in files:
+                    if f.local_filename:
+                        local_filenames.append(f.local_filename)
+                    elif force:
+                        log.debug("File not locally available but --force is set: %s", f)
+                    else:
+                        raise Exception("File not locally available %s" % f)
+                def remove(local_filename):
+                    try:
+                        unlink(self.resolve_path(local_filename))
+                    except FileNotFoundError:
+                        if not force:
+                            raise
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    # list() to propagate exceptions
+                    list(executor.map(remove, local_filenames))
+            file_dirs = [path.dirname(f.local_filename) for f in files if f.local_filename]
+            file_dirs = [f_dir for f_dir in file_dirs if f_dir]
+            self.mets.remove_files(files)
 
         self.mets.remove_file_group(USE, force=force, recursive=recursive)
 
         # PLEASE NOTE: this only removes directories in the workspace if they are empty
         # and named after the fileGrp which is a convention in OCR-D.
-        with pushd_popd(self.directory):
-            if Path(USE).is_dir() and not listdir(USE):
-                Path(USE).rmdir()
-            if file_dirs:
-                for file_dir in set(file_dirs):
-                    if Path(file_dir).is_dir() and not listdir(file_dir):
-                        Path(file_dir).rmdir()
+        for dir_path in [self.resolve_path(USE)] + [self.resolve_path(file_dir) for file_dir in set(file_dirs)]:
+            if path.isdir(dir_path) and not listdir(dir_path):
+                rmdir(dir_path)
 
 
+    def _find_page_images(self, files, same_group=False):
+        """
+        List the files of all ``AlternativeImage`` referenced by the PAGE-XML among :py:attr:`files`
+        (only in the same file group if :py:attr:`same_group`), looked up in one pass over the METS.
+        """
+        image_urls = []
+        for f in files:
+            if f.mimetype == MIMETYPE_PAGE:
+                ocrd_page = parse(self.resolve_path(self.download_file(f).local_filename), silence=True)
+                image_urls.extend((img_url, f.fileGrp) for img_url in ocrd_page.get_AllAlternativeImagePaths())
+        if not image_urls:
+            return []
+        files_by_local_filename = {}
+        for f in self.mets.find_files():
+            if f.local_filename:
+                files_by_local_filename.setdefault(str(f.local_filename), []).append(f)
+        return [img_file for img_url, fileGrp in image_urls
+                for img_file in files_by_local_filename.get(img_url, [])
+                if not same_group or img_file.fileGrp == fileGrp]
+
     def rename_file_group(self, old, new):
         """
         Rename a METS `fileGrp`.
@@ -331,60 +485,59 @@ class Workspace():
         if new in self.mets.file_groups:
             raise ValueError(f"fileGrp already exists {new}")
 
-        with pushd_popd(self.directory):
-            # create workspace dir ``new``
-            log.debug("mkdir %s" % new)
-            if not Path(new).is_dir():
-                Path(new).mkdir()
-            local_filename_replacements = {}
-            log.debug("Moving files")
-            for mets_file in self.mets.find_files(fileGrp=old, local_only=True):
-                new_local_filename = old_local_filename = mets_file.local_filename
-                assert new_local_filename
-                assert old_local_filename
-                # Directory part
-                new_local_filename = sub(r'^%s/' % old, r'%s/' % new, new_local_filename)
-                # File part
-                new_local_filename = sub(r'/%s' % old, r'/%s' % new, new_local_filename)
-                local_filename_replacements[str(mets_file.local_filename)] = new_local_filename
-                # move file from ``old`` to ``new``
-                Path(old_local_filename).rename(new_local_filename)
-                # change the url of ``mets:file``
-                mets_file.local_filename = new_local_filename
-                # change the file ID and update structMap
-                # change the file ID and update structMap
-                new_id = sub(r'^%s' % old, r'%s' % new, mets_file.ID)
-                try:
-                    next(self.mets.find_files(ID=new_id))
-                    log.warning("ID %s already exists, not changing ID while renaming %s -> %s" % (new_id, old_local_filename, new_local_filename))
-                except StopIteration:
-                    mets_file.ID = new_id
-            # change file paths in PAGE-XML imageFilename and filename attributes
-            for page_file in self.mets.find_files(mimetype=MIMETYPE_PAGE, local_only=True):
-                log.debug("Renaming file references in PAGE-XML %s" % page_file)
-                pcgts = page_from_file(page_file)
-                changed = False
+        # create workspace dir ``new``
+        log.debug("mkdir %s" % new)
+        if not path.isdir(self.resolve_path(new)):
+            makedirs(self.resolve_path(new))
+        local_filename_replacements = {}
+        log.debug("Moving files")
+        for mets_file in self.mets.find_files(fileGrp=old, local_only=True):
+            new_local_filename = old_local_filename = mets_file.local_filename
+            assert new_local_filename
+            assert old_local_filename
+            # Directory part
+            new_local_filename = sub(r'^%s/' % old, r'%s/' % new, new_local_filename)
+            # File part
+            new_local_filename = sub(r'/%s' % old, r'/%s' % new, new_local_filename)
+            local_filename_replacements[str(mets_file.local_filename)] = new_local_filename
+            # move file from ``old`` to ``new``
+            Path(self.resolve_path(old_local_filename)).rename(self.resolve_path(new_local_filename))
+            # change the url of ``mets:file``
+            mets_file.local_filename = new_local_filename
+            # change the file ID and update structMap
+            # change the file ID and update structMap
+            new_id = sub(r'^%s' % old, r'%s' % new, mets_file.ID)
+            try:
+                next(self.mets.find_files(ID=new_id))
+                log.warning("ID %s already exists, not changing ID while renaming %s -> %s" % (new_id, old_local_filename, new_local_filename))
+            except StopIteration:
+                mets_file.ID = new_id
+        # change file paths in PAGE-XML imageFilename and filename attributes
+        for page_file in self.mets.find_files(mimetype=MIMETYPE_PAGE, local_only=True):
+            log.debug("Renaming file references in PAGE-XML %s" % page_file)
+            pcgts = parse(self.resolve_path(page_file.local_filename), silence=True)
+            changed = False
+            for old_local_filename, new_local_filename in local_filename_replacements.items():
+                if pcgts.get_Page().imageFilename == old_local_filename:
+                    changed = True
+                    log.debug("Rename pc:Page/@imageFilename: %s -> %s" % (old_local_filename, new_local_filename))
+                    pcgts.get_Page().imageFilename = new_local_filename
+            for ai in pcgts.get_Page().get_AllAlternativeImages():
                 for old_local_filename, new_local_filename in local_filename_replacements.items():
-                    if pcgts.get_Page().imageFilename == old_local_filename:
+                    if ai.filename == old_local_filename:
                         changed = True
-                        log.debug("Rename pc:Page/@imageFilename: %s -> %s" % (old_local_filename, new_local_filename))
-                        pcgts.get_Page().imageFilename = new_local_filename
-                for ai in pcgts.get_Page().get_AllAlternativeImages():
-                    for old_local_filename, new_local_filename in local_filename_replacements.items():
-                        if ai.filename == old_local_filename:
-                            changed = True
-                            log.debug("Rename pc:Page/../AlternativeImage: %s -> %s" % (old_local_filename, new_local_filename))
-                            ai.filename = new_local_filename
-                if changed:
-                    log.debug("PAGE-XML changed, writing %s" % (page_file.local_filename))
-                    with open(page_file.local_filename, 'w', encoding='utf-8') as f:
-                        f.write(to_xml(pcgts))
-            # change the ``USE`` attribute of the fileGrp
-            self.mets.rename_file_group(old, new)
-            # Remove the old dir
-            log.debug("rmdir %s" % old)
-            if Path(old).is_dir() and not listdir(old):
-                Path(old).rmdir()
+                        log.debug("Rename pc:Page/../AlternativeImage: %s -> %s" % (old_local_filename, new_local_filename))
+                        ai.filename = new_local_filename
+            if changed:
+                log.debug("PAGE-XML changed, writing %s" % (page_file.local_filename))
+                with open(self.resolve_path(page_file.local_filename), 'w', encoding='utf-8') as f:
+                    f.write(to_xml(pcgts))
+        # change the ``USE`` attribute of the fileGrp
+        self.mets.rename_file_group(old, new)
+        # Remove the old dir
+        log.debug("rmdir %s" % old)
+        if path.isdir(self.resolve_path(old)) and not listdir(self.resolve_path(old)):
+            rmdir(self.resolve_path(old))
 
     @deprecated_alias(pageId="page_id")
     @deprecated_alias(ID="file_id")
@@ -396,7 +549,8 @@ class Workspace():
             file_grp (string): `@USE` of the METS `fileGrp` to add to
         Keyword Args:
             content (string|bytes): optional content to write to the file
-                in the filesystem
+                in the filesystem (in the background with ``OCRD_WRITE_BEHIND``,
+                see :py:attr:`writer`)
             **kwargs: See :py:func:`ocrd_models.ocrd_mets.OcrdMets.add_file`
         Returns:
             a new :py:class:`ocrd_models.ocrd_file.OcrdFile`
@@ -414,48 +568,127 @@ class Workspace():
         if self.overwrite_mode:
             kwargs['force'] = True
 
-        with pushd_popd(self.directory):
-            if kwargs.get('local_filename'):
-                # If the local filename has folder components, create those folders
-                local_filename_dir = str(kwargs['local_filename']).rsplit('/', 1)[0]
-                if local_filename_dir != str(kwargs['local_filename']) and not Path(local_filename_dir).is_dir():
-                    makedirs(local_filename_dir)
+        if kwargs.get('local_filename'):
+            # If the local filename has folder components, create those folders
+            local_filename_dir = str(kwargs['local_filename']).rsplit('/', 1)[0]
+            if local_filename_dir != str(kwargs['local_filename']) and not path.isdir(self.resolve_path(local_filename_dir)):
+                makedirs(self.resolve_path(local_filename_dir), exist_ok=True)
 
-            #  print(kwargs)
-            kwargs["pageId"] = kwargs.pop("page_id")
-            if "file_id" in kwargs:
-                kwargs["ID"] = kwargs.pop("file_id")
+        #  print(kwargs)
+        kwargs["pageId"] = kwargs.pop("page_id")
+        if "file_id" in kwargs:
+            kwargs["ID"] = kwargs.pop("file_id")
+
+        ret = self.mets.add_file(file_grp, **kwargs)
+
+        # content being set implies is_remote==False because METS server
+        # does not pass file contents
+        if content is not None:
+            if self.writer is not None:
+                self.writer.submit(self.resolve_path(kwargs['local_filename']), _write_file, content)
+            else:
+                _write_file(self.resolve_path(kwargs['local_filename']), content)
 
-            ret = self.mets.add_file(file_grp, **kwargs)
+        return ret
+
+    def add_files(self, records, force=False, ignore=False) -> List[Union[OcrdFile, ClientSideOcrdFile]]:
+        """
+        Add many files to the :py:class:`ocrd_models.ocrd_mets.OcrdMets` of the workspace at once
+        (see :py:meth:`ocrd_models.ocrd_mets.OcrdMets.add_files`).
 
-            # content being set implies is_remote==False because METS server
-            # does not pass file contents
+        Arguments:
+            records (list): ``dict`` with the keyword arguments of :py:meth:`add_file`
+                (``file_grp``, ``file_id``, ``page_id``, ``mimetype``, ``url``, ``local_filename``
+                and optionally ``content``) for each file
+        Keyword Args:
+            force (boolean): Whether to add files even if a file with the same ID already exists
+            ignore (boolean): Do not look for existing files at all
+        Returns:
+            the new :py:class:`ocrd_models.ocrd_file.OcrdFile` instances
+        """
+        log = getLogger('ocrd.workspace.add_files')
+        log.debug('adding %d files', len(records))
+        mets_records = []
+        contents = []
+        for record in records:
+            record = dict(record)
+            content = record.pop('content', None)
+            if content is not None and not record.get('local_filename'):
+                raise Exception("'content' was set but no 'local_filename'")
             if content is not None:
-                with open(kwargs['local_filename'], 'wb') as f:
-                    if isinstance(content, str):
-                        content = bytes(content, 'utf-8')
-                    f.write(content)
+                contents.append((record['local_filename'], content))
+            mets_records.append({'fileGrp': record.pop('file_grp'), 'ID': record.pop('file_id', None),
+                                 'pageId': record.pop('page_id', None), **record})
+        if self.overwrite_mode:
+            force = True
+
+        local_filename_dirs = set(Path(self.resolve_path(record['local_filename'])).parent
+                                  for record in mets_records if record.get('local_filename'))
+        for local_filename_dir in local_filename_dirs:
+            # If the local filenames have folder components, create those folders
+            if not local_filename_dir.is_dir():
+                makedirs(local_filename_dir, exist_ok=True)
+
+        ret = self.mets.add_files(mets_records, force=force, ignore=ignore)
+
+        # content being set implies is_remote==False because METS server
+        # does not pass file contents
+        for local_filename, content in contents:
+            if self.writer is not None:
+                self.writer.submit(self.resolve_path(local_filename), _write_file, content)
+            else:
+                _write_file(self.resolve_path(local_filename), content)
 
         return ret
 
-    def save_mets(self):
+    def save_mets(self, compact : bool = False):
         """
         Write out the current state of the METS file to the filesystem.
+
+        If ``OCRD_METS_JOURNAL`` is set, only append the changes since the last save
+        to the journal, unless :py:attr:`compact` is set or the journal has grown
+        to ``OCRD_METS_JOURNAL`` changes, in which case the complete METS is written
+        and the journal removed. If ``OCRD_METS_INDEX`` is set, the index of the
+        complete METS is updated as well.
+
+        With ``OCRD_WRITE_BEHIND``, first wait until all files have been written,
+        and raise the first error writing them (without saving the METS).
+
+        With ``OCRD_EXIF_CACHE``, also write the image metadata cache.
         """
         log = getLogger('ocrd.workspace.save_mets')
+        if self.writer is not None:
+            self.writer.wait()
         if self.is_remote:
             self.mets.save()
-        else:
-            log.debug("Saving mets '%s'", self.mets_target)
-            if self.automatic_backup:
-                WorkspaceBackupManager(self).add()
-            with atomic_write(self.mets_target) as f:
-                f.write(self.mets.to_xml(xmllint=True).decode('utf-8'))
+            return
+        self.exif_cache.save()
+        # no changes (e.g. by other threads of the METS server) while saving
+        with self.mets._lock if isinstance(self.mets, OcrdMets) else nullcontext():
+            entries = self.mets.pop_journal() if isinstance(self.mets, OcrdMets) else []
+            if (compact or self.automatic_backup or not entries or
+                    self.mets_journal.entries_count + len(entries) >= config.OCRD_METS_JOURNAL or
+                    not path.exists(self.mets_target) or
+                    # journal of another instance, which did not replay it
+                    (self.mets_journal.exists and not self.mets_journal.entries_count)):
+                log.debug("Saving mets '%s'", self.mets_target)
+                if self.automatic_backup:
+                    WorkspaceBackupManager(self).add()
+                with atomic_write(self.mets_target) as f:
+                    f.write(self.mets.to_xml(xmllint=True).decode('utf-8'))
+                self.mets_journal.discard()
+                if config.OCRD_METS_INDEX and isinstance(self.mets, OcrdMets):
+                    OcrdMetsIndex(self.mets_target).save(self.mets._index_data())
+            else:
+                log.debug("Appending %d changes to METS journal '%s'", len(entries), self.mets_journal.filename)
+                self.mets_journal.append(entries)
 
     def resolve_image_exif(self, image_url):
         """
         Get the EXIF metadata about an image URL as :py:class:`ocrd_models.ocrd_exif.OcrdExif`
 
+        Metadata of local files are cached in :py:attr:`exif_cache` (as long as the file is unchanged).
+
         Args:
             image_url (string) : `@href` (path or URL) of the METS `file` to inspect
 
@@ -467,14 +700,23 @@ class Workspace():
             raise ValueError(f"'image_url' must be a non-empty string, not '{image_url}' ({type(image_url)})")
         try:
             f = next(self.mets.find_files(local_filename=str(image_url)))
-            return exif_from_filename(f.local_filename)
+            if self.writer is not None:
+                self.writer.wait_for(self.resolve_path(f.local_filename))
+            return self._probe_image(self.resolve_path(f.local_filename))
         except StopIteration:
             try:
                 f = next(self.mets.find_files(url=str(image_url)))
-                return exif_from_filename(self.download_file(f).local_filename)
+                return self._probe_image(self.resolve_path(self.download_file(f).local_filename))
             except StopIteration:
                 with download_temporary_file(image_url) as f:
-                    return exif_from_filename(f.name)
+                    return probe_image(f.name)
+
+    def _probe_image(self, filename):
+        exif = self.exif_cache.get(filename)
+        if exif is None:
+            exif = probe_image(filename)
+            self.exif_cache.put(filename, exif)
+        return exif
 
     @deprecated(version='1.0.0', reason="Use workspace.image_from_page and workspace.image_from_segment")
     def resolve_image_as_pil(self, image_url, coords=None):
@@ -492,23 +734,81 @@ class Workspace():
         """
         return self._resolve_image_as_pil(image_url, coords)
 
-    def _resolve_image_as_pil(self, image_url, coords=None):
+    def _resolve_image_as_pil(self, image_url, coords=None, as_array=False):
         if not image_url:
             # avoid "finding" just any file
             raise Exception("Cannot resolve empty image path")
         log = getLogger('ocrd.workspace._resolve_image_as_pil')
-        with pushd_popd(self.directory):
+        box = None
+        if coords is not None:
+            poly = np.array(coords, np.int32)
+            log.debug("Cutting region %s from %s", coords, image_url)
+            box = tuple(max(0, int(val)) for val in (np.min(poly[:, 0]), np.min(poly[:, 1]),
+                                                      np.max(poly[:, 0]), np.max(poly[:, 1])))
+        def load(filename, cache=True):
+            filename = self.resolve_path(filename)
+            if self.writer is not None:
+                self.writer.wait_for(filename)
+            if as_array:
+                return self._load_image_array(filename, cache=cache)
+            return self._load_image(filename, cache=cache, box=box)
+        try:
+            f = next(self.mets.find_files(local_filename=str(image_url)))
+            pil_image = load(f.local_filename)
+        except StopIteration:
             try:
-                f = next(self.mets.find_files(local_filename=str(image_url)))
-                pil_image = Image.open(f.local_filename)
+                f = next(self.mets.find_files(url=str(image_url)))
+                pil_image = load(self.download_file(f).local_filename)
             except StopIteration:
-                try:
-                    f = next(self.mets.find_files(url=str(image_url)))
-                    pil_image = Image.open(self.download_file(f).local_filename)
-                except StopIteration:
-                    with download_temporary_file(image_url) as f:
-                        pil_image = Image.open(f.name)
-            pil_image.load() # alloc and give up the FD
+                with download_temporary_file(image_url) as f:
+                    pil_image = load(f.name, cache=False)
+
+        if coords is None:
+            return pil_image
+        if as_array:
+            return pil_image[box[1]:box[3], box[0]:box[2]]
+
+        # FIXME: remove or replace this by (image_from_polygon+) crop_image ...
+        log.debug("Converting PIL to OpenCV: %s", image_url)
+        color_conversion = COLOR_GRAY2BGR if pil_image.mode in ('1', 'L') else  COLOR_RGB2BGR
+        pil_as_np_array = np.array(pil_image).astype('uint8') if pil_image.mode == '1' else np.array(pil_image)
+        cv2_image = cvtColor(pil_as_np_array, color_conversion)
+        return Image.fromarray(cv2_image)
+
+    def _load_image(self, filename, cache=True, box=None):
+        """
+        Decode the image file ``filename`` (re-quantized to 8 bit), unless it is already
+        in :py:attr:`image_cache` (keyed by absolute path and modification time).
+        Cached images are returned as copy-on-write views.
+
+        If ``box`` (left, upper, right, lower) is given, return only that region (clipped to the image).
+        Where the format allows (uncompressed rasters, non-interlaced PNG), only the rows and columns
+        needed for the region are decoded (and the result is not cached), otherwise the full image is.
+        """
+        log = getLogger('ocrd.workspace._load_image')
+        key = None
+        if cache and self.image_cache.max_bytes:
+            filename = path.abspath(filename)
+            key = (filename, stat(filename).st_mtime_ns, 'PIL')
+            pil_image = self.image_cache.get(key)
+            if pil_image is not None:
+                log.debug('Reusing decoded image "%s" (%s)', filename, self.image_cache)
+                if box is not None:
+                    return pil_image.crop(_clip_box(box, pil_image.size))
+                return shared_image(pil_image)
+        pil_image = Image.open(filename)
+        if box is not None:
+            box = _clip_box(box, pil_image.size)
+            size = pil_image.size
+            box = _restrict_decoding(pil_image, box)
+            if pil_image.size != size:
+                log.debug('Decoding only %s of image "%s" for region', pil_image.size, filename)
+                key = None
+        pil_image.load() # alloc and give up the FD
+        if box is not None and key is None:
+            # crop before re-quantization
+            pil_image = pil_image.crop(box)
+            box = None
 
         # Pillow does not properly support higher color depths
         # (e.g. 16-bit or 32-bit or floating point grayscale),
@@ -525,7 +825,7 @@ class Workspace():
             if arr_image.dtype.kind == 'i':
                 # signed integer is *not* trustworthy in this context
                 # (usually a mistake in the array interface)
-                log.debug('Casting image "%s" from signed to unsigned', image_url)
+                log.debug('Casting image "%s" from signed to unsigned', filename)
                 arr_image.dtype = np.dtype('u' + arr_image.dtype.name)
             if arr_image.dtype.kind == 'u':
                 # integer needs to be scaled linearly to 8 bit
@@ -534,37 +834,55 @@ class Workspace():
                 # but that would be guessing anyway, so here don't
                 # make assumptions on _scale_, just reduce _precision_
                 log.debug('Reducing image "%s" from depth %d bit to 8 bit',
-                          image_url, arr_image.dtype.itemsize * 8)
+                          filename, arr_image.dtype.itemsize * 8)
                 arr_image = arr_image >> 8 * (arr_image.dtype.itemsize-1)
                 arr_image = arr_image.astype(np.uint8)
             elif arr_image.dtype.kind == 'f':
                 # float needs to be scaled from [0,1.0] to [0,255]
                 log.debug('Reducing image "%s" from floating point to 8 bit',
-                          image_url)
+                          filename)
                 arr_image *= 255
                 arr_image = arr_image.astype(np.uint8)
             pil_image = Image.fromarray(arr_image)
 
-        if coords is None:
+        if key is None:
             return pil_image
+        self.image_cache.put(key, pil_image)
+        if box is not None:
+            return pil_image.crop(box)
+        return shared_image(pil_image)
 
-        # FIXME: remove or replace this by (image_from_polygon+) crop_image ...
-        log.debug("Converting PIL to OpenCV: %s", image_url)
-        color_conversion = COLOR_GRAY2BGR if pil_image.mode in ('1', 'L') else  COLOR_RGB2BGR
-        pil_as_np_array = np.array(pil_image).astype('uint8') if pil_image.mode == '1' else np.array(pil_image)
-        cv2_image = cvtColor(pil_as_np_array, color_conversion)
-
-        poly = np.array(coords, np.int32)
-        log.debug("Cutting region %s from %s", coords, image_url)
-        region_cut = cv2_image[
-            np.min(poly[:, 1]):np.max(poly[:, 1]),
-            np.min(poly[:, 0]):np.max(poly[:, 0])
-        ]
-        return Image.fromarray(region_cut)
+    def _load_image_array(self, filename, cache=True):
+        """
+        Decode the image file ``filename`` like :py:meth:`_load_image`, but as a numpy array
+        (of 8-bit or boolean pixels, with channels L, LA, RGB or RGBA), unless it is already
+        in :py:attr:`image_cache`. Cached arrays are returned as read-only views.
+        """
+        log = getLogger('ocrd.workspace._load_image_array')
+        key = None
+        if cache and self.image_cache.max_bytes:
+            filename = path.abspath(filename)
+            key = (filename, stat(filename).st_mtime_ns, 'array')
+            array = self.image_cache.get(key)
+            if array is not None:
+                log.debug('Reusing decoded image "%s" (%s)', filename, self.image_cache)
+                return shared_image(array)
+        # decode, but do not keep the PIL.Image in the cache as well
+        pil_image = self._load_image(filename, cache=False)
+        if pil_image.mode not in ('1', 'L', 'LA', 'RGB', 'RGBA'):
+            # e.g. palette or CMYK
+            pil_image = pil_image.convert('RGBA' if 'A' in pil_image.mode or 'transparency' in pil_image.info
+                                          else 'RGB')
+        array = np.asarray(pil_image)
+        if key is None:
+            return array
+        self.image_cache.put(key, array)
+        return shared_image(array)
 
     def image_from_page(self, page, page_id,
                         fill='background', transparency=False,
-                        feature_selector='', feature_filter='', filename=''):
+                        feature_selector='', feature_filter='', filename='',
+                        as_array=False):
         """Extract an image for a PAGE-XML page from the workspace.
 
         Args:
@@ -576,6 +894,7 @@ class Workspace():
             feature_selector (string): a comma-separated list of `@comments` classes
             feature_filter (string): a comma-separated list of `@comments` classes
             filename (string): which file path to use
+            as_array (boolean): whether to return a numpy array instead of a `PIL.Image`
 
         Extract a `PIL.Image` from ``page``, either from its `AlternativeImage`
         (if it exists), or from its `@imageFilename` (otherwise). Also crop it,
@@ -636,6 +955,11 @@ class Workspace():
         (The first two can be used to annotate a new `AlternativeImage`,
          or be passed down with :py:meth:`image_from_segment`.)
 
+        If ``as_array`` is true, then the image is decoded, cropped, transposed
+        and rotated as a numpy array (of 8-bit or boolean pixels, with channels
+        L, LA, RGB or RGBA), without converting to or from `PIL.Image`.
+        (The array may be a read-only view of a cached array, so copy before changing it in place.)
+
         Examples:
 
          * get a raw (colored) but already deskewed and cropped image::
@@ -647,14 +971,28 @@ class Workspace():
         """
         log = getLogger('ocrd.workspace.image_from_page')
         page_image_info = self.resolve_image_exif(page.imageFilename)
-        page_image = self._resolve_image_as_pil(page.imageFilename)
+        cache_key = None
+        if self.image_cache.max_bytes:
+            cache_key = self._page_image_key(page, fill, transparency, feature_selector, feature_filter, filename,
+                                             as_array)
+            cached = self.image_cache.get(cache_key)
+            if cached is not None:
+                log.debug("Reusing derived image for page '%s' (%s)", page_id, self.image_cache)
+                page_image, page_coords = cached
+                page_image = shared_image(page_image)
+                if not as_array:
+                    page_image.format = 'PNG' # workaround for tesserocr#194
+                return page_image, dict(page_coords, transform=page_coords['transform'].copy()), page_image_info
+        page_image = self._resolve_image_as_pil(page.imageFilename, as_array=as_array)
+        page_image_filename, resolved_image = page.imageFilename, page_image
         page_coords = dict()
         # use identity as initial affine coordinate transform:
         page_coords['transform'] = np.eye(3)
         # interim bbox (updated with each change to the transform):
-        page_bbox = [0, 0, page_image.width, page_image.height]
+        width, height = _size(page_image)
+        page_bbox = [0, 0, width, height]
         page_xywh = {'x': 0, 'y': 0,
-                     'w': page_image.width, 'h': page_image.height}
+                     'w': width, 'h': height}
 
         border = page.get_Border()
         # page angle: PAGE @orientation is defined clockwise,
@@ -703,7 +1041,8 @@ class Workspace():
                 log.debug("Using AlternativeImage %d %s for page '%s'",
                           alternative_images.index(best_image) + 1,
                           best_features, page_id)
-                page_image = self._resolve_image_as_pil(best_image.get_filename())
+                page_image = self._resolve_image_as_pil(best_image.get_filename(), as_array=as_array)
+                page_image_filename, resolved_image = best_image.get_filename(), page_image
                 page_coords['features'] = best_image.get_comments() # including duplicates
 
         # adjust the coord transformation to the steps applied on the image,
@@ -749,12 +1088,13 @@ class Workspace():
             # error message; so we only check once at the boundary between
             # existing and new features
             # FIXME we should check/enforce consistency when _adding_ AlternativeImage
+            width, height = _size(page_image)
             if (i == len(alternative_image_features) and
-                not (page_xywh['w'] - 2 < page_image.width < page_xywh['w'] + 2 and
-                     page_xywh['h'] - 2 < page_image.height < page_xywh['h'] + 2)):
+                not (page_xywh['w'] - 2 < width < page_xywh['w'] + 2 and
+                     page_xywh['h'] - 2 < height < page_xywh['h'] + 2)):
                 log.error('page "%s" image (%s; %dx%d) has not been cropped properly (%dx%d)',
                           page_id, page_coords['features'],
-                          page_image.width, page_image.height,
+                          width, height,
                           page_xywh['w'], page_xywh['h'])
             name = "%s for page '%s'" % ("AlternativeImage" if best_image
                                          else "original image", page_id)
@@ -772,7 +1112,8 @@ class Workspace():
                     fill=fill, transparency=transparency)
 
         # verify constraints again:
-        if filename and not getattr(page_image, 'filename', '').endswith(filename):
+        if filename and not getattr(page_image, 'filename', page_image_filename if page_image is resolved_image
+                                    else '').endswith(filename):
             raise Exception('Found no AlternativeImage that satisfies all requirements ' +
                             'filename="%s" in page "%s"' % (
                                 filename, page_id))
@@ -786,12 +1127,42 @@ class Workspace():
             raise Exception('Found no AlternativeImage that satisfies all requirements ' +
                             'filter="%s" in page "%s"' % (
                                 feature_filter, page_id))
-        page_image.format = 'PNG' # workaround for tesserocr#194
+        if not as_array:
+            page_image.format = 'PNG' # workaround for tesserocr#194
+        if cache_key is not None:
+            self.image_cache.put(cache_key, (page_image, page_coords))
+            page_image = shared_image(page_image)
+            if not as_array:
+                page_image.format = 'PNG'
+            page_coords = dict(page_coords, transform=page_coords['transform'].copy())
         return page_image, page_coords, page_image_info
 
+    def _page_image_key(self, page, *args):
+        """
+        Key of the derived image of ``page`` in :py:attr:`image_cache`: everything
+        :py:meth:`image_from_page` depends on, i.e. the image files (and their modification time),
+        the `AlternativeImage` features, `Border` coordinates and `@orientation` of the page,
+        and the remaining arguments. (So any change to the PAGE or its images invalidates the entry.)
+        """
+        def mtime(filename):
+            try:
+                return stat(self.resolve_path(filename)).st_mtime_ns
+            except (OSError, TypeError):
+                return None
+        border = page.get_Border()
+        alternative_images = page.get_AlternativeImage()
+        return ('page',
+                tuple((filename, mtime(filename)) for filename in
+                      [page.imageFilename] + [alternative_image.filename for alternative_image in alternative_images]),
+                tuple(alternative_image.comments for alternative_image in alternative_images),
+                border.get_Coords().points if border and border.get_Coords() else None,
+                page.get_orientation(),
+                repr(args))
+
     def image_from_segment(self, segment, parent_image, parent_coords,
                            fill='background', transparency=False,
-                           feature_selector='', feature_filter='', filename=''):
+                           feature_selector='', feature_filter='', filename='',
+                           as_array=False):
         """Extract an image for a PAGE-XML hierarchy segment from its parent's image.
 
         Args:
@@ -814,6 +1185,8 @@ class Workspace():
             transparency (boolean): whether to add an alpha channel for masking
             feature_selector (string): a comma-separated list of ``@comments`` classes
             feature_filter (string): a comma-separated list of ``@comments`` classes
+            as_array (boolean): whether to return a numpy array instead of a `PIL.Image`
+                (implied if `parent_image` is a numpy array)
 
         Extract a `PIL.Image` from `segment`, either from ``AlternativeImage``
         (if it exists), or producing a new image via cropping from `parent_image`
@@ -888,6 +1261,10 @@ class Workspace():
                     feature_filter='binarized,grayscale_normalized')
         """
         log = getLogger('ocrd.workspace.image_from_segment')
+        if isinstance(parent_image, np.ndarray):
+            as_array = True
+        elif as_array:
+            parent_image = np.asarray(parent_image)
         # note: We should mask overlapping neighbouring segments here,
         # but finding the right clipping rules can be difficult if operating
         # on the raw (non-binary) image data alone: for each intersection, it
@@ -943,6 +1320,7 @@ class Workspace():
                             'despeckled', 'dewarped']])
 
         best_image = None
+        segment_image_filename, resolved_image = '', None
         alternative_images = segment.get_AlternativeImage()
         if alternative_images:
             # (e.g. from segment-level cropping, binarization, deskewing or despeckling)
@@ -973,7 +1351,8 @@ class Workspace():
                 log.debug("Using AlternativeImage %d %s for segment '%s'",
                           alternative_images.index(best_image) + 1,
                           best_features, segment.id)
-                segment_image = self._resolve_image_as_pil(alternative_image.get_filename())
+                segment_image = self._resolve_image_as_pil(alternative_image.get_filename(), as_array=as_array)
+                segment_image_filename, resolved_image = alternative_image.get_filename(), segment_image
                 segment_coords['features'] = best_image.get_comments() # including duplicates
 
         alternative_image_features = segment_coords['features'].split(',')
@@ -1007,12 +1386,13 @@ class Workspace():
             # FIXME we should enforce consistency here (i.e. split into transposition
             #       and minimal rotation, rotation always reshapes, rescaling never happens)
             # FIXME: inconsistency currently unavoidable with line-level dewarping (which increases height)
+            width, height = _size(segment_image)
             if (i == len(alternative_image_features) and
-                not (segment_xywh['w'] - 2 < segment_image.width < segment_xywh['w'] + 2 and
-                     segment_xywh['h'] - 2 < segment_image.height < segment_xywh['h'] + 2)):
+                not (segment_xywh['w'] - 2 < width < segment_xywh['w'] + 2 and
+                     segment_xywh['h'] - 2 < height < segment_xywh['h'] + 2)):
                 log.error('segment "%s" image (%s; %dx%d) has not been cropped properly (%dx%d)',
                           segment.id, segment_coords['features'],
-                          segment_image.width, segment_image.height,
+                          width, height,
                           segment_xywh['w'], segment_xywh['h'])
             name = "%s for segment '%s'" % ("AlternativeImage" if best_image
                                             else "parent image", segment.id)
@@ -1026,7 +1406,8 @@ class Workspace():
                     fill=fill, transparency=transparency)
 
         # verify constraints again:
-        if filename and not getattr(segment_image, 'filename', '').endswith(filename):
+        if filename and not getattr(segment_image, 'filename', segment_image_filename if segment_image is resolved_image
+                                    else '').endswith(filename):
             raise Exception('Found no AlternativeImage that satisfies all requirements ' +
                             'filename="%s" in segment "%s"' % (
                                 filename, segment.id))
@@ -1040,9 +1421,31 @@ class Workspace():
             raise Exception('Found no AlternativeImage that satisfies all requirements ' +
                             'filter="%s" in segment "%s"' % (
                                 feature_filter, segment.id))
-        segment_image.format = 'PNG' # workaround for tesserocr#194
+        if not as_array:
+            segment_image.format = 'PNG' # workaround for tesserocr#194
         return segment_image, segment_coords
 
+    def images_from_segments(self, segments, parent_image, parent_coords, **kwargs):
+        """Extract images for many PAGE-XML segments (e.g. all lines of a region) from their parent's image.
+
+        Args:
+            segments (list): PAGE segment objects sharing the same parent
+            parent_image (`PIL.Image`): image of the parent of ``segments``
+            parent_coords (dict): a `dict` with information about `parent_image`
+        Keyword Args:
+            as in :py:meth:`image_from_segment`
+
+        Same as :py:meth:`image_from_segment` on each segment in turn (masking and cropping
+        only touch the bounding box of each segment in ``parent_image``, so the cost for
+        all lines of a dense page is about that of a single pass over the page).
+
+        Returns:
+            a list of tuples of the extracted `PIL.Image` and its `dict` of coordinates
+            (as in :py:meth:`image_from_segment`), in the order of ``segments``
+        """
+        return [self.image_from_segment(segment, parent_image, parent_coords, **kwargs)
+                for segment in segments]
+
     # pylint: disable=redefined-builtin
     def save_image_file(self, image,
                         file_id,
@@ -1053,7 +1456,7 @@ class Workspace():
         """Store an image in the filesystem and reference it as new file in the METS.
 
         Args:
-            image (PIL.Image): derived image to save
+            image (PIL.Image or numpy.ndarray): derived image to save
             file_id (string): `@ID` of the METS `file` to use
             file_grp (string): `@USE` of the METS `fileGrp` to use
         Keyword Args:
@@ -1063,6 +1466,13 @@ class Workspace():
 
         Serialize the image into the filesystem, and add a `file` for it in the METS.
         Use a filename extension based on ``mimetype``.
+        (Numpy arrays are encoded with OpenCV where possible, without converting to `PIL.Image`.)
+
+        The encoding options (and possibly a different MIME type) come from the profile
+        for ``file_grp`` in ``OCRD_IMAGE_ENCODING`` (see :py:data:`ocrd_utils.IMAGE_ENCODING_PROFILES`).
+
+        With ``OCRD_WRITE_BEHIND``, the `file` is added immediately, but (a copy of) the image
+        is encoded and written in the background (see :py:attr:`writer`).
 
         Returns:
             The (absolute) path of the created file.
@@ -1070,17 +1480,27 @@ class Workspace():
         log = getLogger('ocrd.workspace.save_image_file')
         if self.overwrite_mode:
             force = True
-        image_bytes = io.BytesIO()
-        image.save(image_bytes, format=MIME_TO_PIL[mimetype])
+        mimetype, options = _image_encoding(image, mimetype, file_grp)
         file_path = str(Path(file_grp, '%s%s' % (file_id, MIME_TO_EXT[mimetype])))
+        if self.writer is not None:
+            # the caller may change the image after returning
+            if not isinstance(image, np.ndarray):
+                image = image.copy()
+            elif image.flags.writeable:
+                image = image.copy()
+            content = None
+        else:
+            content = _encode_image(image, mimetype, options)
         out = self.add_file(
             file_grp,
             file_id=file_id,
             page_id=page_id,
             local_filename=file_path,
             mimetype=mimetype,
-            content=image_bytes.getvalue(),
+            content=content,
             force=force)
+        if self.writer is not None:
+            self.writer.submit(self.resolve_path(file_path), _write_image, image, mimetype, options)
         log.info('created file ID: %s, file_grp: %s, path: %s',
                  file_id, file_grp, out.local_filename)
         return file_path
@@ -1104,8 +1524,7 @@ class Workspace():
             kwargs["ID"] = kwargs.pop("file_id")
         if "file_grp" in kwargs:
             kwargs["fileGrp"] = kwargs.pop("file_grp")
-        with pushd_popd(self.directory):
-            return self.mets.find_files(*args, **kwargs)
+        return self.mets.find_files(*args, **kwargs)
 
 def _crop(log, name, segment, parent_image, parent_coords, op='cropped', **kwargs):
     segment_coords = parent_coords.copy()
@@ -1125,10 +1544,27 @@ def _crop(log, name, segment, parent_image, parent_coords, op='cropped', **kwarg
         elif isinstance(segment, BorderType):
             log.debug("Cropping %s", name)
             segment_coords['features'] += ',' + op
+        # only mask and crop the part of the parent image within the bbox
+        # (same result as on the full image, but at the cost of the segment size):
+        width, height = _size(parent_image)
+        window = (max(0, segment_bbox[0]), max(0, segment_bbox[1]),
+                  min(width, segment_bbox[2] + 1), min(height, segment_bbox[3] + 1))
+        if window[0] < window[2] and window[1] < window[3]:
+            if isinstance(parent_image, np.ndarray):
+                parent_window = parent_image[window[1]:window[3], window[0]:window[2]]
+            else:
+                parent_window = parent_image.crop(window)
+            segment_polygon = segment_polygon - np.array(window[:2])
+            segment_bbox_window = [segment_bbox[0] - window[0], segment_bbox[1] - window[1],
+                                   segment_bbox[2] - window[0], segment_bbox[3] - window[1]]
+        else:
+            # segment entirely outside the parent image
+            parent_window = parent_image
+            segment_bbox_window = segment_bbox
         # create a mask from the segment polygon:
-        segment_image = image_from_polygon(parent_image, segment_polygon, **kwargs)
+        segment_image = image_from_polygon(parent_window, segment_polygon, **kwargs)
         # crop to bbox:
-        segment_image = crop_image(segment_image, box=segment_bbox)
+        segment_image = crop_image(segment_image, box=segment_bbox_window)
     else:
         segment_image = parent_image
     # subtract offset from parent in affine coordinate transform:
@@ -1215,3 +1651,157 @@ def _scale(log, name, factor, segment_image, segment_coords, segment_xywh, **kwa
                                              # slowest, but highest quality:
                                              Image.BICUBIC)
     return segment_image, segment_coords, segment_xywh
+
+# bits per pixel of the raw (uncompressed) pixel formats which can be decoded partially
+RAW_MODE_BITS = {'1': 1, '1;I': 1, 'L': 8, 'L;I': 8, 'P': 8, 'LA': 16, 'I;16': 16, 'I;16B': 16, 'I;16N': 16,
+                 'RGB': 24, 'RGBA': 32, 'RGBX': 32, 'CMYK': 32}
+
+# OpenCV TIFF compression schemes for the PIL options
+CV2_TIFF_COMPRESSION = {None: 1, 'raw': 1, 'tiff_lzw': 5, 'tiff_adobe_deflate': 8}
+
+# image modes which can be encoded as PNM (PBM/PGM/PPM)
+PNM_MODES = ('1', 'L', 'RGB')
+
+def _image_encoding(image, mimetype, file_grp, profile=None):
+    """
+    Determine how to encode an image.
+
+    Args:
+        image (PIL.Image or numpy.ndarray): image to be saved
+        mimetype (string): requested MIME type
+        file_grp (string): `@USE` of the METS `fileGrp` to save to
+    Keyword Args:
+        profile (string): name of the profile in :py:data:`ocrd_utils.IMAGE_ENCODING_PROFILES`
+            (by default the first matching ``file_grp`` in ``OCRD_IMAGE_ENCODING``)
+
+    Profiles may change the MIME type (only if the image mode can be represented, otherwise
+    the requested MIME type is encoded with the ``fast`` profile).
+
+    Returns:
+        a tuple of the MIME type and the PIL save options
+    """
+    if profile is None:
+        profile = next((profile for pattern, profile in config.OCRD_IMAGE_ENCODING
+                        if fnmatchcase(file_grp, pattern)), 'default')
+    encodings = IMAGE_ENCODING_PROFILES[profile]
+    options = dict(encodings.get(mimetype, encodings.get('*', {})))
+    bilevel_options = options.pop('1', {})
+    mode = _array_mode(image) if isinstance(image, np.ndarray) else image.mode
+    if mode == '1':
+        options.update(bilevel_options)
+    encode_mimetype = options.pop('mimetype', mimetype)
+    if encode_mimetype == 'image/x-portable-anymap' and mode not in PNM_MODES:
+        return _image_encoding(image, mimetype, file_grp, profile='fast')
+    return encode_mimetype, options
+
+def _array_mode(array):
+    if array.dtype == bool:
+        return '1'
+    if array.dtype != np.uint8:
+        return None
+    if array.ndim == 2:
+        return 'L'
+    return {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}.get(array.shape[2])
+
+def _cv2_params(mimetype, options):
+    """OpenCV encoder parameters equivalent to the PIL save options (or None if there are none)"""
+    if mimetype == 'image/png':
+        return [IMWRITE_PNG_COMPRESSION, options.get('compress_level', 6)]
+    if mimetype == 'image/tiff' and options.get('compression') in CV2_TIFF_COMPRESSION:
+        return [IMWRITE_TIFF_COMPRESSION, CV2_TIFF_COMPRESSION[options.get('compression')]]
+    if mimetype == 'image/jpeg':
+        return [IMWRITE_JPEG_QUALITY, options.get('quality', 75)]
+    if mimetype == 'image/x-portable-anymap':
+        return [IMWRITE_PXM_BINARY, 1]
+    return None
+
+def _update_file_location(f, url, local_filename):
+    # only touch the METS where something changed
+    if url != f.url:
+        f.url = url
+    if local_filename != f.local_filename:
+        f.local_filename = local_filename
+
+def _encode_image(image, mimetype, options=None):
+    if isinstance(image, np.ndarray):
+        return _encode_array(image, mimetype, options or {})
+    image_bytes = io.BytesIO()
+    image.save(image_bytes, format=MIME_TO_PIL[mimetype], **(options or {}))
+    return image_bytes.getvalue()
+
+def _write_image(filename, image, mimetype, options):
+    _write_file(filename, _encode_image(image, mimetype, options))
+
+def _write_file(filename, content):
+    with open(filename, 'wb') as f:
+        if isinstance(content, str):
+            content = bytes(content, 'utf-8')
+        f.write(content)
+
+def _encode_array(array, mimetype, options):
+    params = _cv2_params(mimetype, options)
+    if (params is None or array.dtype != np.uint8 or
+        array.ndim > 2 and array.shape[2] not in (3, 4) or
+        mimetype in ('image/jpeg', 'image/x-portable-anymap') and array.ndim > 2 and array.shape[2] == 4):
+        # bilevel, gray+alpha or formats OpenCV cannot write like PIL
+        image_bytes = io.BytesIO()
+        Image.fromarray(array).save(image_bytes, format=MIME_TO_PIL[mimetype], **options)
+        return image_bytes.getvalue()
+    if array.ndim > 2:
+        array = cvtColor(array, COLOR_RGB2BGR if array.shape[2] == 3 else COLOR_RGBA2BGRA)
+    _, encoded = imencode(MIME_TO_EXT[mimetype], array, params)
+    return encoded.tobytes()
+
+def _size(image):
+    if isinstance(image, np.ndarray):
+        return image.shape[1], image.shape[0]
+    return image.size
+
+def _clip_box(box, size):
+    x0, y0, x1, y1 = box
+    return (min(x0, size[0]), min(y0, size[1]), min(x1, size[0]), min(y1, size[1]))
+
+def _restrict_decoding(image, box):
+    """
+    Restrict decoding of the (opened, but not yet loaded) ``image`` to the part needed for ``box``
+    by rewriting its tiles: for uncompressed rasters (e.g. TIFF strips or tiles), only the rows and
+    (byte-aligned) columns of the box are read; for non-interlaced PNG, decoding stops after the last row.
+    Other formats (like JPEG or compressed TIFF, which libtiff decodes at once) are left as they are.
+
+    Returns ``box`` relative to the part that will be decoded.
+    """
+    x0, y0, x1, y1 = box
+    if x0 >= x1 or y0 >= y1 or not image.tile:
+        return box
+    tiles = [tuple(tile)[:4] for tile in image.tile]
+    if (len(tiles) == 1 and tiles[0][0] == 'zip' and tiles[0][1] == (0, 0) + image.size
+            and not image.info.get('interlace')):
+        # rows are decoded sequentially, so only the upper part of the image is needed
+        image._size = (image.width, y1) # pylint: disable=protected-access
+        image.tile = [('zip', (0, 0, image.width, y1)) + tiles[0][2:]]
+        return box
+    rawmodes = set()
+    for codec, _, _, args in tiles:
+        if not isinstance(args, tuple):
+            args = (args,)
+        if codec != 'raw' or args[0] not in RAW_MODE_BITS or (len(args) > 2 and args[2] != 1):
+            return box
+        rawmodes.add(args[0])
+    if len(rawmodes) > 1:
+        return box
+    rawmode = rawmodes.pop()
+    bits = RAW_MODE_BITS[rawmode]
+    if bits % 8:
+        # columns are not byte-aligned, so keep full rows
+        x0, x1 = 0, image.width
+    restricted = []
+    for _, (tx0, ty0, tx1, ty1), offset, args in tiles:
+        ix0, iy0, ix1, iy1 = max(tx0, x0), max(ty0, y0), min(tx1, x1), min(ty1, y1)
+        if ix0 >= ix1 or iy0 >= iy1:
+            continue
+        stride = args[1] if isinstance(args, tuple) and len(args) > 1 and args[1] else ((tx1 - tx0) * bits + 7) // 8
+        offset += (iy0 - ty0) * stride + (ix0 - tx0) * bits // 8
+        restricted.append(('raw', (ix0 - x0, iy0 - y0, ix1 - x0, iy1 - y0), offset, (rawmode, stride, 1)))
+    image._size = (x1 - x0, y1 - y0) # pylint: disable=protected-access
+    image.tile = restricted
+    return (box[0] - x0, box[1] - y0, box[2] - x0, box[3] - y0)
@@ -0,0 +1,76 @@
+"""
+Cache of image metadata for :py:class:`ocrd.workspace.Workspace`
+"""
+from json import dump, load
+from os import path, stat
+from threading import Lock
+from typing import Optional
+
+from ocrd_models import OcrdExif
+from ocrd_utils import atomic_write, getLogger
+
+class WorkspaceExifCache():
+    """
+    Image metadata (:py:class:`ocrd_models.ocrd_exif.OcrdExif`) of image files, valid as long as
+    their modification time and size are unchanged. Thread-safe.
+    If :py:attr:`filename` is given, entries are loaded from and :py:meth:`save` d to that JSON file.
+    """
+
+    def __init__(self, directory : str, filename : Optional[str] = None) -> None:
+        """
+        Args:
+            directory (str): workspace directory (entries within are stored by relative path)
+            filename (str): JSON file to persist the entries in
+        """
+        self.directory = path.abspath(directory)
+        self.filename = filename
+        self.changed = False
+        self._entries = {}
+        self._lock = Lock()
+        if filename and path.exists(filename):
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    self._entries = load(f)
+            except (OSError, ValueError) as err:
+                getLogger('ocrd.workspace_exif_cache').warning("Ignoring invalid image metadata cache '%s': %s", filename, err)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, filename : str) -> str:
+        filename = path.abspath(filename)
+        if filename.startswith(self.directory + path.sep):
+            return path.relpath(filename, self.directory)
+        return filename
+
+    def get(self, filename : str) -> Optional[OcrdExif]:
+        """
+        Get the metadata of image file ``filename`` (if known and the file is unchanged), or ``None``
+        """
+        st = stat(filename)
+        with self._lock:
+            entry = self._entries.get(self._key(filename))
+        if entry is None or entry['mtime_ns'] != st.st_mtime_ns or entry['size'] != st.st_size:
+            return None
+        return OcrdExif.from_dict(entry['exif'])
+
+    def put(self, filename : str, exif : OcrdExif) -> None:
+        """
+        Store the metadata of image file ``filename``
+        """
+        st = stat(filename)
+        with self._lock:
+            self._entries[self._key(filename)] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                                                  'exif': exif.to_dict()}
+            self.changed = True
+
+    def save(self) -> None:
+        """
+        Write all entries to :py:attr:`filename` (if any, and if anything changed)
+        """
+        if not self.filename or not self.changed:
+            return
+        with self._lock:
+            with atomic_write(self.filename) as f:
+                dump(self._entries, f)
+            self.changed = False
@@ -0,0 +1,138 @@
+"""
+Memory-bounded cache of decoded images for :py:class:`ocrd.workspace.Workspace`
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+from PIL import Image
+
+def image_nbytes(image : Any) -> int:
+    """
+    Approximate memory size of a ``PIL.Image``, ``numpy.ndarray`` or tuple of those (in bytes)
+    """
+    if isinstance(image, np.ndarray):
+        return image.nbytes
+    if isinstance(image, Image.Image):
+        # Pillow stores single-band 8-bit images with 1 byte per pixel, everything else with 4 (or 2 for I;16)
+        if image.mode in ('1', 'L', 'P'):
+            pixelsize = 1
+        elif image.mode.startswith('I;16'):
+            pixelsize = 2
+        else:
+            pixelsize = 4
+        return image.width * image.height * pixelsize
+    if isinstance(image, (tuple, list)):
+        return sum(image_nbytes(val) for val in image)
+    return 0
+
+def shared_image(image : Any) -> Any:
+    """
+    Copy-on-write view of a cached ``PIL.Image``: shares the pixel data with :py:attr:`image`,
+    but any in-place change (``paste``, ``putalpha``, ``ImageDraw`` etc.) copies it first.
+    (``numpy.ndarray`` views are made read-only instead.)
+    """
+    if isinstance(image, Image.Image):
+        view = image._new(image.im) # pylint: disable=protected-access
+        view.readonly = 1
+        if hasattr(image, 'filename'):
+            view.filename = image.filename
+        return view
+    if isinstance(image, np.ndarray):
+        view = image.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(image, tuple):
+        return tuple(shared_image(val) for val in image)
+    return image
+
+class WorkspaceImageCache():
+    """
+    Least-recently-used cache of decoded images (or derived images), bounded by their size in bytes.
+    Thread-safe. Values are stored as given, so callers must hand out :py:func:`shared_image` views.
+    """
+
+    def __init__(self, max_bytes : int) -> None:
+        """
+        Args:
+            max_bytes (int): maximum total size of all cached images (``0`` disables the cache)
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries : OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return 'WorkspaceImageCache[entries=%d,bytes=%d/%d,hit_rate=%.2f]' % (
+            len(self), self.nbytes, self.max_bytes, self.hit_rate)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of :py:meth:`get` calls answered from the cache so far
+        """
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Number of ``entries``, their ``bytes``, and the ``hits``, ``misses``, ``evictions`` and ``hit_rate`` so far
+        """
+        return {'entries': len(self), 'bytes': self.nbytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions, 'hit_rate': self.hit_rate}
+
+    def get(self, key : Hashable) -> Optional[Any]:
+        """
+        Get the value for :py:attr:`key` (marking it as most recently used), or ``None``
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key : Hashable, value : Any, nbytes : Optional[int] = None) -> None:
+        """
+        Store :py:attr:`value` (of size :py:attr:`nbytes`, by default :py:func:`image_nbytes`)
+        for :py:attr:`key`, evicting the least recently used entries until it fits.
+        Values larger than the cache are not stored at all.
+        """
+        if nbytes is None:
+            nbytes = image_nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            while self._entries and self.nbytes + nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+
+    def discard(self, predicate) -> None:
+        """
+        Remove all entries whose key satisfies :py:attr:`predicate`
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        """
+        Remove all entries
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
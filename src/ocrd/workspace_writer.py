@@ -0,0 +1,80 @@
+"""
+Write-behind of files for :py:class:`ocrd.workspace.Workspace`
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, Dict, List, Optional
+
+from ocrd_utils import getLogger
+
+class WorkspaceWriter():
+    """
+    Bounded thread pool which writes files in the background, so encoding and disk I/O
+    do not block processing. Errors are raised at the next barrier (:py:meth:`wait`).
+    """
+
+    def __init__(self, max_workers : int, max_pending : Optional[int] = None) -> None:
+        """
+        Args:
+            max_workers (int): number of threads writing files
+            max_pending (int): maximum number of files queued or being written
+                (further writes block until one is finished), by default twice ``max_workers``
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocrd_workspace_writer')
+        self._slots = BoundedSemaphore(max_pending or 2 * max_workers)
+        self._lock = Lock()
+        self._futures : List[Future] = []
+        self._pending : Dict[str, Future] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for future in self._futures if not future.done())
+
+    def submit(self, filename : str, write : Callable[..., Any], *args) -> None:
+        """
+        Call ``write(filename, *args)`` in the background, after any pending write of the same
+        ``filename``, blocking while the maximum number of writes is pending.
+        """
+        self.wait_for(filename)
+        self._slots.acquire()
+        future = self._executor.submit(write, filename, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._futures.append(future)
+            self._pending[filename] = future
+
+    def wait_for(self, filename : str) -> None:
+        """
+        Wait until a pending write of ``filename`` (if any) has finished (so it can be read)
+        """
+        with self._lock:
+            future = self._pending.get(filename)
+        if future is not None:
+            wait([future])
+
+    def wait(self) -> None:
+        """
+        Barrier: wait until all pending writes have finished, and raise the first
+        error of any of them since the last barrier (logging the others).
+        """
+        log = getLogger('ocrd.workspace_writer')
+        with self._lock:
+            futures, self._futures = self._futures, []
+            self._pending = {filename: future for filename, future in self._pending.items()
+                             if future not in futures}
+        wait(futures)
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        for error in errors[1:]:
+            log.error("Failed to write file in the background: %s", error)
+        if errors:
+            raise errors[0]
+
+    def shutdown(self) -> None:
+        """
+        Wait for all pending writes (see :py:meth:`wait`) and stop the threads
+        """
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
@@ -22,23 +22,40 @@ __all__ = [
     'exif_from_filename',
     'page_from_file',
     'page_from_image',
+    'probe_image',
 ]
 
 
-def exif_from_filename(image_filename):
+def probe_image(image_filename):
     """
     Create :py:class:`~ocrd_models.ocrd_exif.OcrdExif`
-    by opening an image file with PIL and reading its metadata.
+    (dimensions, mode, pixel density, number of frames etc.)
+    by reading only the header of an image file with PIL,
+    without decoding the image data.
 
     Arguments:
         image_filename (str): Local image path name (relative to workspace).
     """
     if image_filename is None:
-        raise Exception("Must pass 'image_filename' to 'exif_from_filename'")
+        raise Exception("Must pass 'image_filename' to 'probe_image'")
+    # Image.open only parses the header, pixels are decoded on load()
     with Image.open(image_filename) as pil_img:
         ocrd_exif = OcrdExif(pil_img)
     return ocrd_exif
 
+def exif_from_filename(image_filename):
+    """
+    Create :py:class:`~ocrd_models.ocrd_exif.OcrdExif`
+    by opening an image file with PIL and reading its metadata
+    (same as :py:func:`probe_image`).
+
+    Arguments:
+        image_filename (str): Local image path name (relative to workspace).
+    """
+    if image_filename is None:
+        raise Exception("Must pass 'image_filename' to 'exif_from_filename'")
+    return probe_image(image_filename)
+
 def page_from_image(input_file, with_tree=False):
     """
     Create :py:class:`~ocrd_models.ocrd_page.OcrdPage`
@@ -56,7 +73,7 @@ def page_from_image(input_file, with_tree=False):
         raise ValueError("input_file must have 'local_filename' property")
     if not Path(input_file.local_filename).exists():
         raise FileNotFoundError("File not found: '%s' (%s)" % (input_file.local_filename, input_file))
-    exif = exif_from_filename(input_file.local_filename)
+    exif = probe_image(input_file.local_filename)
     now = datetime.now()
     pcgts = PcGtsType(
         Metadata=MetadataType(
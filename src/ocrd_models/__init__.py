@@ -3,7 +3,11 @@ APIs and schemas for various file formats in the OCR domain.
 """
 from .ocrd_agent import OcrdAgent, ClientSideOcrdAgent
 from .ocrd_exif import OcrdExif
-from .ocrd_file import OcrdFile, ClientSideOcrdFile
+from .ocrd_file import OcrdFile, ClientSideOcrdFile, OcrdFileRecord
 from .ocrd_mets import OcrdMets
+from .ocrd_mets_index import OcrdMetsIndex
+from .ocrd_mets_journal import OcrdMetsJournal
+from .ocrd_mets_readonly import ReadOnlyOcrdMets
+from .ocrd_mets_sqlite import SqliteOcrdMets
 from .ocrd_xml_base import OcrdXmlDocument
 from .report import ValidationReport
@@ -6,7 +6,7 @@ from math import sqrt
 from io import BytesIO
 from subprocess import run, PIPE
 from shutil import which
-from ocrd_utils import getLogger
+from ocrd_utils import getLogger, config
 
 class OcrdExif():
     """Represents technical image metadata.
@@ -32,17 +32,38 @@ class OcrdExif():
         """
         Arguments:
             img (`PIL.Image`): PIL image technical metadata is about.
+
+        The pixel density is read from the image header (see :py:meth:`run_pil`). Only if the
+        header has none and ``OCRD_EXIF_IDENTIFY`` is set, ImageMagick ``identify`` is run instead.
         """
         #  print(img.__dict__)
         self.width = img.width
         self.height = img.height
         self.photometricInterpretation = img.mode
         self.n_frames = img.n_frames if 'n_frames' in img.__dict__ else 1
-        if which('identify'):
-            self.run_identify(img)
-        else:
-            getLogger('ocrd.exif').warning("ImageMagick 'identify' not available, Consider installing ImageMagick for more robust pixel density estimation")
-            self.run_pil(img)
+        for prop in ['compression', 'photometric_interpretation']:
+            setattr(self, prop, img.info[prop] if prop in img.info else None)
+        if not self.run_pil(img) and config.OCRD_EXIF_IDENTIFY:
+            if which('identify'):
+                self.run_identify(img)
+            else:
+                getLogger('ocrd.exif').warning("ImageMagick 'identify' not available, cannot estimate pixel density of %s",
+                                               getattr(img, 'filename', None) or 'image')
+
+    @classmethod
+    def from_dict(cls, properties):
+        """
+        Create from the properties of :py:meth:`to_dict` (without an image).
+        """
+        exif = cls.__new__(cls)
+        exif.__dict__.update(properties)
+        return exif
+
+    def to_dict(self):
+        """
+        All properties as JSON-serializable ``dict``.
+        """
+        return dict(self.__dict__)
 
     def run_identify(self, img):
         for prop in ['compression', 'photometric_interpretation']:
@@ -71,30 +92,40 @@ class OcrdExif():
         self.resolution = round(sqrt(self.xResolution * self.yResolution))
 
     def run_pil(self, img):
-        if img.format in ('TIFF', 'PNG') and 'dpi' in img.info:
-            self.xResolution = int(img.info['dpi'][0])
-            self.yResolution = int(img.info['dpi'][1])
-            if img.format == 'TIFF':
-                self.resolutionUnit = 'cm' if img.tag.get(296) == 3 else 'inches'
-            else:
-                self.resolutionUnit = 'inches'
-        elif img.format == 'JPEG' and 'jfif_density' in img.info:
-            self.xResolution = img.info['jfif_density'][0]
-            self.yResolution = img.info['jfif_density'][1]
-            self.resolutionUnit = 'cm' if img.info['jfif_unit'] == 2 else 'inches'
+        """
+        Read the pixel density from the image header, in the unit stored there
+        (like ``identify`` does): TIFF ``XResolution``/``YResolution``/``ResolutionUnit``,
+        PNG ``pHYs`` (pixels per cm, or the aspect ratio if the unit is unknown),
+        JPEG JFIF density (or EXIF resolution) and others as far as PIL reads them.
+        Falls back to ``1`` pixel per inch.
+
+        Returns:
+            whether the header contained the pixel density
+        """
+        xres = yres = None
+        unit = 'inches'
+        if img.format == 'TIFF' and 282 in img.tag_v2 and 283 in img.tag_v2:
+            xres, yres = img.tag_v2[282], img.tag_v2[283]
+            unit = 'cm' if img.tag_v2.get(296) == 3 else 'inches'
+        elif img.format == 'PNG' and 'dpi' in img.info:
+            # PIL converts pixels per meter to dpi
+            xres, yres = (round(val / 2.54, 3) for val in img.info['dpi'])
+            unit = 'cm'
         elif img.format == 'PNG' and 'aspect' in img.info:
-            self.xResolution = img.info['aspect'][0]
-            self.yResolution = img.info['aspect'][1]
-            self.resolutionUnit = 'inches'
-        else:
-            #  if img.format == 'JPEG2000':
-            #      import sys
-            #      print('JPEG 2000 not supported yet :(', file=sys.stderr)
-            self.xResolution = 1
-            self.yResolution = 1
-            self.resolutionUnit = 'inches'
-        #  print('format=%s type=%s' % (img.format, type(self.xResolution))
+            xres, yres = img.info['aspect']
+        elif img.format == 'JPEG' and 'jfif_density' in img.info:
+            xres, yres = img.info['jfif_density']
+            unit = 'cm' if img.info.get('jfif_unit') == 2 else 'inches'
+        elif 'dpi' in img.info:
+            xres, yres = img.info['dpi']
+        found = xres is not None
+        if not found:
+            xres = yres = 1
+        self.xResolution = max(int(float(xres)), 1)
+        self.yResolution = max(int(float(yres)), 1)
+        self.resolutionUnit = unit
         self.resolution = round(sqrt(self.xResolution * self.yResolution))
+        return found
 
     def to_xml(self):
         """
@@ -1,8 +1,9 @@
 """
 API to ``mets:file``
 """
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, List, NamedTuple, Optional, Union
 
 from ocrd_utils import deprecation_warning
 
@@ -92,6 +93,14 @@ class OcrdFile():
             return ''
         return Path(self.local_filename).name[:-len(self.extension)]
 
+    def _journal_entry(self, attr : str, value : Any):
+        """
+        Record setting :py:attr:`attr` to :py:attr:`value` in the journal of the containing METS, if any
+        """
+        if self.mets is None:
+            return nullcontext()
+        return self.mets._journal_entry('update_file', self.ID, attr, value)
+
     @property
     def ID(self) -> str:
         """
@@ -109,10 +118,13 @@ class OcrdFile():
         if self.mets is None:
             raise Exception("OcrdFile %s has no member 'mets' pointing to parent OcrdMets" % self)
         old_id = self.ID
-        self._el.set('ID', ID)
-        # also update the references in the physical structmap
-        for pageId in self.mets.remove_physical_page_fptr(fileId=old_id):
-            self.pageId = pageId
+        with self._journal_entry('ID', ID):
+            self.mets._unindex_file(self._el)
+            self._el.set('ID', ID)
+            self.mets._index_file(self._el)
+            # also update the references in the physical structmap
+            for pageId in self.mets.remove_physical_page_fptr(fileId=old_id):
+                self.pageId = pageId
 
     @property
     def pageId(self) -> str:
@@ -155,7 +167,12 @@ class OcrdFile():
         """
         if mimetype is None:
             return
-        self._el.set('MIMETYPE', mimetype)
+        with self._journal_entry('mimetype', mimetype):
+            if self.mets is not None:
+                self.mets._unindex_file(self._el)
+            self._el.set('MIMETYPE', mimetype)
+            if self.mets is not None:
+                self.mets._index_file(self._el)
 
     @property
     def fileGrp(self) -> str:
@@ -183,14 +200,19 @@ class OcrdFile():
         Set the remote/original URL ``@xlink:href`` of this ``mets:file`` to :py:attr:`url`.
         """
         el_FLocat = self._el.find('mets:FLocat[@LOCTYPE="URL"]', NS)
-        if url is None:
-            if el_FLocat:
-                self._el.remove(el_FLocat)
-            return
-        if el_FLocat is None:
-            el_FLocat = ET.SubElement(self._el, TAG_METS_FLOCAT)
-        el_FLocat.set("{%s}href" % NS["xlink"], url)
-        el_FLocat.set("LOCTYPE", "URL")
+        with self._journal_entry('url', url):
+            if self.mets is not None:
+                self.mets._unindex_file(self._el)
+            if url is None:
+                if el_FLocat is not None:
+                    self._el.remove(el_FLocat)
+            else:
+                if el_FLocat is None:
+                    el_FLocat = ET.SubElement(self._el, TAG_METS_FLOCAT)
+                el_FLocat.set("{%s}href" % NS["xlink"], url)
+                el_FLocat.set("LOCTYPE", "URL")
+            if self.mets is not None:
+                self.mets._index_file(self._el)
 
     @property
     def local_filename(self) -> Optional[str]:
@@ -208,17 +230,20 @@ class OcrdFile():
         Set the local/cached ``@xlink:href`` of this ``mets:file`` to :py:attr:`local_filename`.
         """
         el_FLocat = self._el.find('mets:FLocat[@LOCTYPE="OTHER"][@OTHERLOCTYPE="FILE"]', NS)
-        if not fname:
-            if el_FLocat is not None:
-                self._el.remove(el_FLocat)
-            return
-        else:
-            fname = str(fname)
-        if el_FLocat is None:
-            el_FLocat = ET.SubElement(self._el, TAG_METS_FLOCAT)
-        el_FLocat.set("{%s}href" % NS["xlink"], fname)
-        el_FLocat.set("LOCTYPE", "OTHER")
-        el_FLocat.set("OTHERLOCTYPE", "FILE")
+        with self._journal_entry('local_filename', str(fname) if fname else None):
+            if self.mets is not None:
+                self.mets._unindex_file(self._el)
+            if not fname:
+                if el_FLocat is not None:
+                    self._el.remove(el_FLocat)
+            else:
+                if el_FLocat is None:
+                    el_FLocat = ET.SubElement(self._el, TAG_METS_FLOCAT)
+                el_FLocat.set("{%s}href" % NS["xlink"], str(fname))
+                el_FLocat.set("LOCTYPE", "OTHER")
+                el_FLocat.set("OTHERLOCTYPE", "FILE")
+            if self.mets is not None:
+                self.mets._index_file(self._el)
 
 
 class ClientSideOcrdFile:
@@ -266,3 +291,48 @@ class ClientSideOcrdFile:
             for k in ['fileGrp', 'ID', 'mimetype', 'url', 'local_filename']
         ])
         return '<ClientSideOcrdFile %s]/>' % (props)
+
+
+class OcrdFileRecord(NamedTuple):
+    """
+    Compact, immutable snapshot of a ``mets:file`` which provides the same (read-only)
+    interface as :py:class:`ocrd_models.ocrd_file.OcrdFile`, without holding on to
+    the XML element or the containing :py:class:`ocrd_models.ocrd_mets.OcrdMets`.
+    """
+    ID : str
+    fileGrp : str
+    mimetype : Optional[str] = None
+    pageId : Optional[str] = None
+    url : str = ''
+    local_filename : Optional[str] = None
+
+    def __str__(self):
+        props = ', '.join([
+            '='.join([k, str(getattr(self, k)) if getattr(self, k) else '---'])
+            for k in ['fileGrp', 'ID', 'mimetype', 'url', 'local_filename']
+        ])
+        return '<OcrdFileRecord %s]/>' % (props)
+
+    @property
+    def basename(self) -> str:
+        """
+        Get the ``.name`` of the local file
+        """
+        if not self.local_filename:
+            return ''
+        return Path(self.local_filename).name
+
+    @property
+    def extension(self) -> str:
+        if not self.local_filename:
+            return ''
+        return ''.join(Path(self.local_filename).suffixes)
+
+    @property
+    def basename_without_extension(self) -> str:
+        """
+        Get the ``os.path.basename`` of the local file, if any, with extension removed.
+        """
+        if not self.local_filename:
+            return ''
+        return Path(self.local_filename).name[:-len(self.extension)]
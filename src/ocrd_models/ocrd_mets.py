@@ -1,10 +1,16 @@
 """
 API to METS
 """
+from bisect import bisect_left
+from contextlib import contextmanager
 from datetime import datetime
+from functools import wraps
+import json
+from os import PathLike, fspath
 import re
+from threading import RLock
 from lxml import etree as ET
-from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 from ocrd_utils import (
     getLogger,
@@ -23,6 +29,7 @@ from .constants import (
     TAG_METS_FILE,
     TAG_METS_FILEGRP,
     TAG_METS_FILESEC,
+    TAG_METS_FLOCAT,
     TAG_METS_FPTR,
     TAG_METS_METSHDR,
     TAG_METS_STRUCTMAP,
@@ -33,10 +40,39 @@ from .constants import (
 )
 
 from .ocrd_xml_base import OcrdXmlDocument, ET      # type: ignore
-from .ocrd_file import OcrdFile
+from .ocrd_file import OcrdFile, OcrdFileRecord
 from .ocrd_agent import OcrdAgent
+from .ocrd_mets_index import OcrdMetsIndex
 
 REGEX_PREFIX_LEN = len(REGEX_PREFIX)
+REGEX_NUMERIC_SUFFIX = re.compile(r'(.*?)(\d+)')
+
+def _journal_encode(obj : Any) -> Any:
+    """
+    Encode non-JSON arguments of journaled changes: files are referenced by ``@ID``,
+    ``mets:fileGrp`` elements by ``@USE``, paths as strings. Anything else cannot be
+    replayed and raises ``TypeError``.
+    """
+    if isinstance(obj, OcrdFile):
+        return {'mets:file': obj.ID}
+    if isinstance(obj, ET._Element) and obj.tag == TAG_METS_FILE:
+        return {'mets:file': obj.get('ID')}
+    if isinstance(obj, ET._Element) and obj.tag == TAG_METS_FILEGRP:
+        return obj.get('USE')
+    if isinstance(obj, PathLike):
+        return fspath(obj)
+    raise TypeError("Cannot record %r in the METS journal" % obj)
+
+def journaled(method : Callable) -> Callable:
+    """
+    Decorator for :py:class:`OcrdMets` methods whose (outermost) calls are recorded in the journal
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._journal_entry(method.__name__, *args, **kwargs):
+            return method(self, *args, **kwargs)
+    wrapper.journaled = True # type: ignore
+    return wrapper
 
 class OcrdMets(OcrdXmlDocument):
     """
@@ -59,6 +95,32 @@ class OcrdMets(OcrdXmlDocument):
     # The inner dictionary's Key: 'fptr.FILEID'
     # The inner dictionary's Value: a 'fptr' object at some memory location
     _fptr_cache : Dict[str, Dict[str, ET._Element]]
+    # Secondary indexes for the files (mets:file) - two nested dictionaries each
+    # The outer dictionary's Key: 'div.ID' (_page_file_cache), 'file.MIMETYPE' (_mimetype_cache),
+    #   'FLocat[@LOCTYPE="URL"].href' (_url_cache) or 'FLocat[@LOCTYPE="OTHER"].href' (_local_filename_cache)
+    # The outer dictionary's Value: Inner dictionary
+    # The inner dictionary's Key: 'file.ID' (_page_file_cache, as referenced by 'fptr.FILEID')
+    #   or ('fileGrp.USE', 'file.ID') (the others, as IDs may repeat in different fileGrps)
+    # The inner dictionary's Value: a 'file' object at some memory location
+    _page_file_cache : Dict[str, Dict[str, ET._Element]]
+    _mimetype_cache : Dict[str, Dict[Tuple[str, str], ET._Element]]
+    _url_cache : Dict[str, Dict[Tuple[str, str], ET._Element]]
+    _local_filename_cache : Dict[str, Dict[Tuple[str, str], ET._Element]]
+    # Changes recorded since the last pop_journal (JSON-encoded [method, args, kwargs]),
+    # None if not recording
+    _journal : Optional[List[str]] = None
+    # Nesting level of journaled calls (only the outermost call is recorded)
+    _journal_depth : int = 0
+    # Number of changes so far (incremented after each outermost journaled call)
+    _generation : int = 0
+    # Read-only snapshot of the last generation requested, see snapshot()
+    _snapshot : Optional[Any] = None
+    # Changes since the last snapshot ('files' and 'pages' by @ID in the order of their first
+    # change or re-creation, 'header' for agents and identifiers, 'removed' and 'recreated' files
+    # and pages as (key, @ID)), None if the next snapshot must be taken from scratch
+    _snapshot_changes : Optional[Dict[str, Any]] = None
+    # Whether snapshots can be updated from the caches and _snapshot_changes
+    _incremental_snapshots : bool = True
 
     @staticmethod
     def empty_mets(now : Optional[str] = None, cache_flag : bool = False):
@@ -76,6 +138,8 @@ class OcrdMets(OcrdXmlDocument):
         """
         """
         super(OcrdMets, self).__init__(**kwargs)
+        # held by the (single) writer while changing and while taking a snapshot
+        self._lock = RLock()
 
         # XXX If the environment variable OCRD_METS_CACHING is set to "true",
         # then enable caching, if "false", disable caching, overriding the
@@ -89,7 +153,208 @@ class OcrdMets(OcrdXmlDocument):
         # If cache is enabled
         if self._cache_flag:
             self._initialize_caches()
-            self._refresh_caches()
+            if kwargs.get('filename') and config.OCRD_METS_INDEX:
+                index = OcrdMetsIndex(kwargs['filename'])
+                data = index.load()
+                if data is None or not self._fill_caches_from_index(data):
+                    self._refresh_caches()
+                    index.save(self._index_data())
+            else:
+                self._refresh_caches()
+
+    @contextmanager
+    def _journal_entry(self, op : str, *args, **kwargs) -> Iterator[None]:
+        """
+        Record the change :py:attr:`op` with its arguments in the journal once it has succeeded,
+        unless it is part of another journaled change. The change holds the lock of this METS
+        and starts a new :py:attr:`generation`.
+        """
+        with self._lock:
+            entry = None
+            if self._journal is not None and not self._journal_depth:
+                entry = json.dumps([op, args, kwargs], default=_journal_encode)
+            self._journal_depth += 1
+            try:
+                yield
+            finally:
+                self._journal_depth -= 1
+                if not self._journal_depth:
+                    self._generation += 1
+            if entry is not None and self._journal is not None:
+                self._journal.append(entry)
+
+    @property
+    def generation(self) -> int:
+        """
+        Number of changes to this METS so far, e.g. to validate results cached by clients.
+        Increases monotonically with each change (even if it failed).
+        """
+        return self._generation
+
+    def snapshot(self):
+        """
+        Get an immutable :py:class:`ocrd_models.ocrd_mets_readonly.ReadOnlyOcrdMets` view of the
+        current :py:attr:`generation`, which can be queried concurrently (without locking) while
+        this METS is changed by another thread. The snapshot is taken on the first request after
+        a change and shared by all readers until the next change. With caching enabled, it is
+        updated from the previous snapshot, sharing everything but the fileGrps and pages changed.
+        """
+        from .ocrd_mets_readonly import ReadOnlyOcrdMets # pylint: disable=import-outside-toplevel
+        with self._lock:
+            if self._snapshot is None or self._snapshot.generation != self._generation:
+                changes = self._snapshot_changes
+                if self._snapshot is not None and changes is not None:
+                    self._snapshot = ReadOnlyOcrdMets.from_changes(self._snapshot, self, changes['files'], changes['pages'],
+                                                                   changes['header'], recreated=changes['recreated'],
+                                                                   generation=self._generation)
+                else:
+                    self._snapshot = ReadOnlyOcrdMets.from_index_data(self._index_data(), generation=self._generation)
+                if self._cache_flag and self._incremental_snapshots:
+                    self._snapshot_changes = {'files': {}, 'pages': {}, 'header': False, 'removed': set(), 'recreated': set()}
+            return self._snapshot
+
+    @contextmanager
+    def reading(self) -> Iterator['OcrdMets']:
+        """
+        Context for queries concurrent to changes: the current :py:meth:`snapshot` if that is
+        up to date or can be updated incrementally (with caching enabled), otherwise this METS
+        itself, locked against changes until the context is left (instead of a full snapshot).
+        """
+        with self._lock:
+            if self._snapshot_changes is None and (self._snapshot is None or self._snapshot.generation != self._generation):
+                yield self
+                return
+        yield self.snapshot()
+
+    def _snapshot_touch(self, files : Iterable[str] = (), pages : Iterable[str] = (), header : bool = False,
+                        added : bool = False, removed : bool = False) -> None:
+        """
+        Record the ``@ID`` of changed :py:attr:`files` and :py:attr:`pages` (or a change of the
+        agents or identifiers if :py:attr:`header`) for the next :py:meth:`snapshot`.
+        Files and pages :py:attr:`added` again after they were :py:attr:`removed` are moved
+        to the end, like in the document.
+        """
+        changes = self._snapshot_changes
+        if changes is None:
+            return
+        for key, ids in [('files', files), ('pages', pages)]:
+            for id_ in ids:
+                if removed:
+                    changes['removed'].add((key, id_))
+                elif added and (key, id_) in changes['removed']:
+                    changes['removed'].discard((key, id_))
+                    changes['recreated'].add((key, id_))
+                    changes[key].pop(id_, None)
+                changes[key].setdefault(id_)
+        changes['header'] |= header
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """
+        Context for changes which are reverted if it is left with an exception: with caching, to a
+        :py:meth:`snapshot` taken on entry (cf. :py:meth:`diff`), otherwise from the journal of the
+        changes (cf. :py:meth:`pop_journal`), which can only remove the files added again (changes
+        of an existing ``mets:file`` replaced with ``force`` and all other changes are kept).
+        """
+        # with caching, snapshots are updated incrementally (instead of taken from the whole document)
+        before = self.snapshot() if self._cache_flag and self._incremental_snapshots else None
+        file_groups = self.file_groups
+        journal, self._journal = self._journal, []
+        try:
+            yield
+        except BaseException:
+            # neither the changes nor their reversal need to be recorded
+            entries, self._journal = self._journal, None
+            try:
+                if before is None:
+                    self._revert_journal(entries, file_groups)
+                elif before.generation != self._generation:
+                    self.apply(self.diff(before))
+            finally:
+                self._journal = journal
+            raise
+        if journal is not None:
+            journal.extend(self._journal)
+        self._journal = journal
+
+    def _revert_journal(self, entries : List[str], file_groups : List[str]) -> None:
+        """
+        Remove the files added by the journal :py:attr:`entries` (and the fileGrps left empty
+        which are not in :py:attr:`file_groups`), warn about all other changes
+        """
+        log = getLogger('ocrd.models.ocrd_mets.savepoint')
+        added : Set[Tuple[str, str]] = set()
+        for op, args, kwargs in map(json.loads, entries):
+            if op == 'add_file':
+                added.add((args[0], kwargs['ID'] if 'ID' in kwargs else args[3]))
+            elif op == '_add_files':
+                added.update((record['fileGrp'], record['ID']) for record in args[0])
+            else:
+                log.warning("Cannot revert '%s' without caching", op)
+                continue
+            if kwargs.get('force'):
+                log.warning("Cannot restore files replaced by '%s' without caching", op)
+        # the file added last (for duplicate IDs with 'ignore')
+        files : Dict[Tuple[str, str], OcrdFile] = {}
+        for ocrd_file in self.find_files():
+            if (ocrd_file.fileGrp, ocrd_file.ID) in added:
+                files[ocrd_file.fileGrp, ocrd_file.ID] = ocrd_file
+        if files:
+            self.remove_files(list(files.values()))
+        for fileGrp in self.file_groups:
+            if fileGrp not in file_groups and not any(self.find_files(fileGrp=fileGrp)):
+                self.remove_file_group(fileGrp)
+
+    def start_journal(self) -> None:
+        """
+        Start recording all changes to this METS, to be retrieved with :py:meth:`pop_journal`.
+        """
+        if self._journal is None:
+            self._journal = []
+
+    def pop_journal(self) -> List[str]:
+        """
+        Return and forget the changes recorded since :py:meth:`start_journal` or the last call
+        (one JSON-encoded ``[method, args, kwargs]`` per change)
+        """
+        entries = self._journal or []
+        if self._journal is not None:
+            self._journal = []
+        return entries
+
+    def replay_journal(self, entries : List[str]) -> None:
+        """
+        Apply changes recorded by :py:meth:`pop_journal` (e.g. to recover from a crash
+        before they were saved to the METS file).
+        """
+        for entry in entries:
+            op, args, kwargs = json.loads(entry)
+            args = [self._journal_decode(arg) for arg in args]
+            kwargs = {key: self._journal_decode(val) for key, val in kwargs.items()}
+            if op == 'unique_identifier':
+                self.unique_identifier = args[0]
+            elif op == 'update_file':
+                setattr(self._journal_decode({'mets:file': args[0]}), args[1], args[2])
+            elif op in JOURNALED_METHODS:
+                getattr(self, op)(*args, **kwargs)
+            else:
+                raise ValueError("Invalid METS journal entry: %s" % entry)
+
+    def _journal_decode(self, arg : Any) -> Any:
+        if isinstance(arg, list) and arg and all(isinstance(val, dict) and list(val) == ['mets:file'] for val in arg):
+            # look up many files (e.g. of remove_files) in one pass
+            file_ids = {val['mets:file'] for val in arg}
+            files : Dict[str, OcrdFile] = {}
+            for ocrd_file in self.find_files():
+                if ocrd_file.ID in file_ids:
+                    files.setdefault(ocrd_file.ID, ocrd_file)
+            return [files.get(val['mets:file']) or self._journal_decode(val) for val in arg]
+        if isinstance(arg, dict) and list(arg) == ['mets:file']:
+            ocrd_file = next(self.find_files(ID=arg['mets:file']), None)
+            if ocrd_file is None:
+                raise FileNotFoundError("METS journal refers to non-existing file %s" % arg['mets:file'])
+            return ocrd_file
+        return arg
 
     def __str__(self) -> str:
         """
@@ -119,8 +384,7 @@ class OcrdMets(OcrdXmlDocument):
             self._file_cache[fileGrp_use] = {}
 
             for el_file in el_fileGrp:
-                file_id = el_file.get('ID')
-                self._file_cache[fileGrp_use].update({file_id: el_file})
+                self._index_file(el_file)
                 # log.info("File added to the cache: %s" % file_id)
 
         # Fill with pages
@@ -129,32 +393,207 @@ class OcrdMets(OcrdXmlDocument):
             return
         log = getLogger('ocrd.models.ocrd_mets._fill_caches-pages')
 
+        # Resolve the fptr/@FILEID to the mets:file elements for the page index
+        el_file_by_id = {file_id: el_file for id_to_file in self._file_cache.values()
+                         for file_id, el_file in id_to_file.items()}
+
         for el_div in el_div_list:
             div_id = el_div.get('ID')
             log.debug("DIV_ID: %s" % el_div.get('ID'))
 
-            for attr in METS_PAGE_DIV_ATTRIBUTE:
-                self._page_cache[attr][str(el_div.get(attr.name))] = el_div
+            self._index_page(el_div)
 
             # Assign an empty dictionary that will hold the fptr of the added page (div)
             self._fptr_cache[div_id] = {}
+            self._page_file_cache[div_id] = {}
 
             # log.info("Page_id added to the cache: %s" % div_id)
 
             for el_fptr in el_div:
-                self._fptr_cache[div_id].update({el_fptr.get('FILEID'): el_fptr})
+                file_id = el_fptr.get('FILEID')
+                self._fptr_cache[div_id].update({file_id: el_fptr})
+                if file_id in el_file_by_id:
+                    self._page_file_cache[div_id][file_id] = el_file_by_id[file_id]
                 # log.info("Fptr added to the cache: %s" % el_fptr.get('FILEID'))
 
         # log.info("Len of page_cache: %s" % len(self._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID]))
         # log.info("Len of fptr_cache: %s" % len(self._fptr_cache))
 
+    def _fill_caches_from_index(self, data : Dict[str, Any]) -> bool:
+        """
+        Fill the caches like :py:meth:`_fill_caches`, but with the attributes from the
+        :py:class:`ocrd_models.ocrd_mets_index.OcrdMetsIndex` :py:attr:`data` instead of
+        reading them from the elements. Returns ``False`` if the index does not match the tree.
+        """
+        tree_root = self._tree.getroot()
+        el_file_list = tree_root.findall('mets:fileSec/mets:fileGrp/mets:file', NS)
+        el_div_list = tree_root.findall(".//mets:div[@TYPE='page']", NS)
+        if len(el_file_list) != len(data['files']) or len(el_div_list) != len(data['pages']):
+            return False
+        self._initialize_caches()
+        if tree_root.find('mets:fileSec', NS) is None:
+            return True
+        for fileGrp_use in data['file_groups']:
+            self._file_cache[fileGrp_use] = {}
+        for el_file, (file_id, fileGrp_use, *keys) in zip(el_file_list, data['files']):
+            if file_id is None:
+                continue
+            self._file_cache[fileGrp_use][file_id] = el_file
+            for cache, key in zip((self._mimetype_cache, self._url_cache, self._local_filename_cache), keys):
+                if key is not None:
+                    cache.setdefault(key, {})[fileGrp_use, file_id] = el_file
+        el_file_by_id = {file_id: el_file for id_to_file in self._file_cache.values()
+                         for file_id, el_file in id_to_file.items()}
+        page_caches = [self._page_cache[attr] for attr in METS_PAGE_DIV_ATTRIBUTE]
+        for el_div, (*attrs, file_ids, _) in zip(el_div_list, data['pages']):
+            el_fptr_list = list(el_div)
+            if len(el_fptr_list) != len(file_ids):
+                return False
+            for page_cache, val in zip(page_caches, attrs):
+                if val is not None:
+                    page_cache[val] = el_div
+            self._fptr_cache[attrs[0]] = dict(zip(file_ids, el_fptr_list))
+            self._page_file_cache[attrs[0]] = {file_id: el_file_by_id[file_id] for file_id in file_ids
+                                               if file_id in el_file_by_id}
+        return True
+
+    def _index_data(self, tree_root : Optional[ET._Element] = None) -> Dict[str, Any]:
+        """
+        Collect the data for the :py:class:`ocrd_models.ocrd_mets_index.OcrdMetsIndex` of this METS
+        (or of the METS document :py:attr:`tree_root`)
+        """
+        if tree_root is None:
+            tree_root = self._tree.getroot()
+        pages = []
+        for el_div in tree_root.iterfind(".//mets:div[@TYPE='page']", NS):
+            el_structMap = next(el_div.iterancestors(TAG_METS_STRUCTMAP), None)
+            pages.append((*[el_div.get(attr.name) for attr in METS_PAGE_DIV_ATTRIBUTE],
+                          [el_fptr.get('FILEID') for el_fptr in el_div],
+                          el_structMap is not None and el_structMap.get('TYPE') == 'PHYSICAL'))
+        identifiers : Dict[str, str] = {}
+        for el_identifier in tree_root.iterfind('.//mods:identifier', NS):
+            identifiers.setdefault(el_identifier.get('type'), el_identifier.text)
+        return {
+            'file_groups': [el_fileGrp.get('USE') for el_fileGrp in tree_root.iterfind('mets:fileSec/mets:fileGrp', NS)],
+            'files': [(el_file.get('ID'), el_file.getparent().get('USE'), *self._file_index_keys(el_file))
+                      for el_file in tree_root.iterfind('mets:fileSec/mets:fileGrp/mets:file', NS)],
+            'pages': pages,
+            'identifiers': identifiers,
+            'agents': [ET.tostring(el_agent, with_tail=False)
+                       for el_agent in tree_root.iterfind('mets:metsHdr/mets:agent', NS)],
+        }
+
     def _initialize_caches(self) -> None:
         self._file_cache = {}
         # NOTE we can only guarantee uniqueness for @ID and @ORDER
         self._page_cache = {k : {} for k in METS_PAGE_DIV_ATTRIBUTE}
+        # sorted page keys for range queries, built on demand by _page_order
+        self._page_order_cache = {}
         self._fptr_cache = {}
+        self._page_file_cache = {}
+        self._mimetype_cache = {}
+        self._url_cache = {}
+        self._local_filename_cache = {}
+
+    @staticmethod
+    def _file_index_keys(el_file : ET._Element) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Extract ``@MIMETYPE``, the remote/original URL and the local filename of a ``mets:file``
+        (i.e. the keys of the secondary indexes) in a single pass over its ``mets:FLocat``s
+        """
+        url = local_filename = None
+        for el_FLocat in el_file.iterchildren(TAG_METS_FLOCAT):
+            loctype = el_FLocat.get('LOCTYPE')
+            if url is None and loctype == 'URL':
+                url = el_FLocat.get('{%s}href' % NS['xlink'])
+            elif local_filename is None and loctype == 'OTHER' and el_FLocat.get('OTHERLOCTYPE') == 'FILE':
+                local_filename = el_FLocat.get('{%s}href' % NS['xlink'])
+        return el_file.get('MIMETYPE'), url, local_filename
+
+    def _index_file(self, el_file : ET._Element) -> None:
+        """
+        Add a ``mets:file`` to the file cache and the secondary indexes (mimetype, url, local_filename)
+        """
+        if not self._cache_flag:
+            return
+        file_id = el_file.get('ID')
+        if file_id is None:
+            return
+        self._snapshot_touch(files=[file_id], added=True)
+        el_fileGrp = el_file.getparent()
+        if el_fileGrp is None:
+            return
+        self._file_cache.setdefault(el_fileGrp.get('USE'), {})[file_id] = el_file
+        for cache, key in zip((self._mimetype_cache, self._url_cache, self._local_filename_cache),
+                              self._file_index_keys(el_file)):
+            if key is not None:
+                cache.setdefault(key, {})[el_fileGrp.get('USE'), file_id] = el_file
+
+    def _unindex_file(self, el_file : ET._Element) -> None:
+        """
+        Remove a ``mets:file`` from the file cache and the secondary indexes (mimetype, url, local_filename)
+        """
+        if not self._cache_flag:
+            return
+        file_id = el_file.get('ID')
+        if file_id is None:
+            return
+        self._snapshot_touch(files=[file_id])
+        el_fileGrp = el_file.getparent()
+        if el_fileGrp is None:
+            return
+        if self._file_cache.get(el_fileGrp.get('USE'), {}).get(file_id) is el_file:
+            del self._file_cache[el_fileGrp.get('USE')][file_id]
+        for cache, key in zip((self._mimetype_cache, self._url_cache, self._local_filename_cache),
+                              self._file_index_keys(el_file)):
+            if key is not None and cache.get(key, {}).get((el_fileGrp.get('USE'), file_id)) is el_file:
+                del cache[key][el_fileGrp.get('USE'), file_id]
+                if not cache[key]:
+                    del cache[key]
+
+    def _index_page(self, el_div : ET._Element) -> None:
+        """
+        Add a physical page ``mets:div`` to the page cache (for each of its ``METS_PAGE_DIV_ATTRIBUTE``)
+        """
+        if not self._cache_flag:
+            return
+        self._snapshot_touch(pages=[el_div.get('ID')], added=True)
+        for attr in METS_PAGE_DIV_ATTRIBUTE:
+            val = el_div.get(attr.name)
+            if val is not None:
+                self._page_cache[attr][val] = el_div
+        self._page_order_cache.clear()
+
+    def _unindex_page(self, el_div : ET._Element) -> None:
+        """
+        Remove a physical page ``mets:div`` from the page cache
+        """
+        if not self._cache_flag:
+            return
+        self._snapshot_touch(pages=[el_div.get('ID')], removed=True)
+        for attr in METS_PAGE_DIV_ATTRIBUTE:
+            val = el_div.get(attr.name)
+            if val is not None and self._page_cache[attr].get(val) is el_div:
+                del self._page_cache[attr][val]
+        self._page_order_cache.clear()
+
+    def _page_order(self, attr : METS_PAGE_DIV_ATTRIBUTE) -> List[Tuple[str, int, str]]:
+        """
+        All values of :py:attr:`attr` in the page cache with a numeric suffix as
+        ``(non-numeric prefix, number, value)``, sorted for range queries with :py:mod:`bisect`
+        """
+        if attr not in self._page_order_cache:
+            order = []
+            for val in self._page_cache[attr]:
+                m = REGEX_NUMERIC_SUFFIX.fullmatch(val)
+                if m:
+                    order.append((m.group(1), int(m.group(2)), val))
+            order.sort()
+            self._page_order_cache[attr] = order
+        return self._page_order_cache[attr]
 
     def _refresh_caches(self) -> None:
+        self._snapshot_changes = None
         if self._cache_flag:
             self._initialize_caches()
 
@@ -179,6 +618,10 @@ class OcrdMets(OcrdXmlDocument):
         Set the unique identifier by looking through ``mods:identifier``
         See `specs <https://ocr-d.de/en/spec/mets#unique-id-for-the-document-processed>`_ for details.
         """
+        with self._journal_entry('unique_identifier', purl):
+            self._set_unique_identifier(purl)
+
+    def _set_unique_identifier(self, purl : str) -> None:
         id_el = None
         for t in IDENTIFIER_PRIORITY:
             id_el = self._tree.getroot().find('.//mods:identifier[@type="%s"]' % t, NS)
@@ -190,6 +633,7 @@ class OcrdMets(OcrdXmlDocument):
             id_el = ET.SubElement(mods, TAG_MODS_IDENTIFIER)
             id_el.set('type', 'purl')
         id_el.text = purl
+        self._snapshot_touch(header=True)
 
     @property
     def agents(self) -> List[OcrdAgent]:
@@ -198,6 +642,7 @@ class OcrdMets(OcrdXmlDocument):
         """
         return [OcrdAgent(el_agent) for el_agent in self._tree.getroot().findall('mets:metsHdr/mets:agent', NS)]
 
+    @journaled
     def add_agent(self, *args, **kwargs) -> OcrdAgent:
         """
         Add an :py:class:`ocrd_models.ocrd_agent.OcrdAgent` to the list of agents in the ``metsHdr``.
@@ -213,6 +658,7 @@ class OcrdMets(OcrdXmlDocument):
             el_agent_last.addnext(el_agent)
         except StopIteration:
             el_metsHdr.insert(0, el_agent)
+        self._snapshot_touch(header=True)
         return OcrdAgent(el_agent, *args, **kwargs)
 
     @property
@@ -246,7 +692,8 @@ class OcrdMets(OcrdXmlDocument):
         local_only : bool = False,
         include_fileGrp : Optional[List[str]] = None,
         exclude_fileGrp : Optional[List[str]] = None,
-    ) -> Iterator[OcrdFile]:
+        as_records : bool = False,
+    ) -> Iterator[Union[OcrdFile, OcrdFileRecord]]:
         """
         Search ``mets:file`` entries in this METS document and yield results.
         The :py:attr:`ID`, :py:attr:`pageId`, :py:attr:`fileGrp`,
@@ -269,18 +716,25 @@ class OcrdMets(OcrdXmlDocument):
             local (boolean) : Whether to restrict results to local files in the filesystem
             include_fileGrp (list[str]) : List of allowed file groups
             exclude_fileGrp (list[str]) : List of disallowd file groups
+            as_records (boolean) : Whether to yield read-only :py:class:`ocrd_models.ocrd_file.OcrdFileRecord`
+                snapshots (with all attributes extracted once) instead of :py:class:`ocrd_models.ocrd_file.OcrdFile`
         Yields:
             :py:class:`ocrd_models:ocrd_file:OcrdFile` instantiations
         """
-        pageId_list = []
+        pageId_list = set()
+        # mets:file/@ID to physical page ID, built on demand (for as_records)
+        file_pages : Optional[Dict[str, str]] = None
+        # mets:file candidates of the selected pages (when caching)
+        page_files = {} if pageId is not None else None
         if pageId:
             # returns divs instead of strings of ids
             physical_pages = self.get_physical_pages(for_pageIds=pageId, return_divs=True)
             for div in physical_pages:
                 if self._cache_flag:
-                    pageId_list += self._fptr_cache[div.get('ID')]
+                    pageId_list.update(self._fptr_cache[div.get('ID')])
+                    page_files.update(self._page_file_cache.get(div.get('ID'), {}))
                 else:
-                    pageId_list += [fptr.get('FILEID') for fptr in div.findall('mets:fptr', NS)]
+                    pageId_list.update(fptr.get('FILEID') for fptr in div.findall('mets:fptr', NS))
 
         if ID and ID.startswith(REGEX_PREFIX):
             ID = re.compile(ID[REGEX_PREFIX_LEN:])
@@ -293,14 +747,14 @@ class OcrdMets(OcrdXmlDocument):
 
         candidates = []
         if self._cache_flag:
-            if fileGrp:
-                if isinstance(fileGrp, str):
-                    candidates += self._file_cache.get(fileGrp, {}).values()
-                else:
+            candidates = self._find_files_candidates(ID=ID, fileGrp=fileGrp, page_files=page_files,
+                                                     mimetype=mimetype, url=url, local_filename=local_filename)
+            if candidates is None:
+                if fileGrp and not isinstance(fileGrp, str):
                     candidates = [x for fileGrp_needle, el_file_list in self._file_cache.items() if
                                   fileGrp.match(fileGrp_needle) for x in el_file_list.values()]
-            else:
-                candidates = [el_file for id_to_file in self._file_cache.values() for el_file in id_to_file.values()]
+                else:
+                    candidates = [el_file for id_to_file in self._file_cache.values() for el_file in id_to_file.values()]
         else:
             candidates = self._tree.getroot().xpath('//mets:file', namespaces=NS)
 
@@ -314,7 +768,7 @@ class OcrdMets(OcrdXmlDocument):
             if pageId is not None and cand.get('ID') not in pageId_list:
                 continue
 
-            if not self._cache_flag and fileGrp:
+            if fileGrp:
                 if isinstance(fileGrp, str):
                     if cand.getparent().get('USE') != fileGrp: continue
                 else:
@@ -352,16 +806,89 @@ class OcrdMets(OcrdXmlDocument):
                 if is_local is None:
                     continue
 
-            ret = OcrdFile(cand, mets=self)
-
+            cand_fileGrp = cand.getparent().get('USE')
             # XXX include_fileGrp is redundant to fileGrp but for completeness
-            if exclude_fileGrp and ret.fileGrp in exclude_fileGrp:
+            if exclude_fileGrp and cand_fileGrp in exclude_fileGrp:
                 continue
-            if include_fileGrp and ret.fileGrp not in include_fileGrp:
+            if include_fileGrp and cand_fileGrp not in include_fileGrp:
                 continue
 
-            yield ret
+            if as_records:
+                if file_pages is None:
+                    file_pages = self._file_pages()
+                cand_mimetype, cand_url, cand_local_filename = self._file_index_keys(cand)
+                yield OcrdFileRecord(ID=cand.get('ID'), fileGrp=cand_fileGrp, mimetype=cand_mimetype,
+                                     pageId=file_pages.get(cand.get('ID')), url=cand_url or '',
+                                     local_filename=cand_local_filename)
+            else:
+                yield OcrdFile(cand, mets=self)
 
+    def _file_pages(self) -> Dict[str, str]:
+        """
+        Map each ``mets:fptr/@FILEID`` to the ``@ID`` of the (first) physical page containing it
+        """
+        file_pages : Dict[str, str] = {}
+        if self._cache_flag:
+            for page_id, fptrs in self._fptr_cache.items():
+                for file_id in fptrs:
+                    file_pages.setdefault(file_id, page_id)
+        else:
+            for el_fptr in self._tree.getroot().iterfind(
+                    'mets:structMap[@TYPE="PHYSICAL"]/mets:div[@TYPE="physSequence"]/mets:div[@TYPE="page"]/mets:fptr', NS):
+                file_pages.setdefault(el_fptr.get('FILEID'), el_fptr.getparent().get('ID'))
+        return file_pages
+
+    def _find_files_candidates(
+        self,
+        ID : Optional[Union[str, re.Pattern]] = None,
+        fileGrp : Optional[Union[str, re.Pattern]] = None,
+        page_files : Optional[Dict[str, ET._Element]] = None,
+        mimetype : Optional[Union[str, re.Pattern]] = None,
+        url : Optional[Union[str, re.Pattern]] = None,
+        local_filename : Optional[str] = None,
+    ) -> Optional[List[ET._Element]]:
+        """
+        Query planner for :py:meth:`find_files` with caching enabled: Look up every
+        literal (non-regex) filter in its index and start from the smallest candidate set.
+        All filters must still be checked on the candidates by the caller.
+        Returns:
+            ``mets:file`` candidates in the order of the file cache, or ``None`` if
+            no filter can be looked up in an index.
+        """
+        indexed = []
+        if fileGrp and isinstance(fileGrp, str):
+            indexed.append(self._file_cache.get(fileGrp, {}))
+        if ID and isinstance(ID, str):
+            if fileGrp and isinstance(fileGrp, str):
+                id_to_files = [self._file_cache.get(fileGrp, {})]
+            else:
+                id_to_files = list(self._file_cache.values())
+            # IDs may repeat in different fileGrps
+            indexed.append({(id_to_file[ID].getparent().get('USE'), ID): id_to_file[ID]
+                            for id_to_file in id_to_files if ID in id_to_file})
+        if page_files is not None:
+            # pages refer to all files of an ID
+            indexed.append({(fileGrp_use, file_id): id_to_file[file_id]
+                            for fileGrp_use, id_to_file in self._file_cache.items()
+                            for file_id in page_files if file_id in id_to_file})
+        if mimetype and isinstance(mimetype, str):
+            indexed.append(self._mimetype_cache.get(mimetype, {}))
+        if url and isinstance(url, str):
+            indexed.append(self._url_cache.get(url, {}))
+        if local_filename and isinstance(local_filename, str):
+            indexed.append(self._local_filename_cache.get(local_filename, {}))
+        if not indexed:
+            return None
+        # min() picks the first of equally small candidate sets, i.e. prefers fileGrp
+        smallest = min(indexed, key=len)
+        candidates = list(smallest.values())
+        if fileGrp and isinstance(fileGrp, str) and smallest is indexed[0]:
+            return candidates
+        # restore the order of the fileGrp cache (stable sort keeps the order within each fileGrp)
+        fileGrp_order = {fileGrp_use: idx for idx, fileGrp_use in enumerate(self._file_cache)}
+        return sorted(candidates, key=lambda el_file: fileGrp_order.get(el_file.getparent().get('USE'), -1))
+
+    @journaled
     def add_file_group(self, fileGrp: str) -> ET._Element:
         """
         Add a new ``mets:fileGrp``.
@@ -384,6 +911,7 @@ class OcrdMets(OcrdXmlDocument):
 
         return el_fileGrp
 
+    @journaled
     def rename_file_group(self, old: str, new: str) -> None:
         """
         Rename a ``mets:fileGrp`` by changing the ``@USE`` from :py:attr:`old` to :py:attr:`new`.
@@ -394,8 +922,16 @@ class OcrdMets(OcrdXmlDocument):
         el_fileGrp.set('USE', new)
 
         if self._cache_flag:
-            self._file_cache[new] = self._file_cache.pop(old)
-
+            # keep the position of the fileGrp
+            self._file_cache = {new if USE == old else USE: files for USE, files in self._file_cache.items()}
+            for el_file in self._file_cache[new].values():
+                for cache, key in zip((self._mimetype_cache, self._url_cache, self._local_filename_cache),
+                                      self._file_index_keys(el_file)):
+                    if key is not None:
+                        cache[key][new, el_file.get('ID')] = cache[key].pop((old, el_file.get('ID')))
+        self._snapshot_changes = None
+
+    @journaled
     def remove_file_group(self, USE: str, recursive : bool = False, force : bool = False) -> None:
         """
         Remove a ``mets:fileGrp`` (single fixed ``@USE`` or multiple regex ``@USE``)
@@ -435,18 +971,18 @@ class OcrdMets(OcrdXmlDocument):
         if files:
             if not recursive:
                 raise Exception("fileGrp %s is not empty and recursive wasn't set" % USE)
-            for f in list(files):
-                self.remove_one_file(ID=f.get('ID'), fileGrp=f.getparent().get('USE'))
+            self._remove_files([OcrdFile(el_file, mets=self) for el_file in files])
 
         if self._cache_flag:
             # Note: Since the files inside the group are removed
-            # with the 'remove_one_file' method above, 
+            # with the '_remove_files' method above,
             # we should not take care of that again.
             # We just remove the fileGrp.
             del self._file_cache[el_fileGrp.get('USE')]
 
         el_fileGrp.getparent().remove(el_fileGrp)
 
+    @journaled
     def add_file(self, fileGrp : str, mimetype : Optional[str] = None, url : Optional[str] = None, 
                  ID : Optional[str] = None, pageId : Optional[str] = None, force : bool = False, 
                  local_filename : Optional[str] = None, ignore : bool = False, **kwargs) -> OcrdFile:
@@ -501,14 +1037,147 @@ class OcrdMets(OcrdXmlDocument):
 
         return mets_file
 
+    def add_files(self, records : Iterable[Union[Dict[str, Any], OcrdFileRecord]], force : bool = False,
+                  ignore : bool = False) -> List[OcrdFile]:
+        """
+        Add many new :py:class:`ocrd_models.ocrd_file.OcrdFile` at once, with the same effect as
+        calling :py:meth:`add_file` for each record, but checking for existing files, creating
+        ``mets:fileGrp`` entries and linking to the physical ``mets:structMap`` only once for all records.
+        If any record is invalid, no file is added.
+        Arguments:
+            records (list): ``dict`` with the keyword arguments of :py:meth:`add_file` (``fileGrp``,
+                ``ID``, ``mimetype``, ``url``, ``pageId``, ``local_filename``) or
+                :py:class:`ocrd_models.ocrd_file.OcrdFileRecord` for each file
+        Keyword Args:
+            force (boolean): Whether to add files even if a ``mets:file`` with the same ``@ID`` already exists.
+            ignore (boolean): Do not look for existing files at all.
+        Returns:
+            the new :py:class:`ocrd_models.ocrd_file.OcrdFile` instances
+        """
+        fields = ['fileGrp', 'ID', 'mimetype', 'url', 'pageId', 'local_filename']
+        records = [{k: v for k, v in (r._asdict() if isinstance(r, OcrdFileRecord) else r).items()
+                    if k in fields and v is not None and v != ''} for r in records]
+        return self._add_files(records, force=force, ignore=ignore)
+
+    @journaled
+    def _add_files(self, records : List[Dict[str, Any]], force : bool = False, ignore : bool = False) -> List[OcrdFile]:
+        for record in records:
+            ID, fileGrp = record.get('ID'), record.get('fileGrp')
+            if not ID:
+                raise ValueError("Must set ID of the mets:file")
+            if not fileGrp:
+                raise ValueError("Must set fileGrp of the mets:file")
+            if not REGEX_FILE_ID.fullmatch(ID):
+                raise ValueError("Invalid syntax for mets:file/@ID %s (not an xs:ID)" % ID)
+            if not REGEX_FILE_ID.fullmatch(fileGrp):
+                raise ValueError("Invalid syntax for mets:fileGrp/@USE %s (not an xs:ID)" % fileGrp)
+
+        # look up existing files (by fileGrp and ID, like add_file) once for the whole batch
+        to_add : Dict[Any, Dict[str, Any]] = {}
+        to_remove : List[ET._Element] = []
+        if ignore:
+            to_add = dict(enumerate(records))
+        else:
+            if self._cache_flag:
+                existing = {(fileGrp, ID): el for fileGrp in self._file_cache
+                            for ID, el in self._file_cache[fileGrp].items()}
+            else:
+                existing = {(el.getparent().get('USE'), el.get('ID')): el
+                            for el in self._tree.getroot().iterfind('mets:fileSec/mets:fileGrp/mets:file', NS)}
+            for record in records:
+                key = (record['fileGrp'], record['ID'])
+                if key in to_add:
+                    other = to_add[key]
+                    other_pageId, other_mimetype = other.get('pageId'), other.get('mimetype')
+                elif key in existing:
+                    other = OcrdFile(existing[key], mets=self)
+                    other_pageId, other_mimetype = other.pageId, other.mimetype
+                else:
+                    to_add[key] = record
+                    continue
+                if other_pageId != record.get('pageId') or other_mimetype != record.get('mimetype'):
+                    raise FileExistsError(
+                        f"A file with ID=={record['ID']} already exists {other} but unrelated - cannot mitigate")
+                if not force:
+                    raise FileExistsError(
+                        f"A file with ID=={record['ID']} already exists {other} and neither force nor ignore are set")
+                if key in to_add:
+                    del to_add[key]
+                else:
+                    to_remove.append(existing.pop(key))
+                to_add[key] = record
+        for el_file in to_remove:
+            self.remove_one_file(OcrdFile(el_file, mets=self))
+
+        # create the mets:file elements
+        el_fileGrps : Dict[str, ET._Element] = {}
+        els_file = []
+        for record in to_add.values():
+            fileGrp = record['fileGrp']
+            if fileGrp not in el_fileGrps:
+                el_fileGrps[fileGrp] = self.add_file_group(fileGrp)
+            el_file = ET.SubElement(el_fileGrps[fileGrp], TAG_METS_FILE)
+            el_file.set('ID', record['ID'])
+            if record.get('mimetype'):
+                el_file.set('MIMETYPE', record['mimetype'])
+            if record.get('local_filename'):
+                el_FLocat = ET.SubElement(el_file, TAG_METS_FLOCAT)
+                el_FLocat.set("{%s}href" % NS["xlink"], str(record['local_filename']))
+                el_FLocat.set("LOCTYPE", "OTHER")
+                el_FLocat.set("OTHERLOCTYPE", "FILE")
+            if record.get('url'):
+                el_FLocat = ET.SubElement(el_file, TAG_METS_FLOCAT)
+                el_FLocat.set("{%s}href" % NS["xlink"], record['url'])
+                el_FLocat.set("LOCTYPE", "URL")
+            self._index_file(el_file)
+            els_file.append(el_file)
+
+        # link to the physical pages
+        page_records = [(record['pageId'], el_file) for record, el_file in zip(to_add.values(), els_file)
+                        if record.get('pageId')]
+        if page_records:
+            el_structmap = self._tree.getroot().find('mets:structMap[@TYPE="PHYSICAL"]', NS)
+            if el_structmap is None:
+                el_structmap = ET.SubElement(self._tree.getroot(), TAG_METS_STRUCTMAP)
+                el_structmap.set('TYPE', 'PHYSICAL')
+            el_seqdiv = el_structmap.find('mets:div[@TYPE="physSequence"]', NS)
+            if el_seqdiv is None:
+                el_seqdiv = ET.SubElement(el_structmap, TAG_METS_DIV)
+                el_seqdiv.set('TYPE', 'physSequence')
+            if self._cache_flag:
+                el_pagedivs = self._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID]
+            else:
+                el_pagedivs = {}
+                for el_div in el_seqdiv.iterchildren(TAG_METS_DIV):
+                    el_pagedivs.setdefault(el_div.get('ID'), el_div)
+            for pageId, el_file in page_records:
+                el_pagediv = el_pagedivs.get(pageId)
+                if el_pagediv is None:
+                    el_pagediv = ET.SubElement(el_seqdiv, TAG_METS_DIV)
+                    el_pagediv.set('TYPE', 'page')
+                    el_pagediv.set('ID', pageId)
+                    if self._cache_flag:
+                        self._index_page(el_pagediv)
+                        self._fptr_cache.setdefault(pageId, {})
+                    else:
+                        el_pagedivs[pageId] = el_pagediv
+                el_fptr = ET.SubElement(el_pagediv, TAG_METS_FPTR)
+                el_fptr.set('FILEID', el_file.get('ID'))
+                self._snapshot_touch(pages=[pageId])
+                if self._cache_flag:
+                    self._fptr_cache[pageId][el_file.get('ID')] = el_fptr
+                    self._page_file_cache.setdefault(pageId, {})[el_file.get('ID')] = el_file
+
+        return [OcrdFile(el_file, mets=self) for el_file in els_file]
+
+    @journaled
     def remove_file(self, *args, **kwargs) -> Union[List[OcrdFile],OcrdFile]:
         """
         Delete each ``ocrd:file`` matching the query. Same arguments as :py:meth:`find_files`
         """
         files = list(self.find_files(*args, **kwargs))
         if files:
-            for f in files:
-                self.remove_one_file(f)
+            self._remove_files(files)
             if len(files) > 1:
                 return files
             else:
@@ -519,6 +1188,51 @@ class OcrdMets(OcrdXmlDocument):
             return []
         raise FileNotFoundError("File not found: %s %s" % (args, kwargs))
 
+    @journaled
+    def remove_files(self, files : List[OcrdFile]) -> List[OcrdFile]:
+        """
+        Delete many existing :py:class:`ocrd_models.ocrd_file.OcrdFile` at once (with their
+        ``mets:fptr`` and the pages left empty, like :py:meth:`remove_one_file`).
+        Returns:
+            The old :py:class:`ocrd_models.ocrd_file.OcrdFile` references.
+        """
+        self._remove_files(files)
+        return files
+
+    def _remove_files(self, files : List[OcrdFile]) -> None:
+        """
+        Delete the ``mets:file`` elements of :py:attr:`files` and all ``mets:fptr`` to their ``@ID``
+        in a single pass over the page divs instead of a search per file.
+        """
+        file_ids = {f.ID for f in files}
+        if self._cache_flag:
+            fptrs = [fptr for page_fptrs in self._fptr_cache.values()
+                     for file_id, fptr in page_fptrs.items() if file_id in file_ids]
+        else:
+            fptrs = [fptr for fptr in self._tree.getroot().iter(TAG_METS_FPTR) if fptr.get('FILEID') in file_ids]
+        for fptr in fptrs:
+            page_div = fptr.getparent()
+            page_div.remove(fptr)
+            self._snapshot_touch(pages=[page_div.get('ID')])
+            if self._cache_flag:
+                del self._fptr_cache[page_div.get('ID')][fptr.get('FILEID')]
+                self._page_file_cache.get(page_div.get('ID'), {}).pop(fptr.get('FILEID'), None)
+            # delete empty pages
+            if not len(page_div):
+                page_div.getparent().remove(page_div)
+                if self._cache_flag:
+                    self._unindex_page(page_div)
+                    self._page_file_cache.pop(page_div.get('ID'), None)
+        # pylint: disable=protected-access
+        for ocrd_file in files:
+            el_fileGrp = ocrd_file._el.getparent()
+            if self._cache_flag:
+                self._file_cache[el_fileGrp.get('USE')].pop(ocrd_file.ID, None)
+                self._unindex_file(ocrd_file._el)
+                self._snapshot_touch(files=[ocrd_file.ID], removed=True)
+            el_fileGrp.remove(ocrd_file._el)
+
+    @journaled
     def remove_one_file(self, ID : Union[str, OcrdFile], fileGrp : str = None) -> OcrdFile:
         """
         Delete an existing :py:class:`ocrd_models.ocrd_file.OcrdFile`.
@@ -553,23 +1267,26 @@ class OcrdMets(OcrdXmlDocument):
             log.debug("Delete fptr element %s for page '%s'", fptr, ID)
             page_div = fptr.getparent()
             page_div.remove(fptr)
+            self._snapshot_touch(pages=[page_div.get('ID')])
             # Remove the fptr from the cache as well
             if self._cache_flag:
                 del self._fptr_cache[page_div.get('ID')][ID]
+                self._page_file_cache.get(page_div.get('ID'), {}).pop(ID, None)
             # delete empty pages
             if not list(page_div):
                 log.debug("Delete empty page %s", page_div)
                 page_div.getparent().remove(page_div)
                 # Delete the empty pages from caches as well
                 if self._cache_flag:
-                    for attr in METS_PAGE_DIV_ATTRIBUTE:
-                        if attr.name in page_div.attrib:
-                            del self._page_cache[attr][page_div.attrib[attr.name]]
+                    self._unindex_page(page_div)
+                    self._page_file_cache.pop(page_div.get('ID'), None)
 
         # Delete the file reference from the cache
         if self._cache_flag:
             parent_use = ocrd_file._el.getparent().get('USE')
             del self._file_cache[parent_use][ocrd_file.ID]
+            self._unindex_file(ocrd_file._el)
+            self._snapshot_touch(files=[ocrd_file.ID], removed=True)
 
         # Delete the file reference
         # pylint: disable=protected-access
@@ -604,6 +1321,8 @@ class OcrdMets(OcrdXmlDocument):
             ret = []
             page_attr_patterns = []
             page_attr_patterns_raw = re.split(r',', for_pageIds)
+            if self._cache_flag:
+                return self._get_physical_pages_cached(page_attr_patterns_raw, return_divs)
             for pageId_token in page_attr_patterns_raw:
                 if pageId_token.startswith(REGEX_PREFIX):
                     page_attr_patterns.append((None, re.compile(pageId_token[REGEX_PREFIX_LEN:])))
@@ -616,68 +1335,43 @@ class OcrdMets(OcrdXmlDocument):
                 return []
             range_patterns_first_last = [(x[0], x[-1]) if isinstance(x, list) else None for x in page_attr_patterns]
             page_attr_patterns_copy = list(page_attr_patterns)
-            if self._cache_flag:
-                for pat in page_attr_patterns:
+            page_attr_patterns_matched = []
+            for page in self._tree.getroot().xpath(
+                    'mets:structMap[@TYPE="PHYSICAL"]/mets:div[@TYPE="physSequence"]/mets:div[@TYPE="page"]',
+                    namespaces=NS):
+                patterns_exhausted = []
+                for pat_idx, pat in enumerate(page_attr_patterns):
                     try:
-                        attr : METS_PAGE_DIV_ATTRIBUTE
                         if isinstance(pat, str):
-                            attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if pat in self._page_cache[a])
-                            cache_keys = [pat]
+                            attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if pat == page.get(a.name))
+                            ret.append(page if return_divs else page.get('ID'))
+                            patterns_exhausted.append(pat)
                         elif isinstance(pat, list):
-                            attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if any(x in self._page_cache[a] for x in pat))
-                            cache_keys = [v for v in pat if v in self._page_cache[attr]]
-                            for k in cache_keys:
-                                pat.remove(k)
+                            if not isinstance(pat[0], METS_PAGE_DIV_ATTRIBUTE):
+                                pat.insert(0, next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if any(x == page.get(a.name) for x in pat)))
+                            attr_val = page.get(pat[0].name)
+                            if attr_val in pat:
+                                pat.remove(attr_val)
+                                ret.append(page if return_divs else page.get('ID'))
+                            if len(pat) == 1:
+                                patterns_exhausted.append(pat)
                         elif isinstance(pat, tuple):
-                            _, re_pat = pat
-                            attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) for v in self._page_cache[a] if re_pat.fullmatch(v))
-                            cache_keys = [v for v in self._page_cache[attr] if re_pat.fullmatch(v)]
+                            attr, re_pat = pat
+                            if not attr:
+                                attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if re_pat.fullmatch(page.get(a.name) or ''))
+                                page_attr_patterns[pat_idx] = (attr, re_pat)
+                            if re_pat.fullmatch(page.get(attr.name) or ''):
+                                ret.append(page if return_divs else page.get('ID'))
                         else:
                             raise ValueError
-                        if return_divs:
-                            ret += [self._page_cache[attr][v] for v in cache_keys]
-                        else:
-                            ret += [self._page_cache[attr][v].get('ID') for v in cache_keys]
+                        page_attr_patterns_matched.append(pat)
                     except StopIteration:
-                        raise ValueError(f"{pat} matches none of the keys of any of the _page_caches.")
-            else:
-                page_attr_patterns_matched = []
-                for page in self._tree.getroot().xpath(
-                        'mets:structMap[@TYPE="PHYSICAL"]/mets:div[@TYPE="physSequence"]/mets:div[@TYPE="page"]',
-                        namespaces=NS):
-                    patterns_exhausted = []
-                    for pat_idx, pat in enumerate(page_attr_patterns):
-                        try:
-                            if isinstance(pat, str):
-                                attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if pat == page.get(a.name))
-                                ret.append(page if return_divs else page.get('ID'))
-                                patterns_exhausted.append(pat)
-                            elif isinstance(pat, list):
-                                if not isinstance(pat[0], METS_PAGE_DIV_ATTRIBUTE):
-                                    pat.insert(0, next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if any(x == page.get(a.name) for x in pat)))
-                                attr_val = page.get(pat[0].name)
-                                if attr_val in pat:
-                                    pat.remove(attr_val)
-                                    ret.append(page if return_divs else page.get('ID'))
-                                if len(pat) == 1:
-                                    patterns_exhausted.append(pat)
-                            elif isinstance(pat, tuple):
-                                attr, re_pat = pat
-                                if not attr:
-                                    attr = next(a for a in list(METS_PAGE_DIV_ATTRIBUTE) if re_pat.fullmatch(page.get(a.name) or ''))
-                                    page_attr_patterns[pat_idx] = (attr, re_pat)
-                                if re_pat.fullmatch(page.get(attr.name) or ''):
-                                    ret.append(page if return_divs else page.get('ID'))
-                            else:
-                                raise ValueError
-                            page_attr_patterns_matched.append(pat)
-                        except StopIteration:
-                            continue
-                    for p in patterns_exhausted:
-                        page_attr_patterns.remove(p)
-                unmatched = [x for x in page_attr_patterns_copy if x not in page_attr_patterns_matched]
-                if unmatched:
-                    raise ValueError(f"Patterns {unmatched} match none of the pages")
+                        continue
+                for p in patterns_exhausted:
+                    page_attr_patterns.remove(p)
+            unmatched = [x for x in page_attr_patterns_copy if x not in page_attr_patterns_matched]
+            if unmatched:
+                raise ValueError(f"Patterns {unmatched} match none of the pages")
 
             ranges_without_start_match = []
             ranges_without_last_match = []
@@ -685,7 +1379,6 @@ class OcrdMets(OcrdXmlDocument):
                 if isinstance(pat, list):
                     start, last = range_patterns_first_last[idx]
                     if start in pat:
-                        print(pat, start, last)
                         ranges_without_start_match.append(page_attr_patterns_raw[idx])
                     # if last in pat:
                     #     ranges_without_last_match.append(page_attr_patterns_raw[idx])
@@ -699,11 +1392,15 @@ class OcrdMets(OcrdXmlDocument):
             return []
         assert for_fileIds # at this point we know for_fileIds is set, assert to convince pyright
         ret = [None] * len(for_fileIds)
+        # position of the (first occurrence of) each file ID in the result
+        positions : Dict[str, int] = {}
+        for index, fileId in enumerate(for_fileIds):
+            positions.setdefault(fileId, index)
         if self._cache_flag:
             for pageId in self._fptr_cache.keys():
                 for fptr in self._fptr_cache[pageId].keys():
-                    if fptr in for_fileIds:
-                        index = for_fileIds.index(fptr)
+                    if fptr in positions:
+                        index = positions[fptr]
                         if return_divs:
                             ret[index] = self._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID][pageId]
                         else:
@@ -713,14 +1410,78 @@ class OcrdMets(OcrdXmlDocument):
                     'mets:structMap[@TYPE="PHYSICAL"]/mets:div[@TYPE="physSequence"]/mets:div[@TYPE="page"]',
                     namespaces=NS):
                 for fptr in page.findall('mets:fptr', NS):
-                    if fptr.get('FILEID') in for_fileIds:
-                        index = for_fileIds.index(fptr.get('FILEID'))
+                    if fptr.get('FILEID') in positions:
+                        index = positions[fptr.get('FILEID')]
                         if return_divs:
                             ret[index] = page
                         else:
                             ret[index] = page.get('ID')
         return ret
 
+    def _get_physical_pages_cached(self, page_attr_patterns_raw : List[str],
+                                   return_divs : bool = False) -> List[Union[str, ET._Element]]:
+        """
+        Resolve the :py:meth:`get_physical_pages` selector tokens :py:attr:`page_attr_patterns_raw`
+        with the page cache: literal values by lookup, ranges by slicing the sorted page keys
+        (see :py:meth:`_page_order`) and regular expressions by matching the keys of each attribute.
+        """
+        # parse (and validate) all tokens before resolving any
+        page_attr_patterns : List[Any] = []
+        for pageId_token in page_attr_patterns_raw:
+            if pageId_token.startswith(REGEX_PREFIX):
+                page_attr_patterns.append(re.compile(pageId_token[REGEX_PREFIX_LEN:]))
+            elif '..' in pageId_token:
+                page_attr_patterns.append(self._page_range_bounds(*pageId_token.split('..', 1)))
+            else:
+                page_attr_patterns.append(pageId_token)
+        ret = []
+        ranges_without_start_match = []
+        for pageId_token, pat in zip(page_attr_patterns_raw, page_attr_patterns):
+            cache_keys : List[str] = []
+            for attr in METS_PAGE_DIV_ATTRIBUTE:
+                if isinstance(pat, str):
+                    cache_keys = [pat] if pat in self._page_cache[attr] else []
+                elif isinstance(pat, re.Pattern):
+                    cache_keys = [v for v in self._page_cache[attr] if pat.fullmatch(v)]
+                elif isinstance(pat, list):
+                    # range that cannot be sliced: all generated values
+                    cache_keys = [v for v in pat if v in self._page_cache[attr]]
+                else:
+                    prefix, start_num, end_num, width = pat
+                    order = self._page_order(attr)
+                    cache_keys = [val for _, num, val in order[bisect_left(order, (prefix, start_num)):
+                                                                bisect_left(order, (prefix, end_num + 1))]
+                                  if val == prefix + str(num).zfill(width)]
+                if cache_keys:
+                    break
+            else:
+                raise ValueError(f"{pageId_token} matches none of the keys of any of the _page_caches.")
+            if '..' in pageId_token and not pageId_token.startswith(REGEX_PREFIX):
+                if pageId_token.split('..', 1)[0] not in cache_keys:
+                    ranges_without_start_match.append(pageId_token)
+            if return_divs:
+                ret += [self._page_cache[attr][v] for v in cache_keys]
+            else:
+                ret += [self._page_cache[attr][v].get('ID') for v in cache_keys]
+        if ranges_without_start_match:
+            raise ValueError(f"Start of range patterns {ranges_without_start_match} not matched - invalid range")
+        return ret
+
+    @staticmethod
+    def _page_range_bounds(start : str, end : str) -> Union[Tuple[str, int, int, int], List[str]]:
+        """
+        Get the non-numeric prefix, first and last number and the zero-padded width of
+        the numeric suffix of the range :py:attr:`start`..:py:attr:`end`, if it can be sliced
+        from the sorted page keys, otherwise all values of :py:func:`ocrd_utils.generate_range`.
+        """
+        m_start, m_end = REGEX_NUMERIC_SUFFIX.fullmatch(start), REGEX_NUMERIC_SUFFIX.fullmatch(end)
+        if (not m_start or not m_end or m_start.group(1) != m_end.group(1) or
+                # cases with extra semantics of generate_range (warning, replacing digits in the prefix)
+                m_start.group(2) == m_end.group(2) or m_start.group(2) in m_start.group(1)):
+            return generate_range(start, end)
+        return m_start.group(1), int(m_start.group(2)), int(m_end.group(2)), len(m_start.group(2))
+
+    @journaled
     def set_physical_page_for_file(self, pageId : str, ocrd_file : OcrdFile, 
                                    order : Optional[str] = None, orderlabel : Optional[str] = None) -> None:
         """
@@ -747,8 +1508,10 @@ class OcrdMets(OcrdXmlDocument):
                 ocrd_file.ID, namespaces=NS)
 
         for el_fptr in fptrs:
+            self._snapshot_touch(pages=[el_fptr.getparent().get('ID')])
             if self._cache_flag:
                 del self._fptr_cache[el_fptr.getparent().get('ID')][ocrd_file.ID]
+                self._page_file_cache.get(el_fptr.getparent().get('ID'), {}).pop(ocrd_file.ID, None)
             el_fptr.getparent().remove(el_fptr)
 
         # find/construct as necessary
@@ -778,18 +1541,21 @@ class OcrdMets(OcrdXmlDocument):
                 el_pagediv.set('ORDERLABEL', orderlabel)
             if self._cache_flag:
                 # Create a new entry in the page cache
-                self._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID][pageId] = el_pagediv
+                self._index_page(el_pagediv)
                 # Create a new entry in the fptr cache and 
                 # assign an empty dictionary to hold the fileids
                 self._fptr_cache.setdefault(pageId, {})
 
         el_fptr = ET.SubElement(el_pagediv, TAG_METS_FPTR)
         el_fptr.set('FILEID', ocrd_file.ID)
+        self._snapshot_touch(pages=[pageId])
 
         if self._cache_flag:
             # Assign the ocrd fileID to the pageId in the cache
             self._fptr_cache[pageId].update({ocrd_file.ID: el_fptr})
+            self._page_file_cache.setdefault(pageId, {})[ocrd_file.ID] = ocrd_file._el
 
+    @journaled
     def update_physical_page_attributes(self, page_id : str, **kwargs) -> None:
         invalid_keys = list(k for k in kwargs.keys() if k not in METS_PAGE_DIV_ATTRIBUTE.names())
         if invalid_keys:
@@ -800,11 +1566,21 @@ class OcrdMets(OcrdXmlDocument):
             raise ValueError(f"Could not find mets:div[@ID=={page_id}]")
         page_div = page_div[0]
 
+        self._snapshot_touch(pages=[page_div.get('ID')])
         for k, v in kwargs.items():
+            if self._cache_flag and page_div.get(k) != (v or None):
+                # update only the changed keys, so the page keeps its position in the page cache
+                page_cache = self._page_cache[METS_PAGE_DIV_ATTRIBUTE[k]]
+                if page_cache.get(page_div.get(k)) is page_div:
+                    del page_cache[page_div.get(k)]
+                if v:
+                    page_cache[v] = page_div
+                self._page_order_cache.clear()
             if not v:
                 page_div.attrib.pop(k)
             else:
                 page_div.attrib[k] = v
+        self._snapshot_touch(pages=[page_div.get('ID')])
 
     def get_physical_page_for_file(self, ocrd_file : OcrdFile) -> Optional[str]:
         """
@@ -822,6 +1598,7 @@ class OcrdMets(OcrdXmlDocument):
             if ret is not None:
                 return ret.getparent().get('ID')
 
+    @journaled
     def remove_physical_page(self, ID : str) -> None:
         """
         Delete page (physical ``mets:structMap`` ``mets:div`` entry ``@ID``) :py:attr:`ID`.
@@ -835,14 +1612,13 @@ class OcrdMets(OcrdXmlDocument):
                 'mets:structMap[@TYPE="PHYSICAL"]/mets:div[@TYPE="physSequence"]/mets:div[@TYPE="page"][@ID="%s"]' % ID,
                 namespaces=NS)
         if mets_div:
-            mets_div_attrib = {** mets_div[0].attrib}
             mets_div[0].getparent().remove(mets_div[0])
             if self._cache_flag:
-                for attr in METS_PAGE_DIV_ATTRIBUTE:
-                    if attr.name in mets_div_attrib:
-                        del self._page_cache[attr][mets_div_attrib[attr.name]]
+                self._unindex_page(mets_div[0])
                 del self._fptr_cache[ID]
+                self._page_file_cache.pop(ID, None)
 
+    @journaled
     def remove_physical_page_fptr(self, fileId : str) -> List[str]:
         """
         Delete all ``mets:fptr[@FILEID = fileId]`` to ``mets:file[@ID == fileId]`` for :py:attr:`fileId` from all ``mets:div`` entries in the physical ``mets:structMap``.
@@ -868,8 +1644,10 @@ class OcrdMets(OcrdXmlDocument):
         for mets_fptr in mets_fptrs:
             mets_div = mets_fptr.getparent()
             ret.append(mets_div.get('ID'))
+            self._snapshot_touch(pages=[mets_div.get('ID')])
             if self._cache_flag:
                 del self._fptr_cache[mets_div.get('ID')][mets_fptr.get('FILEID')]
+                self._page_file_cache.get(mets_div.get('ID'), {}).pop(mets_fptr.get('FILEID'), None)
             mets_div.remove(mets_fptr)
         return ret
 
@@ -893,6 +1671,9 @@ class OcrdMets(OcrdXmlDocument):
         """
         Add all files from other_mets.
         Accepts the same kwargs as :py:func:`find_files`
+
+        The files are mapped in a single pass and added with :py:meth:`add_files`, so existing
+        files are looked up and pages are linked only once. If any file cannot be added, none is.
         Keyword Args:
             force (boolean): Whether to :py:meth:`add_file`s with force (overwriting existing ``mets:file``s)
             fileGrp_mapping (dict): Map :py:attr:`other_mets` fileGrp to fileGrp in this METS
@@ -906,17 +1687,128 @@ class OcrdMets(OcrdXmlDocument):
             fileId_mapping = {}
         if not pageId_mapping:
             pageId_mapping = {}
-        for f_src in other_mets.find_files(**kwargs):
-            f_dest = self.add_file(
-                fileGrp_mapping.get(f_src.fileGrp, f_src.fileGrp),
-                mimetype=f_src.mimetype,
-                url=f_src.url,
-                local_filename=f_src.local_filename,
-                ID=fileId_mapping.get(f_src.ID, f_src.ID),
-                pageId=pageId_mapping.get(f_src.pageId, f_src.pageId),
-                force=force)
-            # FIXME: merge metsHdr, amdSec, dmdSec as well
-            # FIXME: merge structMap logical and structLink as well
+        records = [{
+            'fileGrp': fileGrp_mapping.get(f_src.fileGrp, f_src.fileGrp),
+            'mimetype': f_src.mimetype,
+            'url': f_src.url,
+            'local_filename': f_src.local_filename,
+            'ID': fileId_mapping.get(f_src.ID, f_src.ID),
+            'pageId': pageId_mapping.get(f_src.pageId, f_src.pageId),
+        } for f_src in other_mets.find_files(as_records=True, **kwargs)]
+        # FIXME: merge metsHdr, amdSec, dmdSec as well
+        # FIXME: merge structMap logical and structLink as well
+        for f_dest in self.add_files(records, force=force):
             if after_add_cb:
                 after_add_cb(f_dest)
 
+    def diff(self, other) -> Dict[str, Any]:
+        """
+        Compute the changes to the files, physical pages and agents which turn this METS into
+        :py:attr:`other` (any :py:class:`OcrdMets` implementation), to be applied with :py:meth:`apply`.
+        Both are compared in a single pass over their :py:meth:`snapshot`. ``mets:file`` entries
+        are identified by ``fileGrp`` and ``@ID``, pages by ``@ID``.
+        Returns:
+            a JSON-serializable ``dict`` with
+            - ``file_groups``: ``added`` and ``removed`` ``@USE`` of ``mets:fileGrp``
+            - ``files``: ``added`` and ``changed`` (new ``mimetype``, ``pageId``, ``url`` or ``local_filename``)
+              files as ``dict`` of the :py:class:`ocrd_models.ocrd_file.OcrdFileRecord` fields,
+              ``removed`` files as ``[fileGrp, ID]``
+            - ``pages``: ``removed`` page IDs and the changed ``attributes`` (``ORDER``, ``ORDERLABEL``
+              and ``LABEL``, ``None`` if removed) of each page ID, cf. :py:attr:`physical_pages_labels`
+            - ``agents``: ``added`` agents as keyword arguments of :py:meth:`add_agent`
+
+        Agents are only ever added: agents missing or changed in :py:attr:`other` are not reported
+        (there is no API to remove them), so a changed agent shows up as an added one.
+        """
+        mine, theirs = self.snapshot(), other.snapshot()
+
+        my_file_groups = set(mine.file_groups)
+        their_file_groups = set(theirs.file_groups)
+        file_groups = {'added': [fileGrp for fileGrp in theirs.file_groups if fileGrp not in my_file_groups],
+                       'removed': [fileGrp for fileGrp in mine.file_groups if fileGrp not in their_file_groups]}
+
+        files : Dict[str, List[Any]] = {'added': [], 'changed': [], 'removed': []}
+        my_files = {(f.fileGrp, f.ID): f for f in mine.find_files()}
+        for f in theirs.find_files():
+            my_f = my_files.pop((f.fileGrp, f.ID), None)
+            if my_f is None:
+                files['added'].append(f._asdict())
+            elif my_f != f:
+                files['changed'].append(f._asdict())
+        files['removed'] = [list(key) for key in my_files]
+
+        pages : Dict[str, Any] = {'attributes': {}, 'removed': []}
+        my_pages = mine.physical_pages_labels
+        for page_id, labels in theirs.physical_pages_labels.items():
+            my_labels = my_pages.pop(page_id, None)
+            attributes = {} if my_labels else {'ID': page_id}
+            attributes.update({name: val for name, val, my_val in zip(['ORDER', 'ORDERLABEL', 'LABEL'], labels,
+                                                                      my_labels or (None, None, None))
+                               if val != my_val})
+            if attributes:
+                pages['attributes'][page_id] = attributes
+        pages['removed'] = list(my_pages)
+
+        def agent_kwargs(agent : OcrdAgent) -> Dict[str, Any]:
+            return {'name': agent.name, '_type': agent.type, 'othertype': agent.othertype, 'role': agent.role,
+                    'otherrole': agent.otherrole, 'notes': [[{name.split('}')[-1]: value for name, value in attrib.items()}, text]
+                                                            for attrib, text in agent.notes]}
+        my_agents = [agent_kwargs(agent) for agent in mine.agents]
+        agents : Dict[str, List[Any]] = {'added': []}
+        for kwargs in map(agent_kwargs, theirs.agents):
+            if kwargs in my_agents:
+                my_agents.remove(kwargs)
+            else:
+                agents['added'].append(kwargs)
+
+        return {'file_groups': file_groups, 'files': files, 'pages': pages, 'agents': agents}
+
+    @journaled
+    def apply(self, patch : Dict[str, Any]) -> None:
+        """
+        Apply the changes :py:attr:`patch` computed by :py:meth:`diff` (recorded as a single change
+        in the journal). Files are added (with :py:meth:`add_files`) before others are removed,
+        so pages which still have files in the other METS are kept. (Pages without any files
+        cannot be created, though.)
+        """
+        log = getLogger('ocrd.models.ocrd_mets.apply')
+        for fileGrp in patch['file_groups']['added']:
+            self.add_file_group(fileGrp)
+        self.add_files(patch['files']['added'])
+        changed_files = {}
+        if patch['files']['changed']:
+            # one pass instead of a (possibly uncached) search per file
+            changed_files = {(f.fileGrp, f.ID): f for f in self.find_files()}
+        for record in patch['files']['changed']:
+            ocrd_file = changed_files.get((record['fileGrp'], record['ID']))
+            if ocrd_file is None:
+                raise FileNotFoundError("File not found: %s (fileGrp=%s)" % (record['ID'], record['fileGrp']))
+            if record['mimetype'] is not None and ocrd_file.mimetype != record['mimetype']:
+                ocrd_file.mimetype = record['mimetype']
+            if ocrd_file.url != record['url']:
+                ocrd_file.url = record['url'] or None
+            if ocrd_file.local_filename != record['local_filename']:
+                ocrd_file.local_filename = record['local_filename']
+            if ocrd_file.pageId != record['pageId']:
+                if record['pageId']:
+                    ocrd_file.pageId = record['pageId']
+                else:
+                    self.remove_physical_page_fptr(ocrd_file.ID)
+        for fileGrp, ID in patch['files']['removed']:
+            self.remove_one_file(ID, fileGrp=fileGrp)
+        page_ids = set(self.physical_pages)
+        for page_id, attributes in patch['pages']['attributes'].items():
+            attributes = {attr: val for attr, val in attributes.items() if attr != 'ID'}
+            if page_id not in page_ids:
+                log.warning("Cannot set attributes of page %s without files", page_id)
+            elif attributes:
+                self.update_physical_page_attributes(page_id, **attributes)
+        for page_id in patch['pages']['removed']:
+            self.remove_physical_page(page_id)
+        for fileGrp in patch['file_groups']['removed']:
+            self.remove_file_group(fileGrp, recursive=True, force=True)
+        for kwargs in patch['agents']['added']:
+            self.add_agent(**kwargs)
+
+# Methods of OcrdMets which are recorded in (and can be replayed from) the journal
+JOURNALED_METHODS = [name for name, method in vars(OcrdMets).items() if getattr(method, 'journaled', False)]
@@ -0,0 +1,97 @@
+"""
+Persistent binary index of a METS file
+"""
+from hashlib import blake2b
+import marshal
+from os import chmod, replace, stat, unlink
+from os.path import dirname, exists
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, Optional, Tuple
+
+from ocrd_utils import getLogger
+
+class OcrdMetsIndex():
+    """
+    Sidecar file (``<METS file>.idx``) with the information needed to fill the caches of
+    :py:class:`ocrd_models.ocrd_mets.OcrdMets` or the records of
+    :py:class:`ocrd_models.ocrd_mets_readonly.ReadOnlyOcrdMets` without walking the METS document:
+
+    - ``file_groups``: ``@USE`` of each ``mets:fileGrp``
+    - ``files``: ``(@ID, fileGrp, @MIMETYPE, url, local_filename)`` of each ``mets:fileSec/mets:fileGrp/mets:file``
+    - ``pages``: ``(@ID, @ORDER, @ORDERLABEL, @LABEL, @CONTENTIDS, [mets:fptr/@FILEID], physical)``
+      of each ``mets:div[@TYPE="page"]``
+    - ``identifiers``: ``mods:identifier/@type`` to text
+    - ``agents``: serialized ``mets:agent`` elements
+
+    all in document order, serialized with :py:mod:`marshal`. The index is stamped with the size,
+    modification time and hash of the METS file, and ignored as soon as the METS file has changed.
+    """
+    # bump on changes of the index format
+    VERSION = 1
+
+    def __init__(self, mets_filename : str) -> None:
+        """
+        Args:
+            mets_filename (string): path of the METS file to index
+        """
+        self.mets_filename = mets_filename.replace('file://', '')
+        self.filename = self.mets_filename + '.idx'
+        self._stamp : Optional[Tuple[int, int, str]] = None
+
+    def __str__(self) -> str:
+        return 'OcrdMetsIndex[filename=%s]' % self.filename
+
+    @property
+    def stamp(self) -> Tuple[int, int, str]:
+        """
+        Size, modification time and hash of the METS file
+        """
+        if self._stamp is None:
+            st = stat(self.mets_filename)
+            with open(self.mets_filename, 'rb') as f:
+                digest = blake2b(f.read(), digest_size=16).hexdigest()
+            self._stamp = (st.st_size, st.st_mtime_ns, digest)
+        return self._stamp
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Read the index, if it exists and matches the METS file, otherwise return ``None``.
+        """
+        log = getLogger('ocrd.models.ocrd_mets_index')
+        if not exists(self.filename):
+            return None
+        try:
+            with open(self.filename, 'rb') as f:
+                # much faster than marshal.load, which reads the file in small chunks
+                data = marshal.loads(f.read())
+            if data['version'] != self.VERSION:
+                log.debug("Ignoring METS index %s of version %s", self.filename, data['version'])
+                return None
+            if tuple(data['stamp']) != self.stamp:
+                log.debug("Ignoring outdated METS index %s", self.filename)
+                return None
+        except (OSError, EOFError, ValueError, TypeError, KeyError) as e:
+            log.warning("Ignoring invalid METS index %s: %s", self.filename, e)
+            return None
+        return data
+
+    def save(self, data : Dict[str, Any]) -> None:
+        """
+        Write the index :py:attr:`data` (with the keys described above) for the current METS file.
+        Errors (e.g. in read-only workspaces) are logged, but otherwise ignored.
+        """
+        log = getLogger('ocrd.models.ocrd_mets_index')
+        tmp_filename = None
+        try:
+            data = dict(data, version=self.VERSION, stamp=self.stamp)
+            with NamedTemporaryFile(dir=dirname(self.filename) or '.', prefix='.mets-index-', delete=False) as f:
+                tmp_filename = f.name
+                f.write(marshal.dumps(data))
+            # same permissions as the METS file instead of the restrictive default of temporary files
+            chmod(tmp_filename, stat(self.mets_filename).st_mode & 0o777)
+            replace(tmp_filename, self.filename)
+            log.debug("Wrote METS index %s", self.filename)
+        except (OSError, ValueError) as e:
+            log.warning("Could not write METS index %s: %s", self.filename, e)
+            if tmp_filename and exists(tmp_filename):
+                unlink(tmp_filename)
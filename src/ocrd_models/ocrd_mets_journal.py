@@ -0,0 +1,96 @@
+"""
+Write-ahead journal of changes to a METS file
+"""
+import json
+from os import fsync, stat, unlink
+from os.path import exists
+from typing import Dict, List
+
+from ocrd_utils import getLogger
+
+class OcrdMetsJournal():
+    """
+    Append-only journal of the changes to a METS file (in ``<METS file>.journal``), as recorded
+    by :py:meth:`ocrd_models.ocrd_mets.OcrdMets.pop_journal`.
+
+    Appending the changes costs time proportional to the changes, not to the size of the METS.
+    The first line is a header identifying the state (size and modification time) of the METS file
+    the changes apply to, so a journal left behind after the METS was rewritten in full is
+    recognized as stale. Each further line is a single change.
+    """
+
+    def __init__(self, mets_filename : str) -> None:
+        """
+        Args:
+            mets_filename (string): path of the METS file to journal changes for
+        """
+        self.mets_filename = mets_filename
+        self.filename = mets_filename + '.journal'
+        # number of changes in the journal file
+        self.entries_count = 0
+
+    def __str__(self) -> str:
+        return 'OcrdMetsJournal[filename=%s,entries=%d]' % (self.filename, self.entries_count)
+
+    def _stamp(self) -> Dict[str, int]:
+        st = stat(self.mets_filename)
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    @property
+    def exists(self) -> bool:
+        """
+        Whether the journal file exists
+        """
+        return exists(self.filename)
+
+    def load(self) -> List[str]:
+        """
+        Read the changes from the journal file, to be passed to
+        :py:meth:`ocrd_models.ocrd_mets.OcrdMets.replay_journal`.
+
+        A stale journal is removed. A trailing incomplete change (from an interrupted write) is ignored.
+        """
+        log = getLogger('ocrd.models.ocrd_mets_journal')
+        if not self.exists:
+            return []
+        with open(self.filename, 'rb+') as f:
+            content = f.read()
+            # anything after the last newline is left over from an interrupted write
+            if content and not content.endswith(b'\n'):
+                log.warning("Ignoring incomplete last entry of METS journal %s", self.filename)
+                content = content[:content.rfind(b'\n') + 1]
+                f.truncate(len(content))
+        lines = content.decode('utf-8').split('\n')[:-1]
+        try:
+            stale = not lines or json.loads(lines[0]) != self._stamp()
+        except (ValueError, FileNotFoundError):
+            stale = True
+        if stale:
+            log.warning("Removing stale METS journal %s", self.filename)
+            self.discard()
+            return []
+        self.entries_count = len(lines) - 1
+        log.info("Loaded %d changes from METS journal %s", self.entries_count, self.filename)
+        return lines[1:]
+
+    def append(self, entries : List[str]) -> None:
+        """
+        Append the changes :py:attr:`entries` to the journal file and sync it to disk.
+        """
+        if not entries:
+            return
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            if not f.tell():
+                f.write(json.dumps(self._stamp()) + '\n')
+            f.write(''.join(entry + '\n' for entry in entries))
+            f.flush()
+            fsync(f.fileno())
+        self.entries_count += len(entries)
+
+    def discard(self) -> None:
+        """
+        Remove the journal file (after its changes have been written to the METS file).
+        """
+        if self.exists:
+            unlink(self.filename)
+        self.entries_count = 0
@@ -0,0 +1,487 @@
+"""
+Read-only API to METS, streamed with ``iterparse`` instead of parsing the full tree
+"""
+from io import BytesIO
+from os.path import exists
+import re
+from threading import RLock
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from ocrd_utils import getLogger, REGEX_PREFIX
+from ocrd_utils.config import config
+
+from .constants import (
+    NAMESPACES as NS,
+    TAG_METS_AGENT,
+    TAG_METS_DIV,
+    TAG_METS_FILE,
+    TAG_METS_FILEGRP,
+    TAG_METS_FILESEC,
+    TAG_METS_METSHDR,
+    TAG_METS_STRUCTMAP,
+    IDENTIFIER_PRIORITY,
+    TAG_MODS_IDENTIFIER,
+    METS_PAGE_DIV_ATTRIBUTE
+)
+from .ocrd_xml_base import ET      # type: ignore
+from .ocrd_file import OcrdFileRecord
+from .ocrd_agent import OcrdAgent
+from .ocrd_mets import OcrdMets
+from .ocrd_mets_index import OcrdMetsIndex
+
+REGEX_PREFIX_LEN = len(REGEX_PREFIX)
+
+class OcrdPageRecord(NamedTuple):
+    """
+    Compact, immutable snapshot of a physical ``mets:div[@TYPE="page"]``.
+    Provides :py:meth:`get` like the ``lxml`` element it replaces.
+    """
+    ID : str
+    ORDER : Optional[str] = None
+    ORDERLABEL : Optional[str] = None
+    LABEL : Optional[str] = None
+    CONTENTIDS : Optional[str] = None
+
+    def get(self, key : str, default : Optional[str] = None) -> Optional[str]:
+        """
+        Get the attribute :py:attr:`key` of the ``mets:div``, or :py:attr:`default` if unset
+        """
+        if key not in self._fields:
+            return default
+        val = getattr(self, key)
+        return default if val is None else val
+
+class ReadOnlyOcrdMets(OcrdMets):
+    """
+    Substitute for :py:class:`ocrd_models.ocrd_mets.OcrdMets` for read-only access:
+    Instead of parsing the full element tree, stream ``mets:fileSec`` and the physical
+    ``mets:structMap`` with ``lxml.etree.iterparse`` into compact
+    :py:class:`ocrd_models.ocrd_file.OcrdFileRecord` and :py:class:`OcrdPageRecord`
+    entries, discarding the elements as soon as they have been indexed.
+
+    Provides :py:meth:`find_files`, :py:meth:`find_all_files`, :py:attr:`file_groups`,
+    :py:attr:`physical_pages`, :py:meth:`get_physical_pages`, :py:attr:`physical_pages_labels`,
+    :py:attr:`unique_identifier` and :py:attr:`agents`. Everything else (modification and
+    serialization) raises :py:class:`NotImplementedError`.
+    """
+    # File records of each fileGrp (in document order of the fileGrps), by @ID
+    _files : Dict[str, Dict[str, OcrdFileRecord]]
+    # Position of each file in document order, by fileGrp and @ID
+    _file_order : Dict[str, Dict[str, int]]
+    # Index for the file records of each fileGrp - three nested dictionaries
+    # The outer dictionary's Key: fileGrp
+    # The middle dictionary's Key: name of the field ('mimetype', 'url', 'local_filename')
+    # The inner dictionary's Key: value of the field
+    # The inner dictionary's Value: @IDs of the files
+    # (Snapshots share the dictionaries of unchanged fileGrps, so they are never modified in place.)
+    _file_index : Dict[str, Dict[str, Dict[str, List[str]]]]
+
+    def __init__(self, filename : Optional[str] = None, content : Optional[bytes] = None) -> None:
+        """
+        Args:
+            filename (string): path of the METS file to stream
+            content (bytes): METS document to stream (if no :py:attr:`filename` is given)
+        """
+        # pylint: disable=super-init-not-called
+        if filename is None and content is None:
+            raise Exception("Must pass 'filename' or 'content' to " + self.__class__.__name__)
+        if content:
+            source = BytesIO(content if isinstance(content, bytes) else content.encode('utf-8'))
+        else:
+            assert filename
+            source = filename.replace('file://', '')
+            if not exists(source):
+                raise Exception('File does not exist: %s' % source)
+        self._initialize_records()
+        if not content and config.OCRD_METS_INDEX:
+            index = OcrdMetsIndex(source)
+            data = index.load()
+            if data is None:
+                data = self._stream(source)
+                index.save(data)
+        else:
+            data = self._stream(source)
+        self._load(data)
+
+    @classmethod
+    def from_index_data(cls, data : Dict[str, Any], generation : int = 0) -> 'ReadOnlyOcrdMets':
+        """
+        Instantiate from the :py:class:`ocrd_models.ocrd_mets_index.OcrdMetsIndex` :py:attr:`data`
+        of a METS (e.g. for :py:meth:`ocrd_models.ocrd_mets.OcrdMets.snapshot`) instead of a METS document
+        """
+        mets = cls.__new__(cls)
+        mets._initialize_records()
+        mets._generation = generation
+        mets._load(data)
+        return mets
+
+    @classmethod
+    def from_changes(cls, previous : 'ReadOnlyOcrdMets', mets : OcrdMets, file_ids : Iterable[str],
+                     page_ids : Iterable[str], header : bool, recreated : Iterable[Tuple[str, str]] = (),
+                     generation : int = 0) -> 'ReadOnlyOcrdMets':
+        """
+        Instantiate from the snapshot :py:attr:`previous` of the (cached) :py:attr:`mets` and the
+        ``@ID`` of the files and pages changed since (in the order of their first change, so new
+        files and pages are appended in document order), sharing all unchanged structures with it
+        (e.g. for :py:meth:`ocrd_models.ocrd_mets.OcrdMets.snapshot`). Files and pages which were
+        removed and added again (:py:attr:`recreated` as ``('files', ID)`` or ``('pages', ID)``)
+        are appended like new ones. The agents and identifiers are only read again if
+        :py:attr:`header` changed.
+        """
+        # pylint: disable=protected-access
+        snap = cls.__new__(cls)
+        snap._lock = RLock()
+        snap._cache_flag = True
+        snap._generation = generation
+        snap._file_groups = mets.file_groups
+        if header:
+            snap._identifiers = {}
+            for el_identifier in mets._tree.getroot().iterfind('.//mods:identifier', NS):
+                snap._identifiers.setdefault(el_identifier.get('type'), el_identifier.text)
+            snap._agents = [ET.fromstring(ET.tostring(el_agent, with_tail=False))
+                            for el_agent in mets._tree.getroot().iterfind('mets:metsHdr/mets:agent', NS)]
+        else:
+            snap._identifiers = previous._identifiers
+            snap._agents = previous._agents
+
+        # pages (and the files on them, whose pageId may have changed)
+        changed_file_ids = set(file_ids)
+        recreated = set(recreated)
+        file_ids = dict.fromkeys(file_ids)
+        page_ids = dict.fromkeys(page_ids)
+        if page_ids:
+            snap._page_cache = {attr: dict(previous._page_cache[attr]) for attr in METS_PAGE_DIV_ATTRIBUTE}
+            snap._fptr_cache = dict(previous._fptr_cache)
+            snap._page_order_cache = {}
+            for page_id in page_ids:
+                page = None
+                el_div = mets._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID].get(page_id)
+                if el_div is not None and el_div.get('ID') == page_id:
+                    el_structMap = next(el_div.iterancestors(TAG_METS_STRUCTMAP), None)
+                    if el_structMap is not None and el_structMap.get('TYPE') == 'PHYSICAL':
+                        page = OcrdPageRecord(*[el_div.get(attr.name) for attr in METS_PAGE_DIV_ATTRIBUTE])
+                old_page = previous._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID].get(page_id)
+                if old_page is not None:
+                    file_ids.update(dict.fromkeys(previous._fptr_cache[page_id]))
+                    for attr, val in zip(METS_PAGE_DIV_ATTRIBUTE, old_page):
+                        # changed pages keep their position
+                        if val is not None and snap._page_cache[attr].get(val) is old_page and \
+                                (page is None or attr != METS_PAGE_DIV_ATTRIBUTE.ID or ('pages', page_id) in recreated):
+                            del snap._page_cache[attr][val]
+                    snap._fptr_cache.pop(page_id, None)
+                if page is None:
+                    continue
+                for attr, val in zip(METS_PAGE_DIV_ATTRIBUTE, page):
+                    if val is not None:
+                        snap._page_cache[attr][val] = page
+                snap._fptr_cache[page_id] = dict.fromkeys(el_fptr.get('FILEID') for el_fptr in el_div
+                                                          if el_fptr.get('FILEID') is not None)
+                file_ids.update(dict.fromkeys(snap._fptr_cache[page_id]))
+        else:
+            snap._page_cache = previous._page_cache
+            snap._fptr_cache = previous._fptr_cache
+            snap._page_order_cache = previous._page_order_cache
+
+        # files: copy the dictionaries of the changed fileGrps only
+        snap._files = {}
+        snap._file_order = {}
+        snap._file_index = {}
+        for fileGrp in snap._file_groups:
+            if fileGrp in previous._files:
+                snap._files[fileGrp] = previous._files[fileGrp]
+                snap._file_order[fileGrp] = previous._file_order[fileGrp]
+                snap._file_index[fileGrp] = previous._file_index[fileGrp]
+            else:
+                snap._files[fileGrp] = {}
+                snap._file_order[fileGrp] = {}
+                snap._file_index[fileGrp] = {field: {} for field in ['mimetype', 'url', 'local_filename']}
+        page_of_file : Dict[str, str] = {}
+        for page_id in page_ids:
+            for file_id in snap._fptr_cache.get(page_id, {}):
+                page_of_file.setdefault(file_id, page_id)
+        snap._next_position = previous._next_position
+        copied : Set[str] = set()
+        def copy_on_write(fileGrp : str) -> None:
+            if fileGrp not in copied:
+                snap._files[fileGrp] = dict(snap._files[fileGrp])
+                snap._file_order[fileGrp] = dict(snap._file_order[fileGrp])
+                snap._file_index[fileGrp] = {field: dict(index) for field, index in snap._file_index[fileGrp].items()}
+                copied.add(fileGrp)
+        def unindex(fileGrp : str, record : OcrdFileRecord) -> None:
+            for field in ['mimetype', 'url', 'local_filename']:
+                key = getattr(record, field)
+                index = snap._file_index[fileGrp][field]
+                if key and key in index:
+                    index[key] = [ID for ID in index[key] if ID != record.ID]
+                    if not index[key]:
+                        del index[key]
+        for file_id in file_ids:
+            for fileGrp in snap._file_groups:
+                old_record = snap._files[fileGrp].get(file_id)
+                el_file = mets._file_cache.get(fileGrp, {}).get(file_id)
+                if old_record is None and el_file is None:
+                    continue
+                # the previous page, unless that changed
+                if old_record is not None and old_record.pageId and old_record.pageId not in page_ids:
+                    page_id = old_record.pageId
+                else:
+                    page_id = page_of_file.get(file_id)
+                if file_id not in changed_file_ids and old_record is not None and old_record.pageId == page_id:
+                    # only on a changed page
+                    continue
+                copy_on_write(fileGrp)
+                if old_record is not None:
+                    unindex(fileGrp, old_record)
+                    if el_file is None or ('files', file_id) in recreated:
+                        del snap._files[fileGrp][file_id]
+                        del snap._file_order[fileGrp][file_id]
+                if el_file is None:
+                    continue
+                mimetype, url, local_filename = mets._file_index_keys(el_file)
+                record = OcrdFileRecord(ID=file_id, fileGrp=fileGrp, mimetype=mimetype,
+                                        pageId=page_id,
+                                        url=url or '', local_filename=local_filename)
+                # changed files keep their position, new files are appended to their fileGrp
+                snap._files[fileGrp][file_id] = record
+                if file_id not in snap._file_order[fileGrp]:
+                    snap._file_order[fileGrp][file_id] = snap._next_position
+                    snap._next_position += 1
+                for field, key in [('mimetype', mimetype), ('url', url), ('local_filename', local_filename)]:
+                    if key:
+                        index = snap._file_index[fileGrp][field]
+                        index[key] = index.get(key, []) + [file_id]
+        return snap
+
+    def _initialize_records(self) -> None:
+        self._lock = RLock()
+        # the caches of OcrdMets are (partially) filled with records, so use the cached code paths
+        self._cache_flag = True
+        self._initialize_caches()
+        self._files = {}
+        self._file_order = {}
+        self._file_index = {}
+        self._next_position = 0
+
+    def _stream(self, source) -> Dict[str, Any]:
+        """
+        Stream the METS document into the data of a :py:class:`ocrd_models.ocrd_mets_index.OcrdMetsIndex`
+        """
+        data : Dict[str, Any] = {'file_groups': [], 'files': [], 'pages': [], 'identifiers': {}, 'agents': []}
+        root = None
+        fileGrp = None
+        in_physical = False
+        for event, el in ET.iterparse(source, events=('start', 'end'), remove_comments=True):
+            if event == 'start':
+                if root is None:
+                    root = el
+                elif el.tag == TAG_METS_FILEGRP:
+                    fileGrp = el.get('USE')
+                    data['file_groups'].append(fileGrp)
+                elif el.tag == TAG_METS_STRUCTMAP:
+                    in_physical = el.get('TYPE') == 'PHYSICAL'
+                continue
+            if el.tag == TAG_METS_FILE:
+                if el.getparent().getparent().tag == TAG_METS_FILESEC:
+                    data['files'].append((el.get('ID'), fileGrp, *self._file_index_keys(el)))
+                self._discard(el)
+            elif el.tag == TAG_METS_DIV and el.get('TYPE') == 'page':
+                data['pages'].append((*[el.get(attr.name) for attr in METS_PAGE_DIV_ATTRIBUTE],
+                                      [el_fptr.get('FILEID') for el_fptr in el], in_physical))
+                self._discard(el)
+            elif el.tag == TAG_MODS_IDENTIFIER:
+                data['identifiers'].setdefault(el.get('type'), el.text)
+            elif el.tag == TAG_METS_AGENT:
+                if el.getparent().getparent() is root:
+                    data['agents'].append(ET.tostring(el, with_tail=False))
+            elif el.tag == TAG_METS_STRUCTMAP:
+                in_physical = False
+            # free all top-level sections but the (small) metsHdr
+            if el.getparent() is root and el.tag != TAG_METS_METSHDR:
+                el.clear()
+        return data
+
+    def _load(self, data : Dict[str, Any]) -> None:
+        """
+        Fill the records and indexes from the :py:class:`ocrd_models.ocrd_mets_index.OcrdMetsIndex` :py:attr:`data`
+        """
+        log = getLogger('ocrd.models.ocrd_mets_readonly')
+        self._file_groups : List[str] = data['file_groups']
+        self._identifiers : Dict[str, str] = data['identifiers']
+        self._agents : List[ET._Element] = [ET.fromstring(agent) for agent in data['agents']]
+        page_of_file : Dict[str, str] = {}
+        for *attrs, file_ids, physical in data['pages']:
+            if not physical:
+                continue
+            page = OcrdPageRecord(*attrs)
+            for attr, val in zip(METS_PAGE_DIV_ATTRIBUTE, attrs):
+                if val is not None:
+                    self._page_cache[attr][val] = page
+            self._fptr_cache[page.ID] = {}
+            for file_id in file_ids:
+                if file_id is not None:
+                    self._fptr_cache[page.ID][file_id] = None
+                    page_of_file.setdefault(file_id, page.ID)
+        for fileGrp in self._file_groups:
+            self._files[fileGrp] = {}
+            self._file_order[fileGrp] = {}
+            self._file_index[fileGrp] = {field: {} for field in ['mimetype', 'url', 'local_filename']}
+        for pos, (ID, fileGrp, mimetype, url, local_filename) in enumerate(data['files']):
+            if ID is None or fileGrp not in self._files:
+                continue
+            self._files[fileGrp][ID] = OcrdFileRecord(ID=ID, fileGrp=fileGrp, mimetype=mimetype,
+                                                      pageId=page_of_file.get(ID),
+                                                      url=url or '', local_filename=local_filename)
+            self._file_order[fileGrp][ID] = pos
+            for field, key in [('mimetype', mimetype), ('url', url), ('local_filename', local_filename)]:
+                if key:
+                    self._file_index[fileGrp][field].setdefault(key, []).append(ID)
+        self._next_position = len(data['files'])
+        log.debug("Loaded %d files in %d fileGrps and %d pages", len(data['files']),
+                  len(self._file_groups), len(self._fptr_cache))
+
+    @staticmethod
+    def _discard(el : ET._Element) -> None:
+        """
+        Free an element and its already processed preceding siblings
+        """
+        el.clear(keep_tail=True)
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+
+    @property
+    def _tree(self):
+        raise NotImplementedError("ReadOnlyOcrdMets has no element tree - load the METS with OcrdMets to modify or serialize it")
+
+    def snapshot(self) -> 'ReadOnlyOcrdMets':
+        """
+        Already immutable, so this is its own snapshot
+        """
+        return self
+
+    def __str__(self) -> str:
+        """
+        String representation
+        """
+        return 'ReadOnlyOcrdMets[fileGrps=%s,files=%s]' % (self.file_groups, list(self.find_files()))
+
+    @property
+    def unique_identifier(self) -> Optional[str]:
+        """
+        Get the unique identifier by looking through ``mods:identifier``
+        See `specs <https://ocr-d.de/en/spec/mets#unique-id-for-the-document-processed>`_ for details.
+        """
+        for t in IDENTIFIER_PRIORITY:
+            if t in self._identifiers:
+                return self._identifiers[t]
+
+    @property
+    def agents(self) -> List[OcrdAgent]:
+        """
+        List all :py:class:`ocrd_models.ocrd_agent.OcrdAgent`s
+        """
+        return [OcrdAgent(el_agent) for el_agent in self._agents]
+
+    @property
+    def file_groups(self) -> List[str]:
+        """
+        List the `@USE` of all `mets:fileGrp` entries.
+        """
+        return list(self._file_groups)
+
+    def find_files(
+        self,
+        ID : Optional[str] = None,
+        fileGrp : Optional[str] = None,
+        pageId : Optional[str] = None,
+        mimetype : Optional[str] = None,
+        url : Optional[str] = None,
+        local_filename : Optional[str] = None,
+        local_only : bool = False,
+        include_fileGrp : Optional[List[str]] = None,
+        exclude_fileGrp : Optional[List[str]] = None,
+        as_records : bool = True,
+    ) -> Iterator[OcrdFileRecord]:
+        """
+        Search ``mets:file`` entries in this METS document and yield results.
+        Same arguments and semantics as :py:meth:`ocrd_models.ocrd_mets.OcrdMets.find_files`,
+        but always yields records.
+
+        Yields:
+            :py:class:`ocrd_models.ocrd_file.OcrdFileRecord` instantiations
+        """
+        pageId_list = set()
+        if pageId:
+            for div in self.get_physical_pages(for_pageIds=pageId, return_divs=True):
+                pageId_list.update(self._fptr_cache[div.get('ID')])
+
+        literals = {'ID': ID, 'fileGrp': fileGrp, 'mimetype': mimetype, 'url': url, 'local_filename': local_filename}
+        patterns = {field: re.compile(val[REGEX_PREFIX_LEN:]) for field, val in literals.items()
+                    if val and field != 'local_filename' and val.startswith(REGEX_PREFIX)}
+        if fileGrp and 'fileGrp' not in patterns:
+            file_groups = [fileGrp] if fileGrp in self._files else []
+        else:
+            file_groups = list(self._files)
+
+        for file_grp in file_groups:
+            if exclude_fileGrp and file_grp in exclude_fileGrp:
+                continue
+            if include_fileGrp and file_grp not in include_fileGrp:
+                continue
+            records = self._files[file_grp]
+            # literal filters can be looked up in the index
+            indexed = [self._file_index[file_grp][field].get(val, []) for field, val in literals.items()
+                       if field in self._file_index[file_grp] and val and field not in patterns]
+            if ID and 'ID' not in patterns:
+                indexed.append([ID] if ID in records else [])
+            if pageId is not None:
+                indexed.append([file_id for file_id in pageId_list if file_id in records])
+            if indexed:
+                order = self._file_order[file_grp]
+                candidates = [records[file_id] for file_id in sorted(min(indexed, key=len), key=order.__getitem__)]
+            else:
+                candidates = records.values()
+
+            for cand in candidates:
+                if pageId is not None and cand.ID not in pageId_list:
+                    continue
+                if any(val and field not in patterns and getattr(cand, field) != val
+                       for field, val in literals.items()):
+                    continue
+                if any(not pattern.fullmatch(getattr(cand, field) or '') for field, pattern in patterns.items()):
+                    continue
+                if url and not cand.url:
+                    continue
+                if local_only and not cand.local_filename:
+                    continue
+                yield cand
+
+    def get_physical_page_for_file(self, ocrd_file) -> Optional[str]:
+        """
+        Get the physical page ID (``@ID`` of the physical ``mets:structMap`` ``mets:div`` entry)
+        corresponding to the ``mets:file`` :py:attr:`ocrd_file`.
+        """
+        for records in self._files.values():
+            if ocrd_file.ID in records:
+                return records[ocrd_file.ID].pageId
+        return None
+
+    @property
+    def physical_pages_labels(self) -> Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        Map all page IDs (the ``@ID`` of each physical ``mets:structMap`` ``mets:div``) to their
+        ``@ORDER``, ``@ORDERLABEL`` and ``@LABEL`` attributes, if any.
+        """
+        return {page.ID: (page.ORDER, page.ORDERLABEL, page.LABEL)
+                for page in self._page_cache[METS_PAGE_DIV_ATTRIBUTE.ID].values()}
+
+def _read_only(name):
+    def method(self, *args, **kwargs):
+        raise NotImplementedError(f"ReadOnlyOcrdMets does not support '{name}' - load the METS with OcrdMets to modify it")
+    method.__name__ = name
+    return method
+
+for _name in ['add_agent', 'add_file_group', 'rename_file_group', 'remove_file_group', 'add_file',
+              'remove_file', 'remove_files', 'remove_one_file', 'set_physical_page_for_file',
+              'update_physical_page_attributes', 'remove_physical_page', 'remove_physical_page_fptr', 'merge',
+              'apply', 'to_xml']:
+    setattr(ReadOnlyOcrdMets, _name, _read_only(_name))
@@ -0,0 +1,757 @@
+"""
+API to METS with the files and physical pages in an indexed SQLite database instead of the element tree
+"""
+from collections.abc import Mapping
+from copy import deepcopy
+from functools import lru_cache
+from io import BytesIO
+import json
+from os.path import exists
+import re
+import sqlite3
+from threading import RLock
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from ocrd_utils import getLogger, REGEX_PREFIX, REGEX_FILE_ID
+
+from .constants import (
+    NAMESPACES as NS,
+    TAG_METS_DIV,
+    TAG_METS_FILE,
+    TAG_METS_FILEGRP,
+    TAG_METS_FILESEC,
+    TAG_METS_FLOCAT,
+    TAG_METS_FPTR,
+    TAG_METS_STRUCTMAP,
+    METS_PAGE_DIV_ATTRIBUTE
+)
+from .ocrd_xml_base import ET      # type: ignore
+from .ocrd_file import OcrdFile, OcrdFileRecord
+from .ocrd_mets import OcrdMets, journaled
+from .ocrd_mets_readonly import OcrdPageRecord
+from .utils import xmllint_format
+
+REGEX_PREFIX_LEN = len(REGEX_PREFIX)
+
+# columns of the page table for OcrdPageRecord
+PAGE_COLUMNS = ', '.join('page."%s"' % attr.name for attr in METS_PAGE_DIV_ATTRIBUTE)
+
+SCHEMA = '''
+CREATE TABLE file_grp (pos INTEGER PRIMARY KEY, fileGrp TEXT UNIQUE NOT NULL, xml BLOB NOT NULL);
+CREATE TABLE file (pos INTEGER PRIMARY KEY, fileGrp TEXT NOT NULL, ID TEXT, MIMETYPE TEXT,
+                   url TEXT, local_filename TEXT, xml BLOB NOT NULL);
+CREATE TABLE page (pos INTEGER PRIMARY KEY, %s, xml BLOB NOT NULL);
+CREATE TABLE fptr (pos INTEGER PRIMARY KEY, page INTEGER NOT NULL, FILEID TEXT NOT NULL);
+''' % ', '.join('"%s" TEXT' % attr.name for attr in METS_PAGE_DIV_ATTRIBUTE)
+
+# created after the initial bulk load
+INDEXES = '''
+CREATE INDEX file_fileGrp_ID ON file (fileGrp, ID);
+CREATE INDEX file_ID ON file (ID);
+CREATE INDEX file_MIMETYPE ON file (MIMETYPE);
+CREATE INDEX file_url ON file (url);
+CREATE INDEX file_local_filename ON file (local_filename);
+CREATE INDEX fptr_page ON fptr (page);
+CREATE INDEX fptr_FILEID ON fptr (FILEID);
+''' + ''.join('CREATE INDEX page_%s ON page ("%s");\n' % (attr.name, attr.name) for attr in METS_PAGE_DIV_ATTRIBUTE)
+
+@lru_cache(maxsize=128)
+def _compile(pattern : str) -> re.Pattern:
+    return re.compile(pattern)
+
+def _fullmatch(pattern : str, value : Optional[str]) -> bool:
+    """
+    SQL function ``fullmatch(pattern, value)`` for the regular expression filters of ``find_files``
+    """
+    return _compile(pattern).fullmatch(value or '') is not None
+
+class _PageAttributeIndex(Mapping):
+    """
+    Read-only view of the ``page`` table mapping each value of one ``METS_PAGE_DIV_ATTRIBUTE``
+    to the :py:class:`ocrd_models.ocrd_mets_readonly.OcrdPageRecord` of the page, standing in
+    for the page cache of :py:class:`ocrd_models.ocrd_mets.OcrdMets`.
+    """
+
+    def __init__(self, db : sqlite3.Connection, attr : METS_PAGE_DIV_ATTRIBUTE) -> None:
+        self._db = db
+        self._column = 'page."%s"' % attr.name
+
+    def __getitem__(self, val : str) -> OcrdPageRecord:
+        # like the page cache, the last page wins for non-unique values
+        row = self._db.execute(f'SELECT {PAGE_COLUMNS} FROM page WHERE {self._column} = ? '
+                               'ORDER BY pos DESC LIMIT 1', (val,)).fetchone()
+        if row is None:
+            raise KeyError(val)
+        return OcrdPageRecord(*row)
+
+    def __contains__(self, val : object) -> bool:
+        return self._db.execute(f'SELECT 1 FROM page WHERE {self._column} = ? LIMIT 1', (val,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([val for val, in self._db.execute(
+            f'SELECT {self._column} FROM page WHERE {self._column} IS NOT NULL '
+            f'GROUP BY {self._column} ORDER BY MIN(pos)')])
+
+    def __len__(self) -> int:
+        return self._db.execute(f'SELECT COUNT(DISTINCT {self._column}) FROM page').fetchone()[0]
+
+class SqliteOcrdMets(OcrdMets):
+    """
+    Substitute for :py:class:`ocrd_models.ocrd_mets.OcrdMets` for very large METS files:
+    The ``mets:file`` entries of the ``mets:fileSec`` and the ``mets:div[@TYPE="page"]`` entries
+    (with their ``mets:fptr``) of the physical ``mets:structMap`` are streamed with
+    ``lxml.etree.iterparse`` into an indexed SQLite database (in a private temporary file),
+    so only the rest of the document is kept in memory as element tree. Queries and changes
+    go to the database, the METS XML is only generated by :py:meth:`to_xml`.
+
+    Provides the same API as :py:class:`ocrd_models.ocrd_mets.OcrdMets`. The
+    :py:class:`ocrd_models.ocrd_file.OcrdFile` instances returned are detached copies of
+    the ``mets:file`` entries: changes through their setters are written to the database,
+    but not propagated to other instances for the same ``mets:file``.
+    """
+    # snapshots are taken from the database, not from the caches
+    _incremental_snapshots = False
+
+    def __init__(self, filename : Optional[str] = None, content : Optional[Union[str, bytes]] = None) -> None:
+        """
+        Args:
+            filename (string): path of the METS file to load
+            content (bytes): METS document to load (if no :py:attr:`filename` is given)
+        """
+        # pylint: disable=super-init-not-called
+        if filename is None and content is None:
+            raise Exception("Must pass 'filename' or 'content' to " + self.__class__.__name__)
+        if content:
+            source = BytesIO(content if isinstance(content, bytes) else content.encode('utf-8'))
+        else:
+            assert filename
+            source = filename.replace('file://', '')
+            if not exists(source):
+                raise Exception('File does not exist: %s' % source)
+        # the database is a disposable working copy of the METS file
+        self._lock = RLock()
+        self._db = sqlite3.connect('', check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode = OFF')
+        self._db.execute('PRAGMA synchronous = OFF')
+        self._db.create_function('fullmatch', 2, _fullmatch, deterministic=True)
+        self._db.executescript(SCHEMA)
+        # the page "cache" queries the database, so use the cached code paths of OcrdMets
+        self._cache_flag = True
+        self._page_cache = {attr: _PageAttributeIndex(self._db, attr) for attr in METS_PAGE_DIV_ATTRIBUTE}
+        self._page_order_cache = {}
+        # database row of the mets:file elements between _unindex_file and _index_file
+        self._file_rows : Dict[int, int] = {}
+        self._load(source)
+        self._db.executescript(INDEXES)
+
+    def _load(self, source) -> None:
+        """
+        Stream the METS document into the database, keeping the rest as :py:attr:`_tree`
+        """
+        log = getLogger('ocrd.models.ocrd_mets_sqlite')
+        files : List[Tuple] = []
+        pages : List[Tuple] = []
+        fptrs : List[Tuple[int, str]] = []
+        # elements to remove from the skeleton at the end of their parent
+        el_files : List[ET._Element] = []
+        el_divs : List[ET._Element] = []
+        n_files = n_pages = 0
+        def flush():
+            self._db.executemany('INSERT INTO file (fileGrp, ID, MIMETYPE, url, local_filename, xml) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', files)
+            self._db.executemany('INSERT INTO page VALUES (?, %s)' % ', '.join('?' * (len(METS_PAGE_DIV_ATTRIBUTE) + 1)), pages)
+            self._db.executemany('INSERT INTO fptr (page, FILEID) VALUES (?, ?)', fptrs)
+            files.clear()
+            pages.clear()
+            fptrs.clear()
+        root = None
+        for event, el in ET.iterparse(source, events=('start', 'end'), remove_blank_text=True):
+            if event == 'start':
+                if root is None:
+                    root = el
+                continue
+            el_parent = el.getparent()
+            if el_parent is None:
+                continue
+            if el.tag == TAG_METS_FILE and el_parent.tag == TAG_METS_FILEGRP and \
+                    el_parent.getparent().tag == TAG_METS_FILESEC:
+                files.append((el_parent.get('USE'), el.get('ID'), *self._file_index_keys(el),
+                              ET.tostring(el, with_tail=False)))
+                el.clear()
+                el_files.append(el)
+                n_files += 1
+            elif el.tag == TAG_METS_FILEGRP and el_parent.tag == TAG_METS_FILESEC:
+                for el_file in el_files:
+                    el.remove(el_file)
+                el_files.clear()
+                self._db.execute('INSERT OR IGNORE INTO file_grp (fileGrp, xml) VALUES (?, ?)',
+                                 (el.get('USE'), ET.tostring(el, with_tail=False)))
+            elif el.tag == TAG_METS_FILESEC:
+                for el_fileGrp in el.findall('mets:fileGrp', NS):
+                    el.remove(el_fileGrp)
+            elif el.tag == TAG_METS_DIV and el.get('TYPE') == 'page' and el_parent.get('TYPE') == 'physSequence' and \
+                    el_parent.getparent().tag == TAG_METS_STRUCTMAP and el_parent.getparent().get('TYPE') == 'PHYSICAL':
+                n_pages += 1
+                # fptrs without FILEID (e.g. with mets:area) cannot be looked up and stay in the mets:div
+                for el_fptr in list(el.iterchildren(TAG_METS_FPTR)):
+                    if el_fptr.get('FILEID') is not None:
+                        fptrs.append((n_pages, el_fptr.get('FILEID')))
+                        el.remove(el_fptr)
+                pages.append((n_pages, *[el.get(attr.name) for attr in METS_PAGE_DIV_ATTRIBUTE],
+                              ET.tostring(el, with_tail=False)))
+                el.clear()
+                el_divs.append(el)
+            elif el.tag == TAG_METS_DIV and el.get('TYPE') == 'physSequence':
+                for el_div in el_divs:
+                    el.remove(el_div)
+                el_divs.clear()
+            if len(files) + len(pages) >= 10000:
+                flush()
+        flush()
+        self._tree = ET.ElementTree(root)
+        log.debug("Loaded %d files and %d pages into SQLite", n_files, n_pages)
+
+    def __str__(self) -> str:
+        """
+        String representation
+        """
+        return 'SqliteOcrdMets[fileGrps=%s,files=%s]' % (self.file_groups, list(self.find_files()))
+
+    def _ocrd_file(self, fileGrp : str, xml : bytes) -> OcrdFile:
+        """
+        Instantiate a :py:class:`ocrd_models.ocrd_file.OcrdFile` for a ``mets:file`` in the database
+        (in a detached ``mets:fileGrp`` providing its ``fileGrp``)
+        """
+        el_fileGrp = ET.Element(TAG_METS_FILEGRP)
+        el_fileGrp.set('USE', fileGrp)
+        el_fileGrp.append(ET.fromstring(xml))
+        return OcrdFile(el_fileGrp[0], mets=self)
+
+    @staticmethod
+    def _file_element(el_fileGrp : ET._Element, record : Dict[str, Any]) -> ET._Element:
+        """
+        Create a ``mets:file`` in :py:attr:`el_fileGrp` with the ``ID``, ``mimetype``,
+        ``local_filename`` and ``url`` of :py:attr:`record`
+        """
+        el_file = ET.SubElement(el_fileGrp, TAG_METS_FILE)
+        el_file.set('ID', record['ID'])
+        if record.get('mimetype') is not None:
+            el_file.set('MIMETYPE', record['mimetype'])
+        if record.get('local_filename'):
+            el_FLocat = ET.SubElement(el_file, TAG_METS_FLOCAT)
+            el_FLocat.set("{%s}href" % NS["xlink"], str(record['local_filename']))
+            el_FLocat.set("LOCTYPE", "OTHER")
+            el_FLocat.set("OTHERLOCTYPE", "FILE")
+        if record.get('url'):
+            el_FLocat = ET.SubElement(el_file, TAG_METS_FLOCAT)
+            el_FLocat.set("{%s}href" % NS["xlink"], record['url'])
+            el_FLocat.set("LOCTYPE", "URL")
+        return el_file
+
+    def _insert_files(self, els_file : List[ET._Element]) -> None:
+        self._db.executemany('INSERT INTO file (fileGrp, ID, MIMETYPE, url, local_filename, xml) VALUES (?, ?, ?, ?, ?, ?)',
+                             [(el_file.getparent().get('USE'), el_file.get('ID'), *self._file_index_keys(el_file),
+                               ET.tostring(el_file, with_tail=False)) for el_file in els_file])
+
+    def _unindex_file(self, el_file : ET._Element) -> None:
+        """
+        Look up the database row of a ``mets:file`` about to be changed (see :py:meth:`_index_file`)
+        """
+        el_fileGrp = el_file.getparent()
+        if el_fileGrp is None or el_file.get('ID') is None:
+            return
+        row = self._db.execute('SELECT pos FROM file WHERE fileGrp = ? AND ID = ? ORDER BY pos LIMIT 1',
+                               (el_fileGrp.get('USE'), el_file.get('ID'))).fetchone()
+        if row is not None:
+            self._file_rows[id(el_file)] = row[0]
+
+    def _index_file(self, el_file : ET._Element) -> None:
+        """
+        Write a changed ``mets:file`` back to its database row (looked up by :py:meth:`_unindex_file`)
+        """
+        pos = self._file_rows.pop(id(el_file), None)
+        if pos is None:
+            return
+        self._db.execute('UPDATE file SET ID = ?, MIMETYPE = ?, url = ?, local_filename = ?, xml = ? WHERE pos = ?',
+                         (el_file.get('ID'), *self._file_index_keys(el_file), ET.tostring(el_file, with_tail=False), pos))
+
+    def _physical_sequence(self) -> ET._Element:
+        """
+        Find or create the ``mets:div[@TYPE="physSequence"]`` of the physical ``mets:structMap``
+        """
+        el_structmap = self._tree.getroot().find('mets:structMap[@TYPE="PHYSICAL"]', NS)
+        if el_structmap is None:
+            el_structmap = ET.SubElement(self._tree.getroot(), TAG_METS_STRUCTMAP)
+            el_structmap.set('TYPE', 'PHYSICAL')
+        el_seqdiv = el_structmap.find('mets:div[@TYPE="physSequence"]', NS)
+        if el_seqdiv is None:
+            el_seqdiv = ET.SubElement(el_structmap, TAG_METS_DIV)
+            el_seqdiv.set('TYPE', 'physSequence')
+        return el_seqdiv
+
+    def _page_pos(self, pageId : str) -> Optional[int]:
+        row = self._db.execute('SELECT pos FROM page WHERE ID = ? ORDER BY pos DESC LIMIT 1', (pageId,)).fetchone()
+        return None if row is None else row[0]
+
+    def _add_page(self, pageId : str, order : Optional[str] = None, orderlabel : Optional[str] = None) -> int:
+        """
+        Add a physical page ``mets:div`` and return its database row
+        """
+        self._physical_sequence()
+        el_pagediv = ET.Element(TAG_METS_DIV)
+        el_pagediv.set('TYPE', 'page')
+        el_pagediv.set('ID', pageId)
+        if order:
+            el_pagediv.set('ORDER', order)
+        if orderlabel:
+            el_pagediv.set('ORDERLABEL', orderlabel)
+        self._page_order_cache.clear()
+        return self._db.execute('INSERT INTO page (ID, "ORDER", ORDERLABEL, xml) VALUES (?, ?, ?, ?)',
+                                (pageId, order or None, orderlabel or None, ET.tostring(el_pagediv))).lastrowid
+
+    def _remove_fptrs(self, file_ids : List[str]) -> None:
+        """
+        Delete all ``mets:fptr`` to :py:attr:`file_ids` and the pages left empty
+        """
+        file_ids_json = json.dumps(file_ids)
+        pages = [page for page, in self._db.execute(
+            'SELECT DISTINCT page FROM fptr WHERE FILEID IN (SELECT value FROM json_each(?))', (file_ids_json,))]
+        if not pages:
+            return
+        self._db.execute('DELETE FROM fptr WHERE FILEID IN (SELECT value FROM json_each(?))', (file_ids_json,))
+        self._db.execute('DELETE FROM page WHERE pos IN (SELECT value FROM json_each(?)) AND '
+                         'NOT EXISTS (SELECT 1 FROM fptr WHERE fptr.page = page.pos)', (json.dumps(pages),))
+        self._page_order_cache.clear()
+
+    def _export_tree(self) -> ET._Element:
+        """
+        Generate the full METS document from the element tree and the database
+        """
+        root = deepcopy(self._tree.getroot())
+        el_fileSec = root.find('mets:fileSec', NS)
+        el_fileGrps : Dict[str, ET._Element] = {}
+        for fileGrp, xml in self._db.execute('SELECT fileGrp, xml FROM file_grp ORDER BY pos'):
+            if el_fileSec is None:
+                el_fileSec = ET.SubElement(root, TAG_METS_FILESEC)
+            el_fileGrp = ET.fromstring(xml)
+            el_fileGrp.set('USE', fileGrp)
+            el_fileSec.append(el_fileGrp)
+            el_fileGrps[fileGrp] = el_fileGrp
+        for fileGrp, xml in self._db.execute('SELECT fileGrp, xml FROM file ORDER BY pos'):
+            el_fileGrps[fileGrp].append(ET.fromstring(xml))
+        page_fptrs : Dict[int, List[str]] = {}
+        for page, file_id in self._db.execute('SELECT page, FILEID FROM fptr ORDER BY pos'):
+            page_fptrs.setdefault(page, []).append(file_id)
+        el_seqdiv = None
+        for pos, *attrs, xml in self._db.execute(f'SELECT pos, {PAGE_COLUMNS}, xml FROM page ORDER BY pos'):
+            if el_seqdiv is None:
+                el_seqdiv = root.find('mets:structMap[@TYPE="PHYSICAL"]/mets:div[@TYPE="physSequence"]', NS)
+            el_pagediv = ET.fromstring(xml)
+            for attr, val in zip(METS_PAGE_DIV_ATTRIBUTE, attrs):
+                if val is None:
+                    el_pagediv.attrib.pop(attr.name, None)
+                else:
+                    el_pagediv.set(attr.name, val)
+            for file_id in page_fptrs.get(pos, []):
+                ET.SubElement(el_pagediv, TAG_METS_FPTR).set('FILEID', file_id)
+            el_seqdiv.append(el_pagediv)
+        return root
+
+    def to_xml(self, xmllint=False):
+        """
+        Serialize the METS document as pretty-printed XML
+
+        Args:
+            xmllint (boolean): Format with ``xmllint`` in addition to pretty-printing
+        """
+        ret = ET.tostring(ET.ElementTree(self._export_tree()), pretty_print=True, encoding='UTF-8')
+        if xmllint:
+            ret = xmllint_format(ret)
+        return ret
+
+    def _index_data(self, tree_root : Optional[ET._Element] = None) -> Dict[str, Any]:
+        return super()._index_data(self._export_tree() if tree_root is None else tree_root)
+
+    @property
+    def file_groups(self) -> List[str]:
+        """
+        List the `@USE` of all `mets:fileGrp` entries.
+        """
+        return [fileGrp for fileGrp, in self._db.execute('SELECT fileGrp FROM file_grp ORDER BY pos')]
+
+    def find_files(
+        self,
+        ID : Optional[str] = None,
+        fileGrp : Optional[str] = None,
+        pageId : Optional[str] = None,
+        mimetype : Optional[str] = None,
+        url : Optional[str] = None,
+        local_filename : Optional[str] = None,
+        local_only : bool = False,
+        include_fileGrp : Optional[List[str]] = None,
+        exclude_fileGrp : Optional[List[str]] = None,
+        as_records : bool = False,
+    ) -> Iterator[Union[OcrdFile, OcrdFileRecord]]:
+        """
+        Search ``mets:file`` entries in this METS document and yield results.
+        Same arguments and semantics as :py:meth:`ocrd_models.ocrd_mets.OcrdMets.find_files`,
+        but all filters are evaluated by a single database query.
+        """
+        conditions : List[str] = []
+        params : List[Any] = []
+        if pageId is not None:
+            conditions.append('file.ID IN (SELECT FILEID FROM fptr JOIN page ON page.pos = fptr.page '
+                              'WHERE page.ID IN (SELECT value FROM json_each(?)))')
+            params.append(json.dumps(self.get_physical_pages(for_pageIds=pageId) if pageId else []))
+        for column, val in [('ID', ID), ('fileGrp', fileGrp), ('MIMETYPE', mimetype), ('url', url)]:
+            if not val:
+                continue
+            if val.startswith(REGEX_PREFIX):
+                conditions.append(f'fullmatch(?, file.{column})')
+                params.append(val[REGEX_PREFIX_LEN:])
+            else:
+                conditions.append(f'file.{column} = ?')
+                params.append(val)
+        if url:
+            conditions.append('file.url IS NOT NULL')
+        if local_filename:
+            conditions.append('file.local_filename = ?')
+            params.append(local_filename)
+        if local_only:
+            conditions.append('file.local_filename IS NOT NULL')
+        if exclude_fileGrp:
+            conditions.append('file.fileGrp NOT IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(list(exclude_fileGrp)))
+        if include_fileGrp:
+            conditions.append('file.fileGrp IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(list(include_fileGrp)))
+        positions = [pos for pos, in self._db.execute(
+            'SELECT file.pos FROM file JOIN file_grp ON file_grp.fileGrp = file.fileGrp %s '
+            'ORDER BY file_grp.pos, file.pos' % ('WHERE ' + ' AND '.join(conditions) if conditions else ''), params)]
+        if as_records:
+            columns = ('file.ID, file.fileGrp, file.MIMETYPE, (SELECT page.ID FROM fptr JOIN page ON page.pos = fptr.page '
+                       'WHERE fptr.FILEID = file.ID ORDER BY page.pos LIMIT 1), file.url, file.local_filename')
+        else:
+            columns = 'file.fileGrp, file.xml'
+        # fetch the results in chunks, so neither are all held in memory, nor can changes
+        # by the caller in between interfere with the query
+        for chunk_start in range(0, len(positions), 1000):
+            chunk = positions[chunk_start:chunk_start + 1000]
+            rows = {pos: row for pos, *row in self._db.execute(
+                f'SELECT file.pos, {columns} FROM file WHERE file.pos IN (SELECT value FROM json_each(?))',
+                (json.dumps(chunk),))}
+            for pos in chunk:
+                if pos not in rows:
+                    continue
+                if as_records:
+                    cand_ID, cand_fileGrp, cand_mimetype, cand_pageId, cand_url, cand_local_filename = rows[pos]
+                    yield OcrdFileRecord(ID=cand_ID, fileGrp=cand_fileGrp, mimetype=cand_mimetype, pageId=cand_pageId,
+                                         url=cand_url or '', local_filename=cand_local_filename)
+                else:
+                    yield self._ocrd_file(*rows[pos])
+
+    @journaled
+    def add_file_group(self, fileGrp: str) -> ET._Element:
+        """
+        Add a new ``mets:fileGrp``.
+        Arguments:
+            fileGrp (string): ``@USE`` of the new ``mets:fileGrp``.
+        """
+        if ',' in fileGrp:
+            raise ValueError('fileGrp must not contain commas')
+        row = self._db.execute('SELECT xml FROM file_grp WHERE fileGrp = ?', (fileGrp,)).fetchone()
+        if row is not None:
+            el_fileGrp = ET.fromstring(row[0])
+            # (not updated by rename_file_group)
+            el_fileGrp.set('USE', fileGrp)
+            return el_fileGrp
+        if self._tree.getroot().find('mets:fileSec', NS) is None:
+            ET.SubElement(self._tree.getroot(), TAG_METS_FILESEC)
+        el_fileGrp = ET.Element(TAG_METS_FILEGRP)
+        el_fileGrp.set('USE', fileGrp)
+        self._db.execute('INSERT INTO file_grp (fileGrp, xml) VALUES (?, ?)', (fileGrp, ET.tostring(el_fileGrp)))
+        return el_fileGrp
+
+    @journaled
+    def rename_file_group(self, old: str, new: str) -> None:
+        """
+        Rename a ``mets:fileGrp`` by changing the ``@USE`` from :py:attr:`old` to :py:attr:`new`.
+        """
+        if not self._db.execute('UPDATE file_grp SET fileGrp = ? WHERE fileGrp = ?', (new, old)).rowcount:
+            raise FileNotFoundError("No such fileGrp '%s'" % old)
+        self._db.execute('UPDATE file SET fileGrp = ? WHERE fileGrp = ?', (new, old))
+
+    @journaled
+    def remove_file_group(self, USE: str, recursive : bool = False, force : bool = False) -> None:
+        """
+        Remove a ``mets:fileGrp`` (single fixed ``@USE`` or multiple regex ``@USE``)
+        Arguments:
+            USE (string): ``@USE`` of the ``mets:fileGrp`` to delete. Can be a regex if prefixed with ``//``
+            recursive (boolean): Whether to recursively delete each ``mets:file`` in the group
+            force (boolean): Do not raise an exception if ``mets:fileGrp`` does not exist
+        """
+        log = getLogger('ocrd.models.ocrd_mets_sqlite.remove_file_group')
+        if self._tree.getroot().find('mets:fileSec', NS) is None:
+            raise Exception("No fileSec!")
+        if not isinstance(USE, str):
+            USE = USE.get('USE')
+        if USE.startswith(REGEX_PREFIX):
+            use = re.compile(USE[REGEX_PREFIX_LEN:])
+            for cand in self.file_groups:
+                if use.fullmatch(cand):
+                    self.remove_file_group(cand, recursive=recursive)
+            return
+        if self._db.execute('SELECT 1 FROM file_grp WHERE fileGrp = ?', (USE,)).fetchone() is None:
+            msg = "No such fileGrp: %s" % USE
+            if force:
+                log.warning(msg)
+                return
+            raise Exception(msg)
+        file_ids = [ID for ID, in self._db.execute('SELECT ID FROM file WHERE fileGrp = ?', (USE,))]
+        if file_ids:
+            if not recursive:
+                raise Exception("fileGrp %s is not empty and recursive wasn't set" % USE)
+            self._remove_fptrs(file_ids)
+            self._db.execute('DELETE FROM file WHERE fileGrp = ?', (USE,))
+        self._db.execute('DELETE FROM file_grp WHERE fileGrp = ?', (USE,))
+
+    @journaled
+    def add_file(self, fileGrp : str, mimetype : Optional[str] = None, url : Optional[str] = None,
+                 ID : Optional[str] = None, pageId : Optional[str] = None, force : bool = False,
+                 local_filename : Optional[str] = None, ignore : bool = False, **kwargs) -> OcrdFile:
+        """
+        Instantiate and add a new :py:class:`ocrd_models.ocrd_file.OcrdFile`.
+        Same arguments and semantics as :py:meth:`ocrd_models.ocrd_mets.OcrdMets.add_file`.
+        """
+        if not ID:
+            raise ValueError("Must set ID of the mets:file")
+        if not fileGrp:
+            raise ValueError("Must set fileGrp of the mets:file")
+        if not REGEX_FILE_ID.fullmatch(ID):
+            raise ValueError("Invalid syntax for mets:file/@ID %s (not an xs:ID)" % ID)
+        if not REGEX_FILE_ID.fullmatch(fileGrp):
+            raise ValueError("Invalid syntax for mets:fileGrp/@USE %s (not an xs:ID)" % fileGrp)
+
+        el_fileGrp = self.add_file_group(fileGrp)
+        if not ignore:
+            mets_file = next(self.find_files(ID=ID, fileGrp=fileGrp), None)
+            if mets_file:
+                if mets_file.fileGrp == fileGrp and \
+                        mets_file.pageId == pageId and \
+                        mets_file.mimetype == mimetype:
+                    if not force:
+                        raise FileExistsError(
+                            f"A file with ID=={ID} already exists {mets_file} and neither force nor ignore are set")
+                    self.remove_file(ID=ID, fileGrp=fileGrp)
+                else:
+                    raise FileExistsError(
+                        f"A file with ID=={ID} already exists {mets_file} but unrelated - cannot mitigate")
+
+        el_mets_file = self._file_element(el_fileGrp, {'ID': ID, 'mimetype': mimetype, 'url': url,
+                                                       'local_filename': local_filename})
+        self._insert_files([el_mets_file])
+        mets_file = OcrdFile(el_mets_file, mets=self)
+        if pageId is not None:
+            self.set_physical_page_for_file(pageId, mets_file)
+        return mets_file
+
+    @journaled
+    def _add_files(self, records : List[Dict[str, Any]], force : bool = False, ignore : bool = False) -> List[OcrdFile]:
+        for record in records:
+            ID, fileGrp = record.get('ID'), record.get('fileGrp')
+            if not ID:
+                raise ValueError("Must set ID of the mets:file")
+            if not fileGrp:
+                raise ValueError("Must set fileGrp of the mets:file")
+            if not REGEX_FILE_ID.fullmatch(ID):
+                raise ValueError("Invalid syntax for mets:file/@ID %s (not an xs:ID)" % ID)
+            if not REGEX_FILE_ID.fullmatch(fileGrp):
+                raise ValueError("Invalid syntax for mets:fileGrp/@USE %s (not an xs:ID)" % fileGrp)
+
+        # look up existing files (by fileGrp and ID, like add_file) once for the whole batch
+        to_add : Dict[Any, Dict[str, Any]] = {}
+        to_remove : List[OcrdFile] = []
+        if ignore:
+            to_add = dict(enumerate(records))
+        else:
+            existing : Dict[Tuple[str, str], Tuple[str, bytes]] = {}
+            for fileGrp in {record['fileGrp'] for record in records}:
+                for ID, xml in self._db.execute('SELECT ID, xml FROM file WHERE fileGrp = ? ORDER BY pos', (fileGrp,)):
+                    existing.setdefault((fileGrp, ID), (fileGrp, xml))
+            for record in records:
+                key = (record['fileGrp'], record['ID'])
+                if key in to_add:
+                    other = to_add[key]
+                    other_pageId, other_mimetype = other.get('pageId'), other.get('mimetype')
+                elif key in existing:
+                    other = self._ocrd_file(*existing[key])
+                    other_pageId, other_mimetype = other.pageId, other.mimetype
+                else:
+                    to_add[key] = record
+                    continue
+                if other_pageId != record.get('pageId') or other_mimetype != record.get('mimetype'):
+                    raise FileExistsError(
+                        f"A file with ID=={record['ID']} already exists {other} but unrelated - cannot mitigate")
+                if not force:
+                    raise FileExistsError(
+                        f"A file with ID=={record['ID']} already exists {other} and neither force nor ignore are set")
+                if key in to_add:
+                    del to_add[key]
+                else:
+                    to_remove.append(self._ocrd_file(*existing.pop(key)))
+                to_add[key] = record
+        for ocrd_file in to_remove:
+            self.remove_one_file(ocrd_file)
+
+        el_fileGrps : Dict[str, ET._Element] = {}
+        els_file = []
+        for record in to_add.values():
+            fileGrp = record['fileGrp']
+            if fileGrp not in el_fileGrps:
+                el_fileGrps[fileGrp] = self.add_file_group(fileGrp)
+            els_file.append(self._file_element(el_fileGrps[fileGrp], record))
+        self._insert_files(els_file)
+
+        # link to the physical pages
+        page_poss : Dict[str, int] = {}
+        fptrs = []
+        for record in to_add.values():
+            pageId = record.get('pageId')
+            if not pageId:
+                continue
+            if pageId not in page_poss:
+                page_pos = self._page_pos(pageId)
+                page_poss[pageId] = self._add_page(pageId) if page_pos is None else page_pos
+            fptrs.append((page_poss[pageId], record['ID']))
+        self._db.executemany('INSERT INTO fptr (page, FILEID) VALUES (?, ?)', fptrs)
+
+        return [OcrdFile(el_file, mets=self) for el_file in els_file]
+
+    @journaled
+    def remove_one_file(self, ID : Union[str, OcrdFile], fileGrp : str = None) -> OcrdFile:
+        """
+        Delete an existing :py:class:`ocrd_models.ocrd_file.OcrdFile`.
+        Same arguments and semantics as :py:meth:`ocrd_models.ocrd_mets.OcrdMets.remove_one_file`.
+        """
+        log = getLogger('ocrd.models.ocrd_mets_sqlite.remove_one_file')
+        log.debug("remove_one_file(%s %s)" % (ID, fileGrp))
+        if isinstance(ID, OcrdFile):
+            ocrd_file = ID
+            ID = ocrd_file.ID
+        else:
+            ocrd_file = next(self.find_files(ID=ID, fileGrp=fileGrp), None)
+
+        if not ocrd_file:
+            raise FileNotFoundError("File not found: %s (fileGr=%s)" % (ID, fileGrp))
+
+        self._remove_fptrs([ID])
+        self._db.execute('DELETE FROM file WHERE pos = (SELECT pos FROM file WHERE fileGrp = ? AND ID = ? ORDER BY pos LIMIT 1)',
+                         (ocrd_file.fileGrp, ID))
+        # pylint: disable=protected-access
+        ocrd_file._el.getparent().remove(ocrd_file._el)
+
+        return ocrd_file
+
+    def _remove_files(self, files : List[OcrdFile]) -> None:
+        """
+        Delete the rows of :py:attr:`files` and all ``mets:fptr`` to their ``@ID`` in bulk
+        """
+        self._remove_fptrs(list({f.ID for f in files}))
+        self._db.execute('DELETE FROM file WHERE (fileGrp, ID) IN '
+                         '(SELECT json_extract(value, \'$[0]\'), json_extract(value, \'$[1]\') FROM json_each(?))',
+                         (json.dumps([[f.fileGrp, f.ID] for f in files]),))
+        # pylint: disable=protected-access
+        for ocrd_file in files:
+            if ocrd_file._el.getparent() is not None:
+                ocrd_file._el.getparent().remove(ocrd_file._el)
+
+    def get_physical_pages(self, for_fileIds : Optional[List[str]] = None, for_pageIds : Optional[str] = None,
+                           return_divs : bool = False) -> List[Union[str, OcrdPageRecord]]:
+        """
+        List all page IDs (the ``@ID`` of each physical ``mets:structMap`` ``mets:div``),
+        optionally for a subset of ``mets:file`` ``@ID`` :py:attr:`for_fileIds`,
+        or for a subset selector expression (comma-separated, range, and/or regex) :py:attr:`for_pageIds`.
+        If return_divs is set, returns :py:class:`ocrd_models.ocrd_mets_readonly.OcrdPageRecord`
+        instead of strings of ids
+        """
+        if for_fileIds is None or for_pageIds is not None:
+            return super().get_physical_pages(for_fileIds=for_fileIds, for_pageIds=for_pageIds, return_divs=return_divs)
+        ret : List[Any] = [None] * len(for_fileIds)
+        positions : Dict[str, int] = {}
+        for index, fileId in enumerate(for_fileIds):
+            positions.setdefault(fileId, index)
+        for fileId, *attrs in self._db.execute(
+                f'SELECT fptr.FILEID, {PAGE_COLUMNS} FROM fptr JOIN page ON page.pos = fptr.page '
+                'WHERE fptr.FILEID IN (SELECT value FROM json_each(?)) ORDER BY page.pos', (json.dumps(list(positions)),)):
+            ret[positions[fileId]] = OcrdPageRecord(*attrs) if return_divs else attrs[0]
+        return ret
+
+    @journaled
+    def set_physical_page_for_file(self, pageId : str, ocrd_file : OcrdFile,
+                                   order : Optional[str] = None, orderlabel : Optional[str] = None) -> None:
+        """
+        Set the physical page ID (``@ID`` of the physical ``mets:structMap`` ``mets:div`` entry)
+        corresponding to the ``mets:file`` :py:attr:`ocrd_file`, creating all structures if necessary.
+        Same arguments as :py:meth:`ocrd_models.ocrd_mets.OcrdMets.set_physical_page_for_file`.
+        """
+        self._db.execute('DELETE FROM fptr WHERE FILEID = ?', (ocrd_file.ID,))
+        page_pos = self._page_pos(pageId)
+        if page_pos is None:
+            page_pos = self._add_page(pageId, order=order, orderlabel=orderlabel)
+        self._db.execute('INSERT INTO fptr (page, FILEID) VALUES (?, ?)', (page_pos, ocrd_file.ID))
+
+    @journaled
+    def update_physical_page_attributes(self, page_id : str, **kwargs) -> None:
+        invalid_keys = list(k for k in kwargs.keys() if k not in METS_PAGE_DIV_ATTRIBUTE.names())
+        if invalid_keys:
+            raise ValueError(f"Invalid attribute {invalid_keys}. Allowed values: {METS_PAGE_DIV_ATTRIBUTE.names()}")
+
+        page_div = self.get_physical_pages(for_pageIds=page_id, return_divs=True)
+        if not page_div:
+            raise ValueError(f"Could not find mets:div[@ID=={page_id}]")
+        page_pos = self._page_pos(page_div[0].ID)
+
+        for k, v in kwargs.items():
+            self._db.execute(f'UPDATE page SET "{k}" = ? WHERE pos = ?', (v or None, page_pos))
+        self._page_order_cache.clear()
+
+    def get_physical_page_for_file(self, ocrd_file : OcrdFile) -> Optional[str]:
+        """
+        Get the physical page ID (``@ID`` of the physical ``mets:structMap`` ``mets:div`` entry)
+        corresponding to the ``mets:file`` :py:attr:`ocrd_file`.
+        """
+        row = self._db.execute('SELECT page.ID FROM fptr JOIN page ON page.pos = fptr.page '
+                               'WHERE fptr.FILEID = ? ORDER BY page.pos LIMIT 1', (ocrd_file.ID,)).fetchone()
+        return None if row is None else row[0]
+
+    @journaled
+    def remove_physical_page(self, ID : str) -> None:
+        """
+        Delete page (physical ``mets:structMap`` ``mets:div`` entry ``@ID``) :py:attr:`ID`.
+        """
+        page_pos = self._page_pos(ID)
+        if page_pos is not None:
+            self._db.execute('DELETE FROM fptr WHERE page = ?', (page_pos,))
+            self._db.execute('DELETE FROM page WHERE pos = ?', (page_pos,))
+            self._page_order_cache.clear()
+
+    @journaled
+    def remove_physical_page_fptr(self, fileId : str) -> List[str]:
+        """
+        Delete all ``mets:fptr[@FILEID = fileId]`` to ``mets:file[@ID == fileId]`` for :py:attr:`fileId` from all ``mets:div`` entries in the physical ``mets:structMap``.
+        Returns:
+            List of pageIds that mets:fptrs were deleted from
+        """
+        ret = [pageId for pageId, in self._db.execute(
+            'SELECT page.ID FROM fptr JOIN page ON page.pos = fptr.page WHERE fptr.FILEID = ? ORDER BY page.pos', (fileId,))]
+        self._db.execute('DELETE FROM fptr WHERE FILEID = ?', (fileId,))
+        return ret
+
+    @property
+    def physical_pages_labels(self) -> Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        Map all page IDs (the ``@ID`` of each physical ``mets:structMap`` ``mets:div``) to their
+        ``@ORDER``, ``@ORDERLABEL`` and ``@LABEL`` attributes, if any.
+        """
+        return {ID: (order, orderlabel, label) for ID, order, orderlabel, label in self._db.execute(
+            'SELECT ID, "ORDER", ORDERLABEL, LABEL FROM page ORDER BY pos')}
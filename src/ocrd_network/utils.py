@@ -12,6 +12,7 @@ from uuid import uuid4
 
 from ocrd.resolver import Resolver
 from ocrd.workspace import Workspace
+from ocrd_models import ReadOnlyOcrdMets
 from ocrd_utils import generate_range, REGEX_PREFIX
 from .rabbitmq_utils import OcrdResultMessage
 
@@ -121,6 +122,9 @@ def get_ocrd_workspace_instance(mets_path: str, mets_server_url: str = None) ->
 
 
 def get_ocrd_workspace_physical_pages(mets_path: str, mets_server_url: str = None) -> List[str]:
+    if not mets_server_url:
+        # only the page IDs are needed, no need to parse the full METS
+        return ReadOnlyOcrdMets(filename=mets_path).physical_pages
     return get_ocrd_workspace_instance(mets_path=mets_path, mets_server_url=mets_server_url).mets.physical_pages
 
 
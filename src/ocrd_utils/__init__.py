@@ -86,6 +86,7 @@ Utility functions and constants usable in various circumstances.
 * :py:data:`MIMETYPE_PAGE`,
   :py:data:`EXT_TO_MIME`,
   :py:data:`MIME_TO_EXT`,
+  :py:data:`IMAGE_ENCODING_PROFILES`,
   :py:data:`VERSION`
 
     Constants
@@ -108,6 +109,7 @@ Utility functions and constants usable in various circumstances.
 from .constants import (
     DEFAULT_METS_BASENAME,
     EXT_TO_MIME,
+    IMAGE_ENCODING_PROFILES,
     MIMETYPE_PAGE,
     MIME_TO_EXT,
     MIME_TO_PIL,
@@ -12,6 +12,8 @@ from pathlib import Path
 from tempfile import gettempdir
 from textwrap import fill, indent
 
+from .constants import IMAGE_ENCODING_PROFILES
+
 
 class OcrdEnvVariable():
 
@@ -105,11 +107,84 @@ config.add('OCRD_METS_CACHING',
     validator=lambda val: val in ('true', 'false', '0', '1'),
     parser=lambda val: val in ('true', '1'))
 
+config.add('OCRD_METS_JOURNAL',
+    description="Number of changes to the METS file to collect in a write-ahead journal (`<METS file>.journal`) before `Workspace.save_mets` writes the complete METS file. `0` disables the journal, i.e. the complete METS file is written on every save. Only pass the workspace (not the METS file itself) to other tools while the journal is used.",
+    parser=int,
+    default=(True, 0))
+
+config.add('OCRD_METS_INDEX',
+    description="If set to `true`, keep a binary index of the METS file (in `<METS file>.idx`) to fill the caches (with `OCRD_METS_CACHING`) or serve read-only queries without walking the METS document. The index is ignored as soon as the METS file has changed.",
+    default=(True, False),
+    validator=lambda val: isinstance(val, bool) or val in ('true', 'false', '0', '1'),
+    parser=lambda val: val in ('true', '1'))
+
+config.add('OCRD_METS_BACKEND',
+    description="Implementation to load the METS of workspaces with: `lxml` keeps the complete element tree in memory, `sqlite` keeps the files and physical pages in an indexed SQLite database (in a temporary file) to reduce memory usage for very large METS, and only generates the METS XML when saving.",
+    validator=lambda val: val in ('lxml', 'sqlite'),
+    default=(True, 'lxml'))
+
 config.add('OCRD_MAX_PROCESSOR_CACHE',
     description="Maximum number of processor instances (for each set of parameters) to be kept in memory (including loaded models) for processing workers or processor servers.",
     parser=int,
     default=(True, 128))
 
+config.add('OCRD_MAX_IMAGE_CACHE',
+    description="Maximum size (in MiB) of decoded images to be kept in memory by each workspace (least recently used images are evicted first), so repeated access to the same image file (e.g. in `image_from_page` and `image_from_segment`) does not decode it again. `0` disables the cache.",
+    parser=int,
+    default=(True, 256))
+
+config.add('OCRD_WRITE_BEHIND',
+    description="Number of background threads for encoding and writing files added to a workspace (images in `save_image_file`, any `content` in `add_file`), so processing can continue while they are written. Files are registered in the METS immediately, `save_mets` waits for all writes and raises any error. `0` writes synchronously.",
+    parser=int,
+    default=(True, 0))
+
+def _ocrd_image_encoding_parser(val):
+    encodings = []
+    for entry in val.split(','):
+        file_grp, _, profile = entry.strip().rpartition(':')
+        encodings.append((file_grp or '*', profile))
+    return encodings
+
+config.add('OCRD_EXIF_IDENTIFY',
+    description="If set to `true`, run ImageMagick `identify` (if installed) to estimate the pixel density of images whose header (TIFF, PNG, JPEG etc.) has none. Otherwise such images get 1 pixel per inch.",
+    validator=lambda val: isinstance(val, bool) or val in ('true', 'false', '0', '1'),
+    parser=lambda val: val in ('true', '1', True),
+    default=(True, False))
+
+config.add('OCRD_EXIF_CACHE',
+    description="If set to `true`, keep the image metadata (size, pixel density etc.) of each workspace in `<METS file>.exif.json` (updated by `Workspace.save_mets`), so images are not inspected again as long as they are unchanged.",
+    validator=lambda val: isinstance(val, bool) or val in ('true', 'false', '0', '1'),
+    parser=lambda val: val in ('true', '1', True),
+    default=(True, False))
+
+config.add('OCRD_PROCESSOR_CHDIR',
+    description="Whether to change the current working directory (of the whole process) to the workspace while running a processor, for processors which open files by their relative `local_filename` instead of `Workspace.resolve_path`. Disable to run processors on several workspaces in threads of the same process.",
+    validator=lambda val: isinstance(val, bool) or val in ('true', 'false', '0', '1'),
+    parser=lambda val: val in ('true', '1', True),
+    default=(True, True))
+
+config.add('OCRD_MAX_PARALLEL_PAGES',
+    description="Maximum number of pages to process in parallel (in forked worker processes) for processors implementing `Processor.process_page`. The METS is only changed by the main process, which applies the changes of each page in page order. `0` uses one process per CPU.",
+    parser=int,
+    default=(True, 1))
+
+config.add('OCRD_MISSING_OUTPUT',
+    description="What to do when processing a page fails (for processors implementing `Processor.process_page`): `ABORT` stops processing and raises the error, `SKIP` logs the error and continues with the other pages. The changes of the failed page are discarded.",
+    validator=lambda val: val in ('SKIP', 'ABORT'),
+    default=(True, 'ABORT'))
+
+config.add('OCRD_IMAGE_ENCODING',
+    description=f"""\
+Encoding profile for images saved by `Workspace.save_image_file` (comma-separated
+list of `FILEGRP:PROFILE` or just `PROFILE` for any fileGrp, the first matching entry
+applies, `FILEGRP` may contain wildcards like `OCR-D-BIN*`). Profiles:
+{', '.join(IMAGE_ENCODING_PROFILES)} (e.g. `OCR-D-BIN*:scratch,fast`).
+""",
+    validator=lambda val: all(entry.strip().rpartition(':')[2] in IMAGE_ENCODING_PROFILES
+                              for entry in val.split(',')),
+    parser=_ocrd_image_encoding_parser,
+    default=(True, 'default'))
+
 config.add("OCRD_PROFILE",
     description="""\
 Whether to enable gathering runtime statistics
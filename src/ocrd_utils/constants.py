@@ -6,6 +6,7 @@ from re import compile as regex_compile
 
 __all__ = [
     'EXT_TO_MIME',
+    'IMAGE_ENCODING_PROFILES',
     'LOG_FORMAT',
     'LOG_TIMEFMT',
     'MIMETYPE_PAGE',
@@ -94,9 +95,32 @@ MIME_TO_PIL = {
     'image/jp2': 'JP2',
     'image/png': 'PNG',
     'image/x-portable-pixmap': 'PPM',
+    'image/x-portable-anymap': 'PPM',
     'image/tiff': 'TIFF',
 }
 
+# Image encoding profiles (selected per fileGrp with OCRD_IMAGE_ENCODING):
+# for each MIME type (or '*' for any), the PIL save options, optionally with
+# a different 'mimetype' to encode as, and extra options for bilevel images ('1')
+IMAGE_ENCODING_PROFILES = {
+    # PIL defaults
+    'default': {},
+    # fast lossless compression (e.g. for intermediate images)
+    'fast': {
+        'image/png': {'compress_level': 1},
+        'image/tiff': {'compression': 'tiff_lzw', '1': {'compression': 'group4'}},
+    },
+    # strong lossless compression (e.g. for images to be archived)
+    'small': {
+        'image/png': {'compress_level': 9},
+        'image/tiff': {'compression': 'tiff_adobe_deflate', '1': {'compression': 'group4'}},
+    },
+    # uncompressed PBM/PGM/PPM (e.g. for scratch images consumed once)
+    'scratch': {
+        '*': {'mimetype': 'image/x-portable-anymap'},
+    },
+}
+
 # Prefix to denote query is regular expression not fixed string
 REGEX_PREFIX = '//'
 
@@ -1,7 +1,9 @@
+import math
 import sys
 
+import cv2
 import numpy as np
-from PIL import Image, ImageStat, ImageDraw, ImageChops
+from PIL import Image, ImageStat, ImageDraw, ImageChops, ImageColor
 
 from .logging import getLogger
 from .introspect import membername
@@ -185,14 +187,14 @@ def coordinates_for_segment(polygon, parent_image, parent_coords):
 def polygon_mask(image, coordinates):
     """"Create a mask image of a polygon.
 
-    Given a PIL.Image ``image`` (merely for dimensions), and
+    Given a PIL.Image or numpy array ``image`` (merely for dimensions), and
     a numpy array ``polygon`` of relative coordinates into the image,
     create a new image of the same size with black background, and
     fill everything inside the polygon hull with white.
 
     Return the new PIL.Image.
     """
-    mask = Image.new('L', image.size, 0)
+    mask = Image.new('L', _image_size(image), 0)
     coordinates = list(map(tuple, coordinates))
     ImageDraw.Draw(mask).polygon(coordinates, outline=0, fill=255)
     return mask
@@ -234,7 +236,7 @@ def rotate_coordinates(transform, angle, orig=np.array([0, 0])):
         adjust_canvas_to_rotation(orig, angle))
     return transform
 
-def rotate_image(image, angle, fill='background', transparency=False):
+def rotate_image(image, angle, fill='background', transparency=False, as_array=False):
     """"Rotate an image, enlarging and filling with background.
 
     Given a PIL.Image ``image`` and a rotation angle in degrees
@@ -252,10 +254,16 @@ def rotate_image(image, angle, fill='background', transparency=False):
     (This is true for images which already have an alpha channel,
     regardless of the setting used.)
 
+    If ``image`` is a numpy array or ``as_array`` is true, then rotate
+    with OpenCV (instead of PIL, which can differ in single pixels at
+    the sampling boundaries) and return a numpy array.
+
     Return a new PIL.Image.
     """
     LOG = getLogger('ocrd.utils.rotate_image')
     LOG.debug('rotating image by %.2f°', angle)
+    if as_array or isinstance(image, np.ndarray):
+        return _rotate_array(np.asarray(image), angle, fill=fill, transparency=transparency)
     if transparency and image.mode in ['RGB', 'L']:
         # ensure no information is lost by adding transparency channel
         # initialized to fully opaque (so cropping and rotation will
@@ -405,7 +413,7 @@ def transpose_coordinates(transform, method, orig=np.array([0, 0])):
         adjust_canvas_to_transposition(orig, method))
     return transform
 
-def transpose_image(image, method):
+def transpose_image(image, method, as_array=False):
     """"Transpose (i.e. flip or rotate in 90° multiples) an image.
 
     Given a PIL.Image ``image`` and a transposition mode ``method``,
@@ -438,14 +446,28 @@ def transpose_image(image, method):
       columns become rows (but counted from the bottom),
       i.e. all pixels get mirrored at the opposite diagonal;
       width becomes height and vice versa
+
+    If ``image`` is a numpy array or ``as_array`` is true, then return a numpy array.
     
     Return a new PIL.Image.
     """
     LOG = getLogger('ocrd.utils.transpose_image')
     LOG.debug('transposing image with %s', membername(Image, method))
+    if as_array or isinstance(image, np.ndarray):
+        array = np.asarray(image)
+        array = {
+            Image.FLIP_LEFT_RIGHT: lambda: array[:, ::-1],
+            Image.FLIP_TOP_BOTTOM: lambda: array[::-1],
+            Image.ROTATE_90: lambda: np.rot90(array, 1),
+            Image.ROTATE_180: lambda: np.rot90(array, 2),
+            Image.ROTATE_270: lambda: np.rot90(array, 3),
+            Image.TRANSPOSE: lambda: np.swapaxes(array, 0, 1),
+            Image.TRANSVERSE: lambda: np.swapaxes(np.rot90(array, 2), 0, 1),
+        }[method]()
+        return np.ascontiguousarray(array)
     return image.transpose(method)
 
-def crop_image(image, box=None):
+def crop_image(image, box=None, as_array=False):
     """"Crop an image to a rectangle, filling with background.
 
     Given a PIL.Image ``image`` and a list ``box`` of the bounding
@@ -457,16 +479,22 @@ def crop_image(image, box=None):
     determine the background from the median color (instead of
     white).
 
+    If ``image`` is a numpy array or ``as_array`` is true, then
+    crop with numpy and return a numpy array.
+
     Return a new PIL.Image.
     """
     LOG = getLogger('ocrd.utils.crop_image')
+    width, height = _image_size(image)
     if not box:
-        box = (0, 0, image.width, image.height)
-    elif box[0] < 0 or box[1] < 0 or box[2] > image.width or box[3] > image.height:
+        box = (0, 0, width, height)
+    elif box[0] < 0 or box[1] < 0 or box[2] > width or box[3] > height:
         # (It should be invalid in PAGE-XML to extend beyond parents.)
         LOG.warning('crop coordinates (%s) exceed image (%dx%d)',
-                    str(box), image.width, image.height)
+                    str(box), width, height)
     LOG.debug('cropping image to %s', str(box))
+    if as_array or isinstance(image, np.ndarray):
+        return _crop_array(np.asarray(image), box)
     xywh = xywh_from_bbox(*box)
     poly = polygon_from_bbox(*box)
     background = ImageStat.Stat(image, mask=polygon_mask(image, poly))
@@ -479,7 +507,7 @@ def crop_image(image, box=None):
     new_image.paste(image, (-xywh['x'], -xywh['y']))
     return new_image
 
-def image_from_polygon(image, polygon, fill='background', transparency=False):
+def image_from_polygon(image, polygon, fill='background', transparency=False, as_array=False):
     """"Mask an image with a polygon.
 
     Given a PIL.Image ``image`` and a numpy array ``polygon``
@@ -497,9 +525,14 @@ def image_from_polygon(image, polygon, fill='background', transparency=False):
     Images which already have an alpha channel will have it shrunk
     from the polygon mask (i.e. everything outside the polygon will
     be transparent, in addition to existing transparent pixels).
+
+    If ``image`` is a numpy array or ``as_array`` is true, then
+    mask with numpy and return a numpy array.
     
     Return a new PIL.Image.
     """
+    if as_array or isinstance(image, np.ndarray):
+        return _image_from_polygon_array(np.asarray(image), polygon, fill=fill, transparency=transparency)
     if fill == 'none' or fill is None:
         new_image = image.copy()
     else:
@@ -614,3 +647,137 @@ def xywh_from_points(points):
 def xywh_from_polygon(polygon):
     """Construct a numeric dict representing a bounding box from polygon coordinates in numeric list representation."""
     return xywh_from_bbox(*bbox_from_polygon(polygon))
+
+def _image_size(image):
+    """Width and height of a PIL.Image or numpy array"""
+    if isinstance(image, np.ndarray):
+        return image.shape[1], image.shape[0]
+    return image.size
+
+def _array_mode(array):
+    """PIL mode corresponding to a numpy array"""
+    if array.dtype == bool:
+        return '1'
+    if array.ndim == 2:
+        return 'L'
+    return {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}[array.shape[2]]
+
+def _array_color(array, color):
+    """Convert a PIL color specifier to a value for (all channels of) ``array``"""
+    if isinstance(color, str):
+        color = ImageColor.getcolor(color, _array_mode(array))
+    if array.dtype == bool:
+        return bool(color)
+    return color
+
+def _median_color(array, mask=None):
+    """Per-channel median of (the pixels in ``mask`` of) ``array``, like PIL.ImageStat.median"""
+    if mask is None:
+        pixels = array.reshape((-1,) + array.shape[2:])
+    else:
+        pixels = array[mask]
+    if pixels.ndim == 1:
+        pixels = pixels[:, np.newaxis]
+    median = []
+    for channel in pixels.T:
+        half = len(channel) // 2
+        if channel.dtype in (np.uint8, bool):
+            counts = np.cumsum(np.bincount(channel.view(np.uint8), minlength=256))
+            # (empty like in PIL: 255)
+            value = min(int(np.searchsorted(counts, half, side='right')), 255)
+        elif len(channel):
+            value = np.partition(channel, half)[half]
+        else:
+            value = np.iinfo(channel.dtype).max if channel.dtype.kind in 'iu' else 0
+        median.append(value)
+    if array.dtype == bool:
+        return bool(median[0])
+    return median if array.ndim > 2 else median[0]
+
+def _crop_array(array, box):
+    """crop_image on a numpy array"""
+    height, width = array.shape[:2]
+    x0, y0, x1, y1 = [int(val) for val in box]
+    # median within the box, using the same polygon mask as for PIL.Image
+    # (but only drawn on the part of the image it can cover):
+    window_x0, window_y0 = max(0, x0), max(0, y0)
+    window = array[window_y0:min(height, y1 + 1), window_x0:min(width, x1 + 1)]
+    mask = np.asarray(polygon_mask(window, polygon_from_bbox(x0 - window_x0, y0 - window_y0,
+                                                             x1 - window_x0, y1 - window_y0))) > 0
+    background = _median_color(window, mask)
+    new_array = np.empty((y1 - y0, x1 - x0) + array.shape[2:], dtype=array.dtype)
+    new_array[...] = background
+    src_x0, src_y0, src_x1, src_y1 = max(0, x0), max(0, y0), min(width, x1), min(height, y1)
+    if src_x0 < src_x1 and src_y0 < src_y1:
+        new_array[src_y0 - y0:src_y1 - y0, src_x0 - x0:src_x1 - x0] = array[src_y0:src_y1, src_x0:src_x1]
+    return new_array
+
+def _image_from_polygon_array(array, polygon, fill='background', transparency=False):
+    """image_from_polygon on a numpy array"""
+    mode = _array_mode(array)
+    mask = np.asarray(polygon_mask(array, polygon))
+    if fill == 'none' or fill is None:
+        new_array = array.copy()
+    else:
+        inside = mask > 0
+        if fill == 'background':
+            background = _median_color(array, inside)
+        else:
+            background = _array_color(array, fill)
+        new_array = np.empty_like(array)
+        new_array[...] = background
+        new_array[inside] = array[inside]
+    if mode in ['RGBA', 'LA']:
+        # ensure transparency maximizes (i.e. parent mask AND mask):
+        new_array[..., -1] = np.minimum(mask, array[..., -1])
+    elif transparency and mode in ['RGB', 'L']:
+        # introduce transparency:
+        new_array = np.dstack([new_array, mask])
+    return new_array
+
+def _rotate_array(array, angle, fill='background', transparency=False):
+    """rotate_image on a numpy array (nearest neighbour, expanding the canvas as PIL.Image.rotate)"""
+    mode = _array_mode(array)
+    if transparency and mode in ['RGB', 'L']:
+        array = np.dstack([array, np.full(array.shape[:2], 255, dtype=array.dtype)])
+        mode += 'A'
+    if fill is None or fill in ['background', 'none']:
+        background = _median_color(array)
+        if mode in ['RGBA', 'LA']:
+            background[-1] = 0 # fully transparent
+    else:
+        background = _array_color(array, fill)
+    if angle % 360 == 0:
+        return array.copy()
+    if angle % 90 == 0:
+        return np.ascontiguousarray(np.rot90(array, int(angle % 360) // 90))
+    # same geometry as PIL.Image.rotate(expand=True): inverse map from the output
+    # (pixel centers) to the input, around the center of the enlarged canvas
+    height, width = array.shape[:2]
+    radians = -math.radians(angle)
+    cos, sin = round(math.cos(radians), 15), round(math.sin(radians), 15)
+    shift_x = -cos * width / 2 - sin * height / 2 + width / 2
+    shift_y = sin * width / 2 - cos * height / 2 + height / 2
+    corners = [(cos * x + sin * y + shift_x, -sin * x + cos * y + shift_y) for x, y in
+               [(0, 0), (width, 0), (width, height), (0, height)]]
+    new_width = math.ceil(max(x for x, _ in corners)) - math.floor(min(x for x, _ in corners))
+    new_height = math.ceil(max(y for _, y in corners)) - math.floor(min(y for _, y in corners))
+    # output pixel center (x + 0.5, y + 0.5) relative to the new center, rotated, relative to the old center
+    # (minus 0.5, because OpenCV samples the nearest pixel, not the one containing the point)
+    offset_x, offset_y = 0.5 - new_width / 2, 0.5 - new_height / 2
+    matrix = np.array([[cos, sin, cos * offset_x + sin * offset_y + width / 2 - 0.5],
+                       [-sin, cos, -sin * offset_x + cos * offset_y + height / 2 - 0.5]])
+    if np.ndim(background):
+        background = tuple(background)
+    else:
+        background = (background,) * 4
+    new_array = cv2.warpAffine(array.view(np.uint8) if mode == '1' else array, matrix, (new_width, new_height),
+                               flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP,
+                               borderMode=cv2.BORDER_CONSTANT,
+                               borderValue=tuple(int(val) for val in background))
+    if mode == '1':
+        new_array = new_array.astype(bool)
+    elif new_array.ndim < array.ndim:
+        # OpenCV drops singleton channel axis
+        new_array = new_array[..., np.newaxis]
+    return new_array
@@ -55,7 +55,7 @@ class WorkspaceValidator():
                 if grp in workspace.mets.file_groups:
                     if page_id:
                         for one_page_id in page_id:
-                            if next(workspace.mets.find_files(fileGrp=grp, pageId=one_page_id), None):
+                            if next(workspace.mets.find_files(fileGrp=grp, pageId=one_page_id, as_records=True), None):
                                 report.add_error("Output fileGrp[@USE='%s'] already contains output for page %s" % (grp, one_page_id))
                     else:
                         report.add_error("Output fileGrp[@USE='%s'] already in METS!" % grp)
@@ -143,6 +143,8 @@ class WorkspaceValidator():
             return self.report
         with pushd_popd(self.workspace.directory):
             try:
+                if self.download:
+                    self._download_files()
                 if 'mets_unique_identifier' not in self.skip:
                     self._validate_mets_unique_identifier()
                 if 'mets_file_group_names' not in self.skip:
@@ -170,6 +172,15 @@ class WorkspaceValidator():
             self.workspace = self.resolver.workspace_from_url(self.mets_url, src_baseurl=self.src_dir)
             self.mets = self.workspace.mets
 
+    def _download_files(self):
+        """
+        Download all images and PAGE-XML files to be validated at once.
+        """
+        self.log.debug('_download_files')
+        self.workspace.download_files(
+            f for f in self.mets.find_files(**self.find_kwargs)
+            if f.mimetype == MIMETYPE_PAGE or (f.mimetype or '').startswith('image/'))
+
     def _validate_mets_unique_identifier(self):
         """
         Validate METS unique identifier exists.
@@ -208,7 +219,7 @@ class WorkspaceValidator():
                 continue
             self.workspace.download_file(f)
             page = page_from_file(f).get_Page()
-            _, _, exif = self.workspace.image_from_page(page, f.pageId)
+            exif = self.workspace.resolve_image_exif(page.imageFilename)
             if page.imageHeight != exif.height:
                 self.report.add_error("PAGE '%s': @imageHeight != image's actual height (%s != %s)" % (f.ID, page.imageHeight, exif.height))
             if page.imageWidth != exif.width:
@@ -283,7 +294,7 @@ class WorkspaceValidator():
         """
         self.log.debug('_validate_mets_files')
         try:
-            next(self.mets.find_files(**self.find_kwargs))
+            next(self.mets.find_files(as_records=True, **self.find_kwargs))
         except StopIteration:
             self.report.add_error("No files")
         for f in self.mets.find_files(**self.find_kwargs):
@@ -321,7 +332,7 @@ class WorkspaceValidator():
             pcgts = page_from_file(f)
             page = pcgts.get_Page()
             if 'dimension' in self.page_checks:
-                _, _, exif = self.workspace.image_from_page(page, f.pageId)
+                exif = self.workspace.resolve_image_exif(page.imageFilename)
                 if page.imageHeight != exif.height:
                     self.report.add_error("PAGE '%s': @imageHeight != image's actual height (%s != %s)" % (f.ID, page.imageHeight, exif.height))
                 if page.imageWidth != exif.width:
@@ -0,0 +1,22 @@
+# local scratch stub (not committed): real assets come from the OCR-D/assets submodule
+from os.path import dirname, join
+from contextlib import contextmanager
+from shutil import copytree
+from tempfile import TemporaryDirectory
+
+class Assets():
+    def __init__(self, baseurl):
+        self.baseurl = baseurl
+    def path_to(self, path):
+        return join(self.baseurl, path)
+    def url_of(self, path):
+        return self.path_to(path)
+
+assets = Assets(dirname(__file__))
+
+@contextmanager
+def copy_of_directory(src, dst=None):
+    with TemporaryDirectory() as tmp:
+        dst = join(tmp, 'copy')
+        copytree(src, dst)
+        yield dst
@@ -1,7 +1,7 @@
 import json
 import os
 from ocrd import Processor
-from ocrd_utils import make_file_id
+from ocrd_utils import make_file_id, MIMETYPE_PAGE
 
 DUMMY_TOOL = {
     'executable': 'ocrd-test',
@@ -59,6 +59,26 @@ class DummyProcessorWithOutput(Processor):
                 local_filename=os.path.join(self.output_file_grp, file_id),
                 content='CONTENT')
 
+class DummyProcessorWithPages(Processor):
+    """processes each page on its own, failing on page ``baz`` (after adding its output)"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs['ocrd_tool'] = DUMMY_TOOL
+        kwargs['version'] = '0.0.1'
+        super().__init__(*args, **kwargs)
+
+    def process_page(self, input_files, page_id):
+        file_id = make_file_id(input_files[0], self.output_file_grp)
+        self.workspace.add_file(
+            file_id=file_id,
+            file_grp=self.output_file_grp,
+            page_id=page_id,
+            mimetype=MIMETYPE_PAGE,
+            local_filename=os.path.join(self.output_file_grp, file_id + '.xml'),
+            content=str(os.getpid()))
+        if page_id == self.parameter['baz']:
+            raise ValueError(f"cannot process {page_id}")
+
 class IncompleteProcessor(Processor):
     pass
 
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the image encoding profiles of ``Workspace.save_image_file`` (``OCRD_IMAGE_ENCODING``)
+on a synthetic page image (bilevel, grayscale and RGB, as PIL image and numpy array).
+
+Run with ``make benchmark-encoding``, which stores the results as JSON (``BENCHMARK_JSON``),
+including the size of each encoded file as ``extra_info['bytes']``.
+"""
+
+from functools import lru_cache
+from os.path import getsize, join
+
+import numpy as np
+from PIL import Image
+from pytest import main, fixture, mark
+
+from ocrd import Resolver
+from ocrd_utils import IMAGE_ENCODING_PROFILES
+
+MIMETYPES = ['image/png', 'image/tiff']
+MODES = ['1', 'L', 'RGB']
+
+@lru_cache(maxsize=None)
+def _page_array():
+    """A4 page at 300 DPI with noisy background and text-like blocks"""
+    rng = np.random.default_rng(0)
+    page = np.full((3508, 2480), 235.)
+    for _ in range(300):
+        y, x = rng.integers(0, 3400), rng.integers(0, 2200)
+        page[y:y + 30, x:x + 250] = rng.integers(0, 80, (30, 250))
+    return np.clip(page + rng.normal(0, 5, page.shape), 0, 255).astype(np.uint8)
+
+@fixture(name='image', params=MODES)
+def _fixture_image(request):
+    array = _page_array()
+    if request.param == '1':
+        return array > 128
+    if request.param == 'RGB':
+        return np.dstack([array] * 3)
+    return array
+
+@fixture(name='workspace')
+def _fixture_workspace(tmp_path):
+    return Resolver().workspace_from_nothing(directory=str(tmp_path))
+
+@mark.benchmark(group='save_image_file', min_rounds=1, max_time=1, warmup=False)
+@mark.parametrize('as_array', [False, True], ids=['pil', 'array'])
+@mark.parametrize('mimetype', MIMETYPES)
+@mark.parametrize('profile', IMAGE_ENCODING_PROFILES)
+def test_save_image_file(benchmark, workspace, monkeypatch, image, as_array, mimetype, profile):
+    monkeypatch.setenv('OCRD_IMAGE_ENCODING', profile)
+    if not as_array:
+        image = Image.fromarray(image)
+    file_path = benchmark(workspace.save_image_file, image, 'IMG', 'OCR-D-IMG', page_id='PHYS_0001',
+                          mimetype=mimetype, force=True)
+    benchmark.extra_info['bytes'] = getsize(join(workspace.directory, file_path))
+
+if __name__ == '__main__':
+    main([__file__, '--benchmark-verbose', '--tb=short'])
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for OcrdMets on synthetic METS with 50 to 20000 pages, with and without caching.
+
+Run with ``make benchmark-extreme``, which stores the results as JSON (``BENCHMARK_JSON``)
+and in ``.benchmarks``, and fails if any benchmark regressed by more than ``BENCHMARK_COMPARE_FAIL``
+(default: median 50 %) relative to the last saved run. The page counts can be restricted
+with e.g. ``BENCHMARK_PAGES=50,500``.
+"""
+
+from functools import lru_cache
+from multiprocessing import Process, set_start_method
+from os import environ
+from time import sleep, time
+
+from pytest import main, fixture, mark
+from requests.exceptions import ConnectionError
+
+from ocrd import Resolver, Workspace, OcrdMetsServer
+from ocrd_utils import MIME_TO_EXT, MIMETYPE_PAGE
+from ocrd_models import OcrdMets
+
+# necessary for macos
+set_start_method("fork", force=True)
+
+PAGES = [int(n) for n in environ.get('BENCHMARK_PAGES', '50,500,2000,5000,20000').split(',')]
+GRPS = {'OCR-D-IMG': 'image/tiff', 'OCR-D-BIN': 'image/png', 'OCR-D-SEG': MIMETYPE_PAGE, 'OCR-D-OCR': MIMETYPE_PAGE}
+
+# queries for the last page (worst case for searches without index), and the expected number of results
+QUERIES = {
+    'ID': (lambda n: dict(ID='OCR-D-OCR_%05d' % n), 1),
+    'fileGrp': (lambda n: dict(fileGrp='OCR-D-BIN'), None),
+    'pageId': (lambda n: dict(pageId='PHYS_%05d' % n), len(GRPS)),
+    'pageId_range': (lambda n: dict(pageId='PHYS_%05d..PHYS_%05d' % (n - 9, n)), len(GRPS) * 10),
+    'mimetype': (lambda n: dict(mimetype='image/png'), None),
+    'url': (lambda n: dict(url='https://host/OCR-D-IMG/%05d.tif' % n), 1),
+    'local_filename': (lambda n: dict(local_filename='OCR-D-SEG/OCR-D-SEG_%05d.xml' % n), 1),
+    'fileGrp_pageId': (lambda n: dict(fileGrp='OCR-D-SEG', pageId='PHYS_%05d' % n), 1),
+}
+
+@lru_cache(maxsize=None)
+def _mets_xml(number_of_pages):
+    """
+    Serialized METS with one file per page in each of GRPS
+    """
+    mets = OcrdMets.empty_mets(cache_flag=True)
+    mets.add_files([{'fileGrp': grp, 'ID': '%s_%05d' % (grp, n), 'mimetype': mimetype, 'pageId': 'PHYS_%05d' % n,
+                     'url': 'https://host/%s/%05d%s' % (grp, n, MIME_TO_EXT[mimetype]),
+                     'local_filename': '%s/%s_%05d%s' % (grp, grp, n, MIME_TO_EXT[mimetype])}
+                    for n in range(1, number_of_pages + 1) for grp, mimetype in GRPS.items()], ignore=True)
+    return mets.to_xml()
+
+@fixture(name='number_of_pages', params=PAGES)
+def _fixture_number_of_pages(request):
+    return request.param
+
+@fixture(name='cache_flag', params=[False, True], ids=['uncached', 'cached'])
+def _fixture_cache_flag(request):
+    return request.param
+
+@fixture(name='mets')
+def _fixture_mets(number_of_pages, cache_flag):
+    return OcrdMets(content=_mets_xml(number_of_pages), cache_flag=cache_flag)
+
+@fixture(name='mets_server')
+def _fixture_mets_server(number_of_pages, tmp_path):
+    (tmp_path / 'mets.xml').write_bytes(_mets_xml(number_of_pages))
+    mets_server_url = str(tmp_path / 'mets.sock')
+    def _start_mets_server():
+        OcrdMetsServer(Workspace(Resolver(), str(tmp_path)), mets_server_url).startup()
+    p = Process(target=_start_mets_server, daemon=True)
+    p.start()
+    started = time()
+    while True:
+        try:
+            workspace = Workspace(Resolver(), str(tmp_path), mets_server_url=mets_server_url)
+            break
+        except ConnectionError:
+            # the server is not accepting connections yet
+            if time() - started > 60:
+                raise
+            sleep(0.1)
+    yield workspace
+    workspace.mets.stop()
+    p.join()
+
+def _fresh_mets(number_of_pages, cache_flag):
+    """pedantic setup for benchmarks which change the METS"""
+    return (OcrdMets(content=_mets_xml(number_of_pages), cache_flag=cache_flag),), {}
+
+
+@mark.benchmark(group='parse', min_rounds=1, max_time=0.5, warmup=False)
+def test_parse(benchmark, number_of_pages, cache_flag):
+    xml = _mets_xml(number_of_pages)
+    mets = benchmark(OcrdMets, content=xml, cache_flag=cache_flag)
+    assert len(mets.physical_pages) == number_of_pages
+
+@mark.benchmark(group='find_files', min_rounds=1, max_time=0.5, warmup=False)
+@mark.parametrize('attribute', QUERIES)
+def test_find_files(benchmark, mets, number_of_pages, attribute):
+    query, expected = QUERIES[attribute]
+    files = benchmark(mets.find_all_files, **query(number_of_pages))
+    assert len(files) == (number_of_pages if expected is None else expected)
+
+@mark.benchmark(group='add_file', min_rounds=1, max_time=0.5, warmup=False)
+def test_add_file(benchmark, mets, number_of_pages):
+    counter = iter(range(1, 1000000))
+    def add_file():
+        n = next(counter)
+        mets.add_file('OCR-D-NEW', ID='OCR-D-NEW_%05d' % n, pageId='PHYS_%05d' % (number_of_pages + n),
+                      mimetype=MIMETYPE_PAGE, local_filename='OCR-D-NEW/OCR-D-NEW_%05d.xml' % n)
+    benchmark(add_file)
+
+@mark.benchmark(group='remove_file', min_rounds=1, max_time=0.5, warmup=False)
+def test_remove_file(benchmark, mets, number_of_pages):
+    def add_file():
+        # on the last page (worst case for searches without index)
+        return (), dict(ID=mets.add_file('OCR-D-NEW', ID='OCR-D-NEW_0', pageId='PHYS_%05d' % number_of_pages,
+                                         mimetype=MIMETYPE_PAGE).ID)
+    benchmark.pedantic(mets.remove_one_file, setup=add_file, rounds=20)
+    assert len(mets.physical_pages) == number_of_pages
+
+@mark.benchmark(group='remove_file_group', min_rounds=1, warmup=False)
+def test_remove_file_group(benchmark, number_of_pages, cache_flag):
+    def remove_file_group(mets):
+        mets.remove_file_group('OCR-D-SEG', recursive=True)
+    benchmark.pedantic(remove_file_group, setup=lambda: _fresh_mets(number_of_pages, cache_flag), rounds=3)
+
+@mark.benchmark(group='merge', min_rounds=1, warmup=False)
+def test_merge(benchmark, number_of_pages, cache_flag):
+    other_mets = OcrdMets(content=_mets_xml(number_of_pages), cache_flag=cache_flag)
+    def merge(mets):
+        mets.merge(other_mets, fileGrp_mapping={grp: grp + '-MERGED' for grp in GRPS})
+    benchmark.pedantic(merge, setup=lambda: _fresh_mets(number_of_pages, cache_flag), rounds=3)
+
+@mark.benchmark(group='serialize', min_rounds=1, max_time=0.5, warmup=False)
+def test_serialize(benchmark, mets):
+    benchmark(mets.to_xml)
+
+@mark.benchmark(group='save', min_rounds=1, max_time=0.5, warmup=False)
+def test_save(benchmark, number_of_pages, cache_flag, tmp_path, monkeypatch):
+    monkeypatch.setenv('OCRD_METS_CACHING', 'true' if cache_flag else 'false')
+    (tmp_path / 'mets.xml').write_bytes(_mets_xml(number_of_pages))
+    workspace = Workspace(Resolver(), str(tmp_path))
+    benchmark(workspace.save_mets)
+
+@mark.benchmark(group='mets_server_find_files', min_rounds=1, max_time=0.5, warmup=False)
+def test_mets_server_find_files(benchmark, mets_server, number_of_pages):
+    files = benchmark(mets_server.mets.find_all_files, pageId='PHYS_%05d' % number_of_pages)
+    assert len(files) == len(GRPS)
+
+@mark.benchmark(group='mets_server_add_file', min_rounds=1, max_time=0.5, warmup=False)
+def test_mets_server_add_file(benchmark, mets_server, number_of_pages):
+    counter = iter(range(1, 1000000))
+    def add_file():
+        n = next(counter)
+        mets_server.add_file('OCR-D-NEW', file_id='OCR-D-NEW_%05d' % n, page_id='PHYS_%05d' % (number_of_pages + n),
+                             mimetype=MIMETYPE_PAGE, local_filename='OCR-D-NEW/OCR-D-NEW_%05d.xml' % n)
+    benchmark(add_file)
+
+if __name__ == '__main__':
+    main([__file__, '--benchmark-verbose', '--tb=short'])
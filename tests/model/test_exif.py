@@ -65,5 +65,34 @@ def test_ocrd_exif_serialize_xml():
                 '</exif>')
     assert expected == exif.to_xml()
 
+
+@pytest.mark.parametrize("ext,save_args,xResolution,yResolution,resolutionUnit", [
+    ('tif', {'dpi': (300, 300)}, 300, 300, 'inches'),
+    ('tif', {'tiffinfo': {282: 118.11, 283: 118.11, 296: 3}}, 118, 118, 'cm'),
+    ('png', {'dpi': (294.64, 294.64)}, 116, 116, 'cm'),
+    ('jpg', {'dpi': (300, 200)}, 300, 200, 'inches'),
+    ('png', {}, 1, 1, 'inches'),
+])
+def test_ocrd_exif_density(tmp_path, ext, save_args, xResolution, yResolution, resolutionUnit):
+    """Check the pixel density is read from the header like ImageMagick identify does"""
+    filename = str(tmp_path / f'img.{ext}')
+    Image.new('L', (20, 10)).save(filename, **save_args)
+    with Image.open(filename) as img:
+        exif = OcrdExif(img)
+    assert (exif.width, exif.height) == (20, 10)
+    assert exif.xResolution == xResolution
+    assert exif.yResolution == yResolution
+    assert exif.resolutionUnit == resolutionUnit
+    if xResolution == yResolution:
+        assert exif.resolution == xResolution
+    assert OcrdExif.from_dict(exif.to_dict()).to_xml() == exif.to_xml()
+def test_ocrd_exif_identify_missing(tmp_path, monkeypatch, caplog):
+    """Check in-memory images without density are handled without ImageMagick identify"""
+    monkeypatch.setenv('OCRD_EXIF_IDENTIFY', 'true')
+    monkeypatch.setenv('PATH', str(tmp_path))
+    exif = OcrdExif(Image.new('L', (20, 10)))
+    assert (exif.width, exif.height) == (20, 10)
+    assert "cannot estimate pixel density of image" in caplog.text
+
 if __name__ == '__main__':
     main(__file__)
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
+import json
 
 from os.path import join
 from os import environ
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from pathlib import Path
 import re
 import shutil
 from lxml import etree as ET
@@ -19,7 +22,11 @@ from ocrd_utils import (
     MIMETYPE_PAGE
 )
 from ocrd_models import (
-    OcrdMets
+    OcrdFileRecord,
+    OcrdMets,
+    OcrdMetsIndex,
+    ReadOnlyOcrdMets,
+    SqliteOcrdMets
 )
 
 import pytest
@@ -110,6 +117,330 @@ def test_find_all_files(sbb_sample_01):
     with pytest.raises(ValueError, match=re.compile(f'Start of range pattern')):
         mets.find_all_files(pageId='PHYS_0000..PHYS_0004')
 
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_find_all_files_index(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    for n in range(1, 4):
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff', url=f'http://host/{n}.tif', local_filename=f'IMG/{n}.tif')
+        mets.add_file('PAGE', ID=f'PAGE_{n}', pageId=f'PHYS_{n}', mimetype=MIMETYPE_PAGE, local_filename=f'PAGE/{n}.xml')
+    assert [f.ID for f in mets.find_files(pageId='PHYS_2')] == ['IMG_2', 'PAGE_2']
+    assert [f.ID for f in mets.find_files(pageId='PHYS_2', fileGrp='IMG', mimetype='image/tiff')] == ['IMG_2']
+    assert [f.ID for f in mets.find_files(mimetype=MIMETYPE_PAGE, pageId='PHYS_1..PHYS_2')] == ['PAGE_1', 'PAGE_2']
+    assert [f.ID for f in mets.find_files(url='http://host/3.tif')] == ['IMG_3']
+    assert [f.ID for f in mets.find_files(local_filename='PAGE/1.xml', fileGrp='IMG')] == []
+    # indexes must follow changes to the files
+    f = next(mets.find_files(ID='PAGE_1'))
+    f.local_filename = 'PAGE/renamed.xml'
+    f.ID = 'PAGE_renamed'
+    assert [f.ID for f in mets.find_files(local_filename='PAGE/renamed.xml')] == ['PAGE_renamed']
+    assert [f.ID for f in mets.find_files(local_filename='PAGE/1.xml')] == []
+    assert [f.ID for f in mets.find_files(ID='PAGE_renamed', pageId='PHYS_1')] == ['PAGE_renamed']
+    mets.remove_one_file('IMG_2')
+    assert [f.ID for f in mets.find_files(mimetype='image/tiff')] == ['IMG_1', 'IMG_3']
+    assert [f.ID for f in mets.find_files(pageId='PHYS_2')] == ['PAGE_2']
+    # the same ID in different fileGrps
+    mets.add_file('BIN', ID='X', pageId='PHYS_1', mimetype='image/png', local_filename='X.png')
+    mets.add_file('OCR', ID='X', pageId='PHYS_1', mimetype='image/png', local_filename='X.png')
+    for query in [{'mimetype': 'image/png'}, {'local_filename': 'X.png'}, {'ID': 'X'}, {'ID': 'X', 'pageId': 'PHYS_1'}]:
+        assert [(f.fileGrp, f.ID) for f in mets.find_files(**query)] == [('BIN', 'X'), ('OCR', 'X')]
+    mets.rename_file_group('BIN', 'BIN2')
+    mets.remove_file_group('OCR', recursive=True)
+    assert [(f.fileGrp, f.ID) for f in mets.find_files(mimetype='image/png')] == [('BIN2', 'X')]
+
+
+def test_read_only_mets():
+    mets = OcrdMets.empty_mets()
+    mets.unique_identifier = 'foo'
+    for n in range(1, 4):
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff', url=f'http://host/{n}.tif', local_filename=f'IMG/{n}.tif')
+        mets.add_file('PAGE', ID=f'PAGE_{n}', pageId=f'PHYS_{n}', mimetype=MIMETYPE_PAGE, local_filename=f'PAGE/{n}.xml')
+    mets.update_physical_page_attributes('PHYS_2', ORDER='2', LABEL='two')
+    ro_mets = ReadOnlyOcrdMets(content=mets.to_xml())
+    assert ro_mets.file_groups == mets.file_groups
+    assert ro_mets.physical_pages == mets.physical_pages
+    assert ro_mets.physical_pages_labels == mets.physical_pages_labels
+    assert ro_mets.unique_identifier == 'foo'
+    assert [a.name for a in ro_mets.agents] == [a.name for a in mets.agents]
+    for query in [{}, {'pageId': 'PHYS_2'}, {'fileGrp': 'IMG', 'mimetype': 'image/tiff'},
+                  {'ID': '//.*_[12]', 'pageId': 'PHYS_1..PHYS_2'}, {'url': '//.*\\.tif'},
+                  {'local_filename': 'PAGE/3.xml'}, {'local_only': True, 'exclude_fileGrp': ['IMG']}]:
+        assert [(f.ID, f.fileGrp, f.mimetype, f.pageId, f.url, f.local_filename)
+                for f in ro_mets.find_files(**query)] == \
+               [(f.ID, f.fileGrp, f.mimetype, f.pageId, f.url, f.local_filename)
+                for f in mets.find_files(**query)], query
+    assert ro_mets.get_physical_pages(for_fileIds=['IMG_3', 'PAGE_1']) == ['PHYS_3', 'PHYS_1']
+    with pytest.raises(NotImplementedError):
+        ro_mets.add_file('OUT', ID='out')
+    with pytest.raises(NotImplementedError):
+        ro_mets.to_xml()
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_journal(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    mets.add_file('IMG', ID='IMG_1', pageId='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    xml = mets.to_xml()
+    mets.start_journal()
+    f = mets.add_file('IMG', ID='IMG_2', pageId='PHYS_2', mimetype='image/tiff', url='http://host/2.tif')
+    f.ID = 'IMG_two'
+    f.local_filename = 'IMG/2.tif'
+    mets.remove_one_file('IMG_1')
+    mets.add_agent(name='foo', _type='OTHER', othertype='SOFTWARE', role='OTHER', notes=[({'option': 'x'}, 'y')])
+    mets.rename_file_group('IMG', 'IMAGE')
+    mets.update_physical_page_attributes('PHYS_2', ORDER='2')
+    entries = mets.pop_journal()
+    # nested changes (e.g. add_file_group in add_file) are not recorded separately
+    assert [json.loads(entry)[0] for entry in entries] == [
+        'add_file', 'update_file', 'update_file', 'remove_one_file', 'add_agent', 'rename_file_group',
+        'update_physical_page_attributes']
+    assert mets.pop_journal() == []
+    replayed = OcrdMets(content=xml, cache_flag=cache_flag)
+    replayed.replay_journal(entries)
+    assert [(f.ID, f.fileGrp, f.pageId, f.url, f.local_filename) for f in replayed.find_files()] == \
+        [('IMG_two', 'IMAGE', 'PHYS_2', 'http://host/2.tif', 'IMG/2.tif')]
+    assert replayed.physical_pages_labels == mets.physical_pages_labels
+    assert [a.notes for a in replayed.agents] == [a.notes for a in mets.agents]
+    with pytest.raises(ValueError, match='Invalid METS journal entry'):
+        replayed.replay_journal(['["to_xml", [], {}]'])
+    # elements are recorded by their @USE, unknown objects cannot be recorded at all
+    replayed.start_journal()
+    el_fileGrp = replayed.add_file_group('OTHER')
+    replayed.pop_journal()
+    replayed.remove_file_group(el_fileGrp)
+    assert [json.loads(entry) for entry in replayed.pop_journal()] == [['remove_file_group', ['OTHER'], {}]]
+    with pytest.raises(TypeError, match='Cannot record'):
+        replayed.update_physical_page_attributes('PHYS_2', ORDER=object())
+    assert replayed.pop_journal() == []
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_add_files(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag, now='now')
+    mets_expected = OcrdMets.empty_mets(cache_flag=cache_flag, now='now')
+    records = []
+    for n in range(1, 4):
+        records.append({'fileGrp': 'IMG', 'ID': f'IMG_{n}', 'pageId': f'PHYS_{n}', 'mimetype': 'image/tiff', 'url': f'http://host/{n}.tif', 'local_filename': f'IMG/{n}.tif'})
+        records.append({'fileGrp': 'PAGE', 'ID': f'PAGE_{n}', 'pageId': f'PHYS_{n}', 'mimetype': MIMETYPE_PAGE, 'local_filename': f'PAGE/{n}.xml'})
+    records.append(OcrdFileRecord(ID='NOPAGE', fileGrp='IMG', mimetype='text/plain'))
+    files = mets.add_files(records)
+    for record in records:
+        mets_expected.add_file(**(record._asdict() if isinstance(record, OcrdFileRecord) else record))
+    assert [f.ID for f in files] == ['IMG_1', 'PAGE_1', 'IMG_2', 'PAGE_2', 'IMG_3', 'PAGE_3', 'NOPAGE']
+    assert mets.to_xml() == mets_expected.to_xml()
+    assert [f.ID for f in mets.find_files(pageId='PHYS_2')] == ['IMG_2', 'PAGE_2']
+    assert [f.ID for f in mets.find_files(mimetype='text/plain')] == ['NOPAGE']
+    # nothing is added if any file exists
+    with pytest.raises(FileExistsError, match='neither force nor ignore'):
+        mets.add_files([{'fileGrp': 'OTHER', 'ID': 'OTHER_1'}, records[0]])
+    with pytest.raises(FileExistsError, match='unrelated'):
+        mets.add_files([{**records[0], 'pageId': 'PHYS_2'}])
+    with pytest.raises(ValueError, match='Invalid syntax'):
+        mets.add_files([{'fileGrp': 'OTHER', 'ID': 'OTHER 1'}])
+    assert 'OTHER' not in mets.file_groups
+    mets.add_files([{**records[0], 'url': 'http://host/new.tif'}], force=True)
+    assert [f.url for f in mets.find_files(ID='IMG_1')] == ['http://host/new.tif']
+    assert [f.ID for f in mets.find_files(pageId='PHYS_1')] == ['IMG_1', 'PAGE_1']
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_find_files_as_records(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    for n in range(1, 4):
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff', url=f'http://host/{n}.tif', local_filename=f'IMG/{n}.tif')
+        mets.add_file('PAGE', ID=f'PAGE_{n}', pageId=f'PHYS_{n}', mimetype=MIMETYPE_PAGE, local_filename=f'PAGE/{n}.xml')
+    mets.add_file('OTHER', ID='NOPAGE', mimetype='text/plain')
+    for query in [{}, {'pageId': 'PHYS_2..PHYS_3'}, {'fileGrp': 'IMG', 'url': '//.*2.tif'}, {'exclude_fileGrp': ['IMG']}]:
+        records = list(mets.find_files(as_records=True, **query))
+        assert all(isinstance(record, OcrdFileRecord) for record in records)
+        assert [(f.ID, f.fileGrp, f.mimetype, f.pageId, f.url, f.local_filename, f.basename) for f in records] == \
+            [(f.ID, f.fileGrp, f.mimetype, f.pageId, f.url, f.local_filename, f.basename) for f in mets.find_files(**query)]
+
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_get_physical_pages_ranges(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    for n in [1, 2, 3, 5, 8, 13, 21, 100]:
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n:04d}', mimetype='image/tiff')
+        mets.update_physical_page_attributes(f'PHYS_{n:04d}', ORDER=str(n), LABEL=f'page {n}')
+    assert mets.get_physical_pages(for_pageIds='PHYS_0002..PHYS_0013') == ['PHYS_0002', 'PHYS_0003', 'PHYS_0005', 'PHYS_0008', 'PHYS_0013']
+    assert mets.get_physical_pages(for_pageIds='PHYS_0021..PHYS_0999') == ['PHYS_0021', 'PHYS_0100']
+    assert mets.get_physical_pages(for_pageIds='8..21') == ['PHYS_0008', 'PHYS_0013', 'PHYS_0021']
+    assert mets.get_physical_pages(for_pageIds='//page 1.*') == ['PHYS_0001', 'PHYS_0013', 'PHYS_0100']
+    with pytest.raises(ValueError, match='Start of range'):
+        mets.get_physical_pages(for_pageIds='PHYS_0004..PHYS_0008')
+    with pytest.raises(ValueError, match='match(es)? none'):
+        mets.get_physical_pages(for_pageIds='PHYS_0101..PHYS_0200')
+    # changes to the pages are reflected
+    mets.update_physical_page_attributes('PHYS_0005', ORDER='4')
+    assert mets.get_physical_pages(for_pageIds='4..8') == ['PHYS_0005', 'PHYS_0008']
+    mets.remove_physical_page('PHYS_0003')
+    mets.add_file('IMG', ID='IMG_4', pageId='PHYS_0004', mimetype='image/tiff')
+    assert sorted(mets.get_physical_pages(for_pageIds='PHYS_0002..PHYS_0005')) == ['PHYS_0002', 'PHYS_0004', 'PHYS_0005']
+    assert sorted(f.ID for f in mets.find_files(pageId='PHYS_0001..PHYS_0004')) == ['IMG_1', 'IMG_2', 'IMG_4']
+
+def test_mets_index(tmp_path, monkeypatch):
+    mets = OcrdMets.empty_mets()
+    mets.unique_identifier = 'foo'
+    for n in range(1, 4):
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff', url=f'http://host/{n}.tif', local_filename=f'IMG/{n}.tif')
+        mets.add_file('PAGE', ID=f'PAGE_{n}', pageId=f'PHYS_{n}', mimetype=MIMETYPE_PAGE, local_filename=f'PAGE/{n}.xml')
+    mets.update_physical_page_attributes('PHYS_2', ORDER='2', LABEL='two')
+    mets_path = tmp_path / 'mets.xml'
+    mets_path.write_bytes(mets.to_xml())
+    def files(mets):
+        return [(f.ID, f.fileGrp, f.mimetype, f.pageId, f.url, f.local_filename) for f in mets.find_files()]
+    expected = OcrdMets(filename=str(mets_path), cache_flag=True)
+    monkeypatch.setenv('OCRD_METS_INDEX', 'true')
+    OcrdMets(filename=str(mets_path), cache_flag=True)
+    assert OcrdMetsIndex(str(mets_path)).load() is not None
+    for indexed in [OcrdMets(filename=str(mets_path), cache_flag=True), ReadOnlyOcrdMets(filename=str(mets_path))]:
+        assert files(indexed) == files(expected)
+        assert indexed.file_groups == expected.file_groups
+        assert indexed.physical_pages_labels == expected.physical_pages_labels
+        assert indexed.unique_identifier == 'foo'
+        assert [a.name for a in indexed.agents] == [a.name for a in expected.agents]
+        assert [f.ID for f in indexed.find_files(pageId='PHYS_2', mimetype='image/tiff')] == ['IMG_2']
+    # the index is ignored (and rewritten) once the METS has changed
+    mets.remove_one_file('IMG_1')
+    mets_path.write_bytes(mets.to_xml())
+    assert OcrdMetsIndex(str(mets_path)).load() is None
+    assert 'IMG_1' not in [f.ID for f in ReadOnlyOcrdMets(filename=str(mets_path)).find_files()]
+    assert 'IMG_1' not in [f.ID for f in OcrdMets(filename=str(mets_path), cache_flag=True).find_files()]
+    assert OcrdMetsIndex(str(mets_path)).load() is not None
+    # as is a broken index
+    Path(str(mets_path) + '.idx').write_bytes(b'garbage')
+    assert OcrdMetsIndex(str(mets_path)).load() is None
+    assert files(OcrdMets(filename=str(mets_path), cache_flag=True)) == files(mets)
+
+
+def test_sqlite_mets():
+    mets = OcrdMets.empty_mets()
+    mets.unique_identifier = 'foo'
+    for n in range(1, 5):
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n:04d}', mimetype='image/tiff', url=f'http://host/{n}.tif', local_filename=f'IMG/{n}.tif')
+        mets.add_file('PAGE', ID=f'PAGE_{n}', pageId=f'PHYS_{n:04d}', mimetype=MIMETYPE_PAGE, local_filename=f'PAGE/{n}.xml')
+    mets.update_physical_page_attributes('PHYS_0002', ORDER='2', LABEL='two')
+    sqlite = SqliteOcrdMets(content=mets.to_xml())
+    assert sqlite.to_xml(xmllint=True) == mets.to_xml(xmllint=True)
+    assert sqlite.unique_identifier == 'foo'
+    def files(mets, **kwargs):
+        return [(f.ID, f.fileGrp, f.mimetype, f.pageId, f.url, f.local_filename) for f in mets.find_files(**kwargs)]
+    def check():
+        for query in [{}, {'pageId': 'PHYS_0002..PHYS_0003'}, {'pageId': '2'}, {'fileGrp': 'IMG', 'url': '//.*2.tif'},
+                      {'ID': '//PAGE_[12]'}, {'mimetype': 'image/tiff', 'local_only': True}, {'exclude_fileGrp': ['IMG']},
+                      {'local_filename': 'PAGE/3.xml'}, {'as_records': True}]:
+            assert files(sqlite, **query) == files(mets, **query), query
+        assert sqlite.file_groups == mets.file_groups
+        assert sqlite.physical_pages == mets.physical_pages
+        assert sqlite.physical_pages_labels == mets.physical_pages_labels
+        assert sqlite.get_physical_pages(for_fileIds=['PAGE_3', 'IMG_1', 'foo']) == \
+            mets.get_physical_pages(for_fileIds=['PAGE_3', 'IMG_1', 'foo'])
+        assert sqlite.to_xml(xmllint=True) == mets.to_xml(xmllint=True)
+    for m in [mets, sqlite]:
+        f = next(m.find_files(ID='IMG_1'))
+        f.ID = 'IMG_0'
+        f.local_filename = 'IMG/0.tif'
+        f.pageId = 'PHYS_0003'
+        m.add_files([{'fileGrp': 'NEW', 'ID': f'NEW_{n}', 'pageId': f'PHYS_{n:04d}'} for n in range(3, 7)])
+        m.remove_one_file('IMG_4')
+        m.remove_file_group('PAGE', recursive=True)
+        m.rename_file_group('NEW', 'OLD')
+        m.update_physical_page_attributes('PHYS_0006', ORDER='6')
+        with pytest.raises(FileExistsError, match='unrelated'):
+            m.add_file('OLD', ID='NEW_3', pageId='PHYS_0004')
+    check()
+    with pytest.raises(Exception, match='not empty'):
+        sqlite.remove_file_group('OLD')
+    # journaled changes can be replayed on either
+    sqlite.start_journal()
+    sqlite.add_file('OLD', ID='OLD_1', pageId='PHYS_0007', mimetype='image/png')
+    sqlite.remove_physical_page('PHYS_0006')
+    mets.replay_journal(sqlite.pop_journal())
+    check()
+
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_snapshot(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    mets.add_file('IMG', ID='IMG_1', pageId='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    generation = mets.generation
+    snapshot = mets.snapshot()
+    assert snapshot.generation == generation
+    assert mets.snapshot() is snapshot
+    # changes (also through OcrdFile) start a new generation, but do not affect the snapshot
+    next(mets.find_files(ID='IMG_1')).local_filename = 'IMG/one.tif'
+    mets.add_file('IMG', ID='IMG_2', pageId='PHYS_2', mimetype='image/tiff')
+    assert mets.generation == generation + 2
+    assert [(f.ID, f.local_filename) for f in snapshot.find_files()] == [('IMG_1', 'IMG/1.tif')]
+    assert [(f.ID, f.local_filename) for f in mets.snapshot().find_files()] == [('IMG_1', 'IMG/one.tif'), ('IMG_2', None)]
+    with pytest.raises(FileExistsError):
+        mets.add_file('IMG', ID='IMG_2', pageId='PHYS_2', mimetype='image/tiff')
+    assert mets.generation == generation + 3
+    # readers of snapshots proceed while another thread changes the METS
+    def write():
+        for n in range(3, 200):
+            mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff')
+    def read(_):
+        snapshot = mets.snapshot()
+        assert len(snapshot.find_all_files()) == len(snapshot.physical_pages)
+        return snapshot.generation
+    with ThreadPoolExecutor(4) as pool:
+        writer = pool.submit(write)
+        generations = list(pool.map(read, range(100)))
+        writer.result()
+    assert all(generation + 3 <= g <= mets.generation for g in generations)
+    assert mets.snapshot().physical_pages == mets.physical_pages
+
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_snapshot_incremental(cache_flag):
+    def assert_snapshot_complete(mets):
+        snapshot = mets.snapshot()
+        rebuilt = ReadOnlyOcrdMets.from_index_data(mets._index_data())
+        assert snapshot.file_groups == rebuilt.file_groups
+        assert list(snapshot.find_files()) == list(rebuilt.find_files())
+        assert snapshot.physical_pages_labels == rebuilt.physical_pages_labels
+        assert [f.ID for f in snapshot.find_files(pageId='PHYS_0002..PHYS_0004')] == \
+            [f.ID for f in rebuilt.find_files(pageId='PHYS_0002..PHYS_0004')]
+        assert [f.ID for f in snapshot.find_files(mimetype='image/tiff')] == \
+            [f.ID for f in rebuilt.find_files(mimetype='image/tiff')]
+        assert snapshot.unique_identifier == rebuilt.unique_identifier
+        assert [a.name for a in snapshot.agents] == [a.name for a in rebuilt.agents]
+        return snapshot
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    for n in range(1, 6):
+        mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n:04d}', mimetype='image/tiff', local_filename=f'IMG/{n}.tif')
+        mets.add_file('OCR', ID=f'OCR_{n}', pageId=f'PHYS_{n:04d}', mimetype='text/xml')
+    first = assert_snapshot_complete(mets)
+    mets.add_file('BIN', ID='BIN_2', pageId='PHYS_0002', mimetype='image/png')
+    ocrd_file = next(mets.find_files(ID='IMG_3'))
+    ocrd_file.mimetype = 'image/png'
+    ocrd_file.pageId = 'PHYS_0006'
+    mets.remove_one_file('OCR_4')
+    mets.update_physical_page_attributes('PHYS_0001', ORDER='1', LABEL='one')
+    mets.add_agent(name='foo')
+    mets.unique_identifier = 'purl:foo'
+    second = assert_snapshot_complete(mets)
+    # unchanged fileGrps are shared with the previous snapshot
+    if cache_flag:
+        assert second._files['OCR'] is not first._files['OCR']
+        assert second._files['IMG'] is not first._files['IMG']
+        mets.remove_one_file('BIN_2')
+        assert assert_snapshot_complete(mets)._files['IMG'] is second._files['IMG']
+    mets.remove_file_group('OCR', recursive=True)
+    mets.rename_file_group('IMG', 'IMAGE')
+    assert_snapshot_complete(mets)
+    # pages and files removed and added again are appended
+    mets.remove_one_file('IMG_1')
+    mets.add_file('IMAGE', ID='IMG_1', pageId='PHYS_0001', mimetype='image/tiff')
+    mets.remove_one_file('IMG_5')
+    mets.add_file('IMAGE', ID='IMG_5', pageId='PHYS_0005', mimetype='image/tiff')
+    assert mets.physical_pages[-2:] == ['PHYS_0001', 'PHYS_0005']
+    assert assert_snapshot_complete(mets).physical_pages == mets.physical_pages
+    # without caching, queries lock the METS instead of taking a full snapshot after each change
+    mets.add_agent(name='bar')
+    with mets.reading() as reader:
+        assert (reader is mets) != cache_flag
+        assert reader.generation == mets.generation
+
+
 def test_find_all_files_local_only(sbb_sample_01):
     assert len(sbb_sample_01.find_all_files(pageId='PHYS_0001',
                local_only=True)) == 14, '14 local files for page "PHYS_0001"'
@@ -371,6 +702,111 @@ def test_merge(sbb_sample_01):
     sbb_sample_01.merge(other_mets, fileGrp_mapping={'OCR-D-IMG': 'FOO'})
     assert len(sbb_sample_01.file_groups) == 18
 
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_merge_mappings(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    mets.add_file('IMG', ID='IMG_1', pageId='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    other_mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    for n in range(1, 4):
+        other_mets.add_file('BIN', ID=f'BIN_{n}', pageId=f'p{n}', mimetype='image/png', local_filename=f'BIN/{n}.png')
+    added = []
+    mets.merge(other_mets, fileGrp_mapping={'BIN': 'OCR-D-BIN'}, fileId_mapping={'BIN_3': 'BIN_three'},
+               pageId_mapping={'p1': 'PHYS_1', 'p2': 'PHYS_2'}, after_add_cb=added.append, mimetype='image/png')
+    assert [f.ID for f in added] == ['BIN_1', 'BIN_2', 'BIN_three']
+    assert [(f.ID, f.fileGrp, f.pageId) for f in mets.find_files(fileGrp='OCR-D-BIN')] == \
+        [('BIN_1', 'OCR-D-BIN', 'PHYS_1'), ('BIN_2', 'OCR-D-BIN', 'PHYS_2'), ('BIN_three', 'OCR-D-BIN', 'p3')]
+    assert [f.ID for f in mets.find_files(pageId='PHYS_1')] == ['IMG_1', 'BIN_1']
+    # clashing IDs are all checked before anything is merged
+    other_mets.add_file('IMG', ID='IMG_1', pageId='p1', mimetype='image/tiff', url='http://host/1.tif')
+    with pytest.raises(FileExistsError):
+        mets.merge(other_mets, fileGrp_mapping={'BIN': 'NEW'}, pageId_mapping={'p1': 'PHYS_1'})
+    assert 'NEW' not in mets.file_groups
+    mets.merge(other_mets, fileGrp_mapping={'BIN': 'NEW'}, pageId_mapping={'p1': 'PHYS_1'}, force=True)
+    assert [(f.pageId, f.url) for f in mets.find_files(ID='IMG_1')] == [('PHYS_1', 'http://host/1.tif')]
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_remove_files(cache_flag):
+    def sample():
+        mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+        for n in range(1, 5):
+            mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff', local_filename=f'IMG/{n}.tif')
+            mets.add_file('BIN', ID=f'BIN_{n}', pageId=f'PHYS_{n}', mimetype='image/png', local_filename=f'BIN/{n}.png')
+        return mets
+    mets, replica = sample(), sample()
+    mets.start_journal()
+    removed = mets.remove_files([f for f in mets.find_files() if f.ID in ['IMG_1', 'BIN_1', 'IMG_2']])
+    assert [f.ID for f in removed] == ['IMG_1', 'IMG_2', 'BIN_1']
+    # pages left without files are removed as well
+    assert mets.physical_pages == ['PHYS_2', 'PHYS_3', 'PHYS_4']
+    assert [f.ID for f in mets.find_files(pageId='PHYS_2')] == ['BIN_2']
+    assert [f.ID for f in mets.find_files(local_filename='IMG/1.tif')] == []
+    mets.remove_file_group('BIN', recursive=True)
+    assert mets.physical_pages == ['PHYS_3', 'PHYS_4']
+    assert [f.ID for f in mets.find_files()] == ['IMG_3', 'IMG_4']
+    replica.replay_journal(mets.pop_journal())
+    assert list(replica.find_files()) == list(mets.find_files())
+    assert replica.physical_pages == mets.physical_pages
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_diff_apply(cache_flag):
+    def sample():
+        mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+        for n in range(1, 5):
+            mets.add_file('IMG', ID=f'IMG_{n}', pageId=f'PHYS_{n}', mimetype='image/tiff', local_filename=f'IMG/{n}.tif')
+            mets.add_file('BIN', ID=f'BIN_{n}', pageId=f'PHYS_{n}', mimetype='image/png', url=f'http://host/{n}.png')
+        mets.update_physical_page_attributes('PHYS_1', ORDER='1', LABEL='one')
+        return mets
+    mets, other = sample(), sample()
+    assert mets.diff(other)['files'] == {'added': [], 'changed': [], 'removed': []}
+    other.remove_file_group('BIN', recursive=True)
+    other.add_file('OCR', ID='OCR_1', pageId='PHYS_5', mimetype='text/xml', local_filename='OCR/1.xml')
+    ocrd_file = next(other.find_files(ID='IMG_2'))
+    ocrd_file.local_filename = 'IMG/two.tif'
+    ocrd_file.url = 'http://host/2.tif'
+    next(other.find_files(ID='IMG_3')).pageId = 'PHYS_5'
+    other.remove_physical_page('PHYS_3')
+    other.remove_one_file('IMG_4')
+    other.update_physical_page_attributes('PHYS_1', ORDER='0', LABEL='')
+    other.update_physical_page_attributes('PHYS_5', ORDERLABEL='five')
+    other.add_agent(name='foo', _type='OTHER', othertype='SOFTWARE', role='CREATOR', notes=[({'option': 'x'}, 'y')])
+    patch = json.loads(json.dumps(mets.diff(other)))
+    assert patch['file_groups'] == {'added': ['OCR'], 'removed': ['BIN']}
+    assert [f['ID'] for f in patch['files']['changed']] == ['IMG_2', 'IMG_3']
+    assert patch['pages']['removed'] == ['PHYS_3', 'PHYS_4']
+    assert patch['pages']['attributes'] == {'PHYS_1': {'ORDER': '0', 'LABEL': None}, 'PHYS_5': {'ID': 'PHYS_5', 'ORDERLABEL': 'five'}}
+    mets.start_journal()
+    mets.apply(patch)
+    assert [json.loads(entry)[0] for entry in mets.pop_journal()] == ['apply']
+    assert list(mets.find_files()) == list(other.find_files())
+    assert mets.physical_pages_labels == other.physical_pages_labels
+    assert mets.diff(other) == {'file_groups': {'added': [], 'removed': []},
+                                'files': {'added': [], 'changed': [], 'removed': []},
+                                'pages': {'attributes': {}, 'removed': []},
+                                'agents': {'added': []}}
+    # agents missing in the other METS are not reported
+    assert mets.diff(sample())['agents'] == {'added': []}
+    with pytest.raises(NotImplementedError):
+        mets.snapshot().apply(patch)
+
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_savepoint(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    mets.add_file('IMG', ID='IMG_1', pageId='PHYS_1', mimetype='image/tiff')
+    mets.start_journal()
+    with mets.savepoint():
+        mets.add_file('OCR', ID='OCR_1', pageId='PHYS_1', mimetype='text/xml')
+    with pytest.raises(ValueError):
+        with mets.savepoint():
+            mets.add_file('BIN', ID='BIN_1', pageId='PHYS_1', mimetype='image/png')
+            mets.add_files([{'fileGrp': 'BIN', 'ID': 'BIN_2', 'pageId': 'PHYS_2', 'mimetype': 'image/png'}])
+            raise ValueError('failed')
+    # changes inside a failed savepoint are reverted, others kept (and recorded)
+    assert mets.file_groups == ['IMG', 'OCR']
+    assert [f.ID for f in mets.find_files()] == ['IMG_1', 'OCR_1']
+    assert mets.physical_pages == ['PHYS_1']
+    assert [json.loads(entry)[0] for entry in mets.pop_journal()] == ['add_file']
+
+
 def test_invalid_filegrp():
     """addresses https://github.com/OCR-D/core/issues/746"""
 
@@ -416,5 +852,19 @@ def test_update_physical_page_attributes(sbb_directory_ocrd_mets):
     assert b'ORDERLABEL' in m.to_xml()
 
 
+@pytest.mark.parametrize('cache_flag', CACHING_ENABLED)
+def test_update_physical_page_attributes_order(cache_flag):
+    mets = OcrdMets.empty_mets(cache_flag=cache_flag)
+    for n in range(1, 4):
+        mets.add_file('FOO', ID=f'foo{n}', pageId=f'P{n}', mimetype='foo/bar')
+    mets.update_physical_page_attributes('P1', ORDER='1')
+    mets.update_physical_page_attributes('P2', ORDER='2', LABEL='two')
+    mets.update_physical_page_attributes('P2', ORDER='2', LABEL='')
+    # pages keep their position
+    assert mets.physical_pages == ['P1', 'P2', 'P3']
+    assert mets.get_physical_pages(for_pageIds='1..2') == ['P1', 'P2']
+    assert mets.physical_pages_labels == {'P1': ('1', None, None), 'P2': ('2', None, None), 'P3': (None, None, None)}
+
+
 if __name__ == '__main__':
     main(__file__)
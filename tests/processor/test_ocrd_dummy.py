@@ -81,5 +81,23 @@ def test_copy_file_false(tmpdir):
     assert pcgts.get_Page().imageHeight == 100, 'image is 100 pix long'
     assert pcgts.get_Page().imageFilename == 'IMG/IMG_0.png', 'imageFilename references the original img path'
 
+
+def test_copy_files_parallel(tmpdir, monkeypatch):
+    monkeypatch.setenv('OCRD_MAX_PARALLEL_PAGES', '3')
+    workspace = Resolver().workspace_from_nothing(directory=tmpdir)
+    for i in range(10):
+        workspace.save_image_file(Image.new('RGB', (100, 100)), f'IMG_{i}', 'IMG', page_id=f'PHYS_{i}', mimetype='image/png')
+    run_processor(
+        DummyProcessor,
+        workspace=workspace,
+        input_file_grp='IMG',
+        output_file_grp='OUTPUT',
+        parameter={'copy_files': True},
+    )
+    assert len(workspace.mets.find_all_files(fileGrp='OUTPUT', mimetype='image/png')) == 10
+    assert len(workspace.mets.find_all_files(fileGrp='OUTPUT', mimetype=MIMETYPE_PAGE)) == 10
+    for f in workspace.mets.find_all_files(fileGrp='OUTPUT'):
+        assert os.path.exists(workspace.resolve_path(f.local_filename))
+
 if __name__ == "__main__":
     main(__file__)
@@ -1,9 +1,11 @@
 import json
 
 from tempfile import TemporaryDirectory
+from os import getpid
 from os.path import join
+from pathlib import Path
 from tests.base import CapturingTestCase as TestCase, assets, main # pylint: disable=import-error, no-name-in-module
-from tests.data import DummyProcessor, DummyProcessorWithRequiredParameters, DummyProcessorWithOutput, IncompleteProcessor
+from tests.data import DummyProcessor, DummyProcessorWithRequiredParameters, DummyProcessorWithOutput, DummyProcessorWithPages, IncompleteProcessor
 
 from ocrd_utils import MIMETYPE_PAGE, pushd_popd, initLogging, disableLogging
 from ocrd.resolver import Resolver
@@ -211,5 +213,33 @@ class TestProcessor(TestCase):
         r = self.capture_out_err()
         assert 'ERROR ocrd.processor.base - found no page phys_0001 in file group GRP1' in r.err
 
+
+@pytest.mark.parametrize('max_parallel_pages', ['1', '4'])
+@pytest.mark.parametrize('mets_caching', ['false', 'true'])
+def test_process_pages(tmp_path, monkeypatch, max_parallel_pages, mets_caching):
+    monkeypatch.setenv('OCRD_MAX_PARALLEL_PAGES', max_parallel_pages)
+    monkeypatch.setenv('OCRD_METS_CACHING', mets_caching)
+    monkeypatch.setenv('OCRD_MISSING_OUTPUT', 'SKIP')
+    ws = Resolver().workspace_from_nothing(directory=str(tmp_path))
+    assert ws.mets._cache_flag == (mets_caching == 'true')
+    for i in range(8):
+        ws.add_file('GRP1', mimetype=MIMETYPE_PAGE, file_id=f'foobar{i}', page_id=f'phys_{i:04d}')
+    run_processor(DummyProcessorWithPages, workspace=ws, input_file_grp='GRP1', output_file_grp='OCR-D-OUT',
+                  parameter={'baz': 'phys_0003'})
+    # changes of the failing page are discarded, others are added to the METS in page order
+    out_files = ws.mets.find_all_files(fileGrp='OCR-D-OUT')
+    assert [f.pageId for f in out_files] == [f'phys_{i:04d}' for i in range(8) if i != 3]
+    # processed in worker processes if parallel
+    pids = {Path(ws.resolve_path(f.local_filename)).read_text() for f in out_files}
+    assert (str(getpid()) in pids) == (max_parallel_pages == '1')
+    ws.save_mets()
+    reloaded = Resolver().workspace_from_url(ws.mets_target)
+    assert len(reloaded.mets.find_all_files(fileGrp='OCR-D-OUT')) == 7
+    # aborts by default
+    monkeypatch.delenv('OCRD_MISSING_OUTPUT')
+    with pytest.raises(ValueError, match='cannot process phys_0003'):
+        run_processor(DummyProcessorWithPages, workspace=ws, input_file_grp='GRP1', output_file_grp='OCR-D-OUT2',
+                      parameter={'baz': 'phys_0003'})
+
 if __name__ == "__main__":
     main(__file__)
@@ -113,6 +113,21 @@ def test_mets_server_add_file(start_mets_server):
 
     assert len(workspace_file.mets.find_all_files(fileGrp='FOO')) == NO_FILES
 
+def test_mets_server_add_files(start_mets_server):
+    mets_server_url, workspace_server = start_mets_server
+    files = workspace_server.add_files([dict(
+        local_filename=f'FOO/local_filename{i}',
+        mimetype=MIMETYPE_PAGE,
+        page_id=f'page{i}',
+        file_grp='FOO',
+        file_id=f'FOO_page{i}_foo{i}') for i in range(100)])
+    assert len(files) == 100
+    assert len(workspace_server.mets.find_all_files(fileGrp='FOO')) == 100
+    assert [f.ID for f in workspace_server.mets.find_files(pageId='page5')] == ['FOO_page5_foo5']
+    # duplicates are rejected
+    with raises(Exception):
+        workspace_server.add_files([dict(file_grp='FOO', file_id='FOO_page1_foo1', page_id='page1', mimetype=MIMETYPE_PAGE)])
+
 def test_mets_server_add_agents(start_mets_server):
     NO_AGENTS = 30
 
@@ -1,3 +1,9 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from PIL import Image, ImageFile
+
 from tests.base import TestCase, main, assets, create_ocrd_file, create_ocrd_file_with_defaults
 
 from ocrd_utils import MIMETYPE_PAGE
@@ -5,7 +11,8 @@ from ocrd_models import OcrdMets
 from ocrd_modelfactory import (
     exif_from_filename,
     page_from_image,
-    page_from_file
+    page_from_file,
+    probe_image
 )
 
 SAMPLE_IMG = assets.path_to('kant_aufklaerung_1784/data/OCR-D-IMG/INPUT_0017.tif')
@@ -18,6 +25,20 @@ class TestModelFactory(TestCase):
         with self.assertRaisesRegex(Exception, "Must pass 'image_filename' to 'exif_from_filename'"):
             exif_from_filename(None)
 
+    def test_probe_image(self):
+        with TemporaryDirectory() as tempdir:
+            filename = join(tempdir, 'img.tif')
+            Image.new('RGB', (300, 200)).save(filename, dpi=(300, 300), compression='tiff_lzw')
+            # only the header is read, the image data is never decoded
+            with patch.object(ImageFile.ImageFile, 'load_prepare', side_effect=AssertionError('image decoded')):
+                exif = probe_image(filename)
+                pcgts = page_from_image(create_ocrd_file_with_defaults(mimetype='image/tiff', local_filename=filename))
+        self.assertEqual((exif.width, exif.height, exif.photometricInterpretation), (300, 200, 'RGB'))
+        self.assertEqual((exif.xResolution, exif.resolutionUnit), (300, 'inches'))
+        self.assertEqual((pcgts.get_Page().imageWidth, pcgts.get_Page().imageHeight), (300, 200))
+        with self.assertRaisesRegex(Exception, "Must pass 'image_filename' to 'probe_image'"):
+            probe_image(None)
+
     def test_page_from_file(self):
         f = create_ocrd_file_with_defaults(mimetype='image/tiff', local_filename=SAMPLE_IMG, ID='file1')
         self.assertEqual(f.mimetype, 'image/tiff')
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from os import chdir, curdir, walk, stat, chmod, umask
+from os import chdir, curdir, listdir, walk, stat, chmod, umask, utime
 import shutil
 import logging
 from stat import filemode
@@ -8,11 +8,13 @@ from os.path import join, exists, abspath, basename, dirname
 from shutil import copyfile, copytree as copytree_, rmtree
 from pathlib import Path
 from gzip import open as gzip_open
+from types import SimpleNamespace
 
 from PIL import Image
 import numpy as np
 
 import pytest
+from requests import Session
 
 from tests.base import (
     assets,
@@ -22,11 +24,15 @@ from tests.base import (
 
 from ocrd_models import (
     OcrdFile,
-    OcrdMets
+    OcrdMets,
+    OcrdMetsIndex,
+    ReadOnlyOcrdMets,
+    SqliteOcrdMets
 )
-from ocrd_models.ocrd_page import parseString
-from ocrd_models.ocrd_page import TextRegionType, CoordsType, AlternativeImageType
-from ocrd_utils import polygon_mask, xywh_from_polygon, bbox_from_polygon, points_from_polygon
+from ocrd_models.ocrd_page import parse, parseString, to_xml
+from ocrd_models.ocrd_page import TextRegionType, TextLineType, CoordsType, AlternativeImageType, BorderType, PageType
+from ocrd_utils import (polygon_mask, xywh_from_polygon, bbox_from_polygon, points_from_polygon, MIMETYPE_PAGE,
+                        coordinates_of_segment, crop_image, image_from_polygon)
 from ocrd_modelfactory import page_from_file
 from ocrd.resolver import Resolver
 from ocrd.workspace import Workspace
@@ -80,6 +86,19 @@ def test_workspace_add_file(plain_workspace):
     assert Path(f.local_filename).exists()
 
 
+def test_workspace_add_files(plain_workspace):
+    files = plain_workspace.add_files([
+        {'file_grp': 'GRP', 'file_id': f'ID{i}', 'mimetype': 'image/tiff', 'page_id': f'PHYS_{i}',
+         'local_filename': f'GRP/ID{i}.tif', 'content': f'CONTENT{i}'} for i in range(3)])
+    assert [f.ID for f in files] == ['ID0', 'ID1', 'ID2']
+    assert [f.ID for f in plain_workspace.mets.find_files(pageId='PHYS_1')] == ['ID1']
+    assert Path(plain_workspace.directory, 'GRP/ID2.tif').read_text() == 'CONTENT2'
+    with pytest.raises(FileExistsError):
+        plain_workspace.add_files([{'file_grp': 'GRP', 'file_id': 'ID0', 'mimetype': 'image/tiff', 'page_id': 'PHYS_0'}])
+    plain_workspace.overwrite_mode = True
+    plain_workspace.add_files([{'file_grp': 'GRP', 'file_id': 'ID0', 'mimetype': 'image/tiff', 'page_id': 'PHYS_0'}])
+    assert not next(plain_workspace.mets.find_files(ID='ID0')).local_filename
+
 def test_workspace_add_file_overwrite(plain_workspace):
     fpath = plain_workspace.directory / 'ID1.tif'
 
@@ -367,6 +386,22 @@ def test_remove_file_group_flat(plain_workspace):
     plain_workspace.remove_file_group('FOO', recursive=True)
 
 
+def test_remove_file_group_page_recursive(plain_workspace):
+    page_xml = ('<PcGts xmlns="http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15"><Metadata>'
+                '<Creator/><Created>2024-01-01T00:00:00</Created><LastChange>2024-01-01T00:00:00</LastChange></Metadata>'
+                '<Page imageFilename="IMG/%d.tif" imageWidth="1" imageHeight="1"><AlternativeImage filename="BIN/%d.png"/></Page></PcGts>')
+    for n in range(1, 11):
+        plain_workspace.add_file('IMG', file_id=f'IMG_{n}', page_id=f'PHYS_{n}', mimetype='image/tiff', local_filename=f'IMG/{n}.tif', content='tif')
+        plain_workspace.add_file('BIN', file_id=f'BIN_{n}', page_id=f'PHYS_{n}', mimetype='image/png', local_filename=f'BIN/{n}.png', content='png')
+        plain_workspace.add_file('SEG', file_id=f'SEG_{n}', page_id=f'PHYS_{n}', mimetype=MIMETYPE_PAGE, local_filename=f'SEG/{n}.xml', content=page_xml % (n, n))
+    plain_workspace.remove_file_group('SEG', recursive=True, page_recursive=True, max_workers=4)
+    assert plain_workspace.mets.file_groups == ['IMG', 'BIN']
+    assert [f.ID for f in plain_workspace.mets.find_files(pageId='PHYS_1')] == ['IMG_1']
+    assert not exists(join(plain_workspace.directory, 'SEG'))
+    assert not exists(join(plain_workspace.directory, 'BIN'))
+    assert len(listdir(join(plain_workspace.directory, 'IMG'))) == 10
+
+
 @pytest.fixture(name='kant_complex_workspace')
 def _fixture_kant_complex(tmp_path):
     copytree(assets.path_to('kant_aufklaerung_1784-complex/data'), str(tmp_path))
@@ -412,6 +447,35 @@ def test_download_to_directory_from_workspace_download_file(plain_workspace):
     assert f2.local_filename == 'test.xml'
 
 
+def test_download_files(plain_workspace, monkeypatch):
+    sessions = set()
+    def get(session, url, timeout=None):
+        sessions.add(session)
+        if url.endswith('/missing.png'):
+            raise ConnectionError(url)
+        return SimpleNamespace(content=url.encode('utf-8'), headers={'Content-Type': 'image/png'},
+                               raise_for_status=lambda: None)
+    monkeypatch.setattr(Session, 'get', get)
+    files = [plain_workspace.add_file('IMG', file_id=f'IMG_{n}', page_id=f'PHYS_{n}', mimetype='image/png',
+                                      url=f'https://example.org/{n}.png') for n in range(20)]
+    plain_workspace.download_files(files, max_workers=4)
+    # one session (connection pool) for all downloads
+    assert len(sessions) == 1
+    for n in range(20):
+        f = next(plain_workspace.find_files(ID=f'IMG_{n}'))
+        assert f.local_filename == f'IMG/IMG_{n}.png'
+        assert Path(plain_workspace.directory, f.local_filename).read_text() == f'https://example.org/{n}.png'
+    # failures do not prevent the other files from being updated
+    files = [plain_workspace.add_file('IMG2', file_id='IMG2_0', page_id='PHYS_0', mimetype='image/png',
+                                      url='https://example.org/missing.png'),
+             plain_workspace.add_file('IMG2', file_id='IMG2_1', page_id='PHYS_1', mimetype='image/png',
+                                      url='https://example.org/1.png')]
+    with pytest.raises(ConnectionError):
+        plain_workspace.download_files(files)
+    assert not next(plain_workspace.find_files(ID='IMG2_0')).local_filename
+    assert next(plain_workspace.find_files(ID='IMG2_1')).local_filename == 'IMG2/IMG2_1.png'
+
+
 def test_save_image_file_invalid_mimetype_raises_exception(plain_workspace):
     img = Image.new('RGB', (1000, 1000))
 
@@ -460,6 +524,27 @@ def test_resolve_image_exif(workspace_kant_aufklaerung):
     assert exif.width == 1457
 
 
+def test_resolve_image_exif_cache(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_EXIF_CACHE', 'true')
+    ws = Workspace(plain_workspace.resolver, plain_workspace.directory)
+    img_path = ws.save_image_file(Image.new('L', (200, 100)), 'IMG_1', 'IMG', 'PHYS_1', 'image/png')
+    assert ws.resolve_image_exif(img_path).width == 200
+    assert len(ws.exif_cache) == 1
+    # cached entry is used as long as the file is unchanged
+    with monkeypatch.context() as m:
+        m.setattr('ocrd.workspace.probe_image', None)
+        assert ws.resolve_image_exif(img_path).height == 100
+        ws.save_mets()
+        assert Path(ws.mets_target + '.exif.json').exists()
+        # persisted with the workspace
+        ws = Workspace(plain_workspace.resolver, plain_workspace.directory)
+        assert ws.resolve_image_exif(img_path).width == 200
+    # invalidated when the file changes
+    Image.new('L', (300, 100)).save(ws.resolve_path(img_path))
+    utime(ws.resolve_path(img_path), ns=(0, 0))
+    assert ws.resolve_image_exif(img_path).width == 300
+
+
 def test_resolve_image_as_pil(workspace_kant_aufklaerung):
     img = workspace_kant_aufklaerung._resolve_image_as_pil('OCR-D-IMG/INPUT_0017.tif')
     assert img.width == 1457
@@ -602,6 +687,220 @@ def test_downsample_16bit_image(plain_workspace):
     assert pil_after.mode == 'L'
 
 
+def test_image_cache(plain_workspace, monkeypatch):
+    for n in (1, 2):
+        plain_workspace.save_image_file(Image.new('L', (100, 100)), f'IMG_{n}', 'IMG', f'PHYS_{n}', 'image/png')
+    cache = plain_workspace.image_cache
+    first = plain_workspace._resolve_image_as_pil('IMG/IMG_1.png')
+    second = plain_workspace._resolve_image_as_pil('IMG/IMG_1.png')
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+    assert len(cache) == 1 and cache.nbytes == 100 * 100
+    # changes to the returned images do not affect the cache
+    second.paste(255, (0, 0, 10, 10))
+    assert first.getpixel((0, 0)) == 0
+    assert plain_workspace._resolve_image_as_pil('IMG/IMG_1.png').getpixel((0, 0)) == 0
+    # changed files are decoded again
+    plain_workspace.save_image_file(second, 'IMG_1', 'IMG', 'PHYS_1', 'image/png', force=True)
+    st = stat(join(plain_workspace.directory, 'IMG/IMG_1.png'))
+    utime(join(plain_workspace.directory, 'IMG/IMG_1.png'), ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert plain_workspace._resolve_image_as_pil('IMG/IMG_1.png').getpixel((0, 0)) == 255
+    # least recently used images are evicted
+    cache.max_bytes = 25000
+    plain_workspace._resolve_image_as_pil('IMG/IMG_2.png')
+    assert len(cache) == 2 and cache.stats['evictions'] == 1
+    plain_workspace.save_mets()
+    monkeypatch.setenv('OCRD_MAX_IMAGE_CACHE', '0')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    ws._resolve_image_as_pil('IMG/IMG_1.png')
+    assert len(ws.image_cache) == 0
+
+
+@pytest.mark.parametrize('mimetype', ['image/tiff', 'image/png', 'image/jpeg'])
+def test_resolve_image_region(plain_workspace, mimetype):
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200, 3), dtype=np.uint8)
+    plain_workspace.save_image_file(Image.fromarray(arr), 'IMG_1', 'IMG', 'PHYS_1', mimetype)
+    img_path = next(plain_workspace.mets.find_files(ID='IMG_1')).local_filename
+    full = np.array(plain_workspace._resolve_image_as_pil(img_path))
+    plain_workspace.image_cache.clear()
+    # uncompressed or sequentially decodable formats only decode the region, and are not cached
+    region = plain_workspace._resolve_image_as_pil(img_path, coords=[[20, 30], [120, 30], [120, 80], [20, 80]])
+    assert len(plain_workspace.image_cache) == (1 if mimetype == 'image/jpeg' else 0)
+    assert region.size == (100, 50)
+    assert np.array_equal(np.array(region), full[30:80, 20:120, ::-1])
+    # clipped to the image
+    region = plain_workspace._resolve_image_as_pil(img_path, coords=[[150, 250], [250, 350]])
+    assert region.size == (50, 50)
+    assert np.array_equal(np.array(region), full[250:, 150:, ::-1])
+
+
+def test_image_from_page_cache(plain_workspace):
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200), dtype=np.uint8)
+    img_path = plain_workspace.save_image_file(Image.fromarray(arr), 'IMG_1', 'IMG', 'PHYS_1', 'image/png')
+    page = PageType(imageFilename=img_path, imageWidth=200, imageHeight=300, orientation=5,
+                    Border=BorderType(Coords=CoordsType(points='10,10 150,10 150,250 10,250')))
+    cache = plain_workspace.image_cache
+    image1, coords1, _ = plain_workspace.image_from_page(page, 'PHYS_1')
+    assert coords1['features'] == ',cropped,deskewed'
+    hits = cache.hits
+    image2, coords2, _ = plain_workspace.image_from_page(page, 'PHYS_1')
+    assert cache.hits == hits + 1
+    assert np.array_equal(np.array(image1), np.array(image2))
+    assert np.array_equal(coords1['transform'], coords2['transform'])
+    assert coords1['transform'] is not coords2['transform']
+    # changes to the returned image do not affect the cache
+    image2.paste(0, (0, 0) + image2.size)
+    image3, _, _ = plain_workspace.image_from_page(page, 'PHYS_1')
+    assert np.array_equal(np.array(image1), np.array(image3))
+    # other arguments or changes to the page are derived anew
+    image4, _, _ = plain_workspace.image_from_page(page, 'PHYS_1', feature_filter='deskewed')
+    assert image4.size == (140, 240)
+    page.get_Border().get_Coords().set_points('0,0 100,0 100,100 0,100')
+    page.set_orientation(None)
+    image5, coords5, _ = plain_workspace.image_from_page(page, 'PHYS_1')
+    assert image5.size == (100, 100)
+    assert coords5['features'] == ',cropped'
+
+
+def test_images_from_segments(plain_workspace):
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200), dtype=np.uint8)
+    img_path = plain_workspace.save_image_file(Image.fromarray(arr), 'IMG_1', 'IMG', 'PHYS_1', 'image/png')
+    page = PageType(imageFilename=img_path, imageWidth=200, imageHeight=300)
+    page_image, page_coords, _ = plain_workspace.image_from_page(page, 'PHYS_1')
+    lines = [TextLineType(id='l%d' % i, Coords=CoordsType(points=points)) for i, points in enumerate([
+        '10,10 190,10 190,30 10,30',
+        '10,40 100,35 190,40 190,60 10,60',
+        '150,280 250,280 250,320 150,320', # exceeds the page
+    ])]
+    results = plain_workspace.images_from_segments(lines, page_image, page_coords, fill='white')
+    assert [image.size for image, _ in results] == [(180, 20), (180, 25), (100, 40)]
+    for line, (image, coords) in zip(lines, results):
+        # same as masking the full page
+        polygon = coordinates_of_segment(line, page_image, page_coords)
+        expected = crop_image(image_from_polygon(page_image, polygon, fill='white'), box=bbox_from_polygon(polygon))
+        assert np.array_equal(np.array(image), np.array(expected))
+        assert np.array_equal(coords['transform'],
+                              plain_workspace.image_from_segment(line, page_image, page_coords)[1]['transform'])
+
+
+def test_image_from_page_as_array(plain_workspace):
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200, 3), dtype=np.uint8)
+    img_path = plain_workspace.save_image_file(arr, 'IMG_1', 'IMG', 'PHYS_1', 'image/png')
+    assert np.array_equal(np.asarray(Image.open(img_path)), arr)
+    page = PageType(imageFilename=img_path, imageWidth=200, imageHeight=300, orientation=90,
+                    Border=BorderType(Coords=CoordsType(points='10,10 150,10 150,250 10,250')))
+    line = TextLineType(id='l1', Coords=CoordsType(points='20,20 140,20 140,60 20,60'))
+    page_image, page_coords, _ = plain_workspace.image_from_page(page, 'PHYS_1')
+    page_array, array_coords, _ = plain_workspace.image_from_page(page, 'PHYS_1', as_array=True)
+    assert isinstance(page_array, np.ndarray)
+    assert np.array_equal(page_array, np.asarray(page_image))
+    assert np.array_equal(array_coords['transform'], page_coords['transform'])
+    assert array_coords['features'] == page_coords['features'] == ',cropped,rotated-270'
+    line_image, _ = plain_workspace.image_from_segment(line, page_image, page_coords, fill='white')
+    line_array, _ = plain_workspace.image_from_segment(line, page_array, array_coords, fill='white')
+    assert np.array_equal(line_array, np.asarray(line_image))
+    plain_workspace.save_image_file(line_array, 'IMG_1_l1', 'IMG', 'PHYS_1', 'image/tiff')
+    assert np.array_equal(np.asarray(Image.open('IMG/IMG_1_l1.tif')), line_array)
+
+
+def test_save_image_file_encoding(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_IMAGE_ENCODING', 'OCR-D-BIN*:scratch,OCR-D-IMG:small,fast')
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200), dtype=np.uint8)
+    bilevel = Image.fromarray(arr > 128)
+    # scratch: uncompressed PNM, for modes PNM can represent
+    img_path = plain_workspace.save_image_file(bilevel, 'BIN_1', 'OCR-D-BIN-NRM', 'PHYS_1', 'image/png')
+    assert img_path == 'OCR-D-BIN-NRM/BIN_1.pnm'
+    assert next(plain_workspace.mets.find_files(ID='BIN_1')).mimetype == 'image/x-portable-anymap'
+    assert np.array_equal(np.asarray(Image.open(img_path)), arr > 128)
+    img_path = plain_workspace.save_image_file(np.dstack([arr] * 3), 'BIN_2', 'OCR-D-BIN', 'PHYS_1', 'image/png')
+    assert img_path == 'OCR-D-BIN/BIN_2.pnm'
+    assert np.array_equal(np.asarray(Image.open(img_path)), np.dstack([arr] * 3))
+    img_path = plain_workspace.save_image_file(Image.fromarray(arr).convert('LA'), 'BIN_3', 'OCR-D-BIN', 'PHYS_1', 'image/png')
+    assert img_path == 'OCR-D-BIN/BIN_3.png'
+    # small: Group4 for bilevel TIFF, deflate otherwise
+    img_path = plain_workspace.save_image_file(bilevel, 'IMG_1', 'OCR-D-IMG', 'PHYS_1', 'image/tiff')
+    assert Image.open(img_path).info['compression'] == 'group4'
+    assert np.array_equal(np.asarray(Image.open(img_path)), arr > 128)
+    img_path = plain_workspace.save_image_file(arr, 'IMG_2', 'OCR-D-IMG', 'PHYS_1', 'image/tiff')
+    assert Image.open(img_path).info['compression'] == 'tiff_adobe_deflate'
+    assert np.array_equal(np.asarray(Image.open(img_path)), arr)
+    # fast: LZW for any other fileGrp
+    img_path = plain_workspace.save_image_file(Image.fromarray(arr), 'OTHER_1', 'OCR-D-OTHER', 'PHYS_1', 'image/tiff')
+    assert Image.open(img_path).info['compression'] == 'tiff_lzw'
+    monkeypatch.setenv('OCRD_IMAGE_ENCODING', 'OCR-D-BIN:unknown')
+    with pytest.raises(ValueError, match='invalid value'):
+        plain_workspace.save_image_file(bilevel, 'BIN_4', 'OCR-D-BIN', 'PHYS_1', 'image/png')
+
+
+def test_no_chdir(plain_workspace, tmp_path_factory, monkeypatch):
+    # file access resolves paths against the workspace directory, regardless of the working directory
+    other_dir = tmp_path_factory.mktemp('other')
+    monkeypatch.chdir(other_dir)
+    def fail_chdir(*args):
+        raise AssertionError("working directory must not change")
+    monkeypatch.setattr('ocrd_utils.os.chdir', fail_chdir)
+    ws = plain_workspace
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200), dtype=np.uint8)
+    img_path = ws.save_image_file(Image.fromarray(arr), 'IMG_1', 'IMG', 'PHYS_1', 'image/png')
+    pcgts = page_from_file(ws.resolve_path(img_path))
+    pcgts.get_Page().imageFilename = img_path
+    ws.add_file('PAGE', file_id='PAGE_1', page_id='PHYS_1', mimetype=MIMETYPE_PAGE,
+                local_filename='PAGE/PAGE_1.xml', content=to_xml(pcgts))
+    assert ws.resolve_path('PAGE/PAGE_1.xml') == join(ws.directory, 'PAGE', 'PAGE_1.xml')
+    assert exists(join(ws.directory, 'PAGE', 'PAGE_1.xml'))
+    page_image, _, _ = ws.image_from_page(pcgts.get_Page(), 'PHYS_1')
+    assert np.array_equal(np.asarray(page_image), arr)
+    assert ws.resolve_image_exif(img_path).width == 200
+    # relative url
+    ws.add_file('URL', file_id='URL_1', page_id='PHYS_1', mimetype='image/png', url=img_path)
+    assert ws.download_file(next(ws.find_files(ID='URL_1'))).local_filename == 'URL/URL_1.png'
+    assert exists(join(ws.directory, 'URL', 'URL_1.png'))
+    ws.rename_file_group('IMG', 'IMG-RENAMED')
+    assert exists(join(ws.directory, 'IMG-RENAMED', 'IMG-RENAMED_1.png'))
+    assert parse(join(ws.directory, 'PAGE', 'PAGE_1.xml')).get_Page().imageFilename == 'IMG-RENAMED/IMG-RENAMED_1.png'
+    ws.remove_file('PAGE_1')
+    assert not exists(join(ws.directory, 'PAGE', 'PAGE_1.xml'))
+    ws.remove_file_group('URL', recursive=True)
+    assert not exists(join(ws.directory, 'URL'))
+    assert listdir(other_dir) == []
+
+
+def test_write_behind(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_WRITE_BEHIND', '2')
+    plain_workspace.save_mets()
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    assert ws.writer is not None
+    arr = np.random.default_rng(0).integers(0, 255, (300, 200), dtype=np.uint8)
+    image = Image.fromarray(arr)
+    for n in range(1, 6):
+        ws.save_image_file(image, f'IMG_{n}', 'IMG', f'PHYS_{n}', 'image/png')
+        ws.add_file('PAGE', file_id=f'PAGE_{n}', page_id=f'PHYS_{n}', mimetype=MIMETYPE_PAGE,
+                    local_filename=f'PAGE/PAGE_{n}.xml', content='<PcGts/>')
+    # registered immediately
+    assert len(ws.mets.find_all_files(fileGrp='IMG')) == 5
+    assert len(ws.mets.find_all_files(fileGrp='PAGE')) == 5
+    # later changes by the caller are not written
+    image.paste(0, (0, 0) + image.size)
+    # reading waits for the pending write
+    assert np.array_equal(np.asarray(ws._resolve_image_as_pil('IMG/IMG_1.png')), arr)
+    ws.save_mets()
+    assert len(ws.writer) == 0
+    for n in range(1, 6):
+        assert np.array_equal(np.asarray(Image.open(join(ws.directory, f'IMG/IMG_{n}.png'))), arr)
+        assert Path(ws.directory, f'PAGE/PAGE_{n}.xml').read_text() == '<PcGts/>'
+    # batches are written behind, too, after pending writes of the same file
+    ws.save_image_file(image, 'IMG_1', 'IMG', 'PHYS_1', 'image/png', force=True)
+    ws.add_files([{'file_grp': 'IMG', 'file_id': 'IMG_1', 'page_id': 'PHYS_1', 'mimetype': 'image/png',
+                   'local_filename': 'IMG/IMG_1.png', 'content': b'PNG'}], force=True)
+    ws.save_mets()
+    assert Path(ws.directory, 'IMG/IMG_1.png').read_bytes() == b'PNG'
+    # errors surface at the barrier, before the METS is written
+    Path(ws.directory, 'IMG', 'IMG_6.png').mkdir()
+    ws.save_image_file(image, 'IMG_6', 'IMG', 'PHYS_6', 'image/png')
+    with pytest.raises(IsADirectoryError):
+        ws.save_mets()
+    assert len(Workspace(Resolver(), directory=ws.directory).mets.find_all_files(fileGrp='IMG')) == 5
+
+
 def test_mets_permissions(plain_workspace):
     plain_workspace.save_mets()
     mets_path = join(plain_workspace.directory, 'mets.xml')
@@ -723,6 +1022,19 @@ def test_merge_force(plain_workspace, tmp_path):
     files = list(plain_workspace.find_files())
     assert len(files) == 1
 
+def test_merge_copy_files_parallel(tmp_path):
+    ws1 = Resolver().workspace_from_nothing(directory=tmp_path / 'ws1')
+    ws2 = Resolver().workspace_from_nothing(directory=tmp_path / 'ws2')
+    for n in range(20):
+        ws2.add_file('GRP', page_id=f'p{n}', mimetype='text/plain', file_id=f'f{n}', local_filename=f'GRP/sub{n % 3}/f{n}', content=f'ws2 {n}')
+    ws1.merge(ws2, max_workers=4, filegrp_mapping={'GRP': 'OTHER'})
+    assert len(list(ws1.find_files(file_grp='OTHER'))) == 20
+    for n in range(20):
+        assert Path(ws1.directory, f'GRP/sub{n % 3}/f{n}').read_text() == f'ws2 {n}'
+    with pytest.raises(FileExistsError, match='would overwrite'):
+        ws1.merge(ws2, force=True, filegrp_mapping={'GRP': 'OTHER'})
+    ws1.merge(ws2, force=True, overwrite=True, filegrp_mapping={'GRP': 'OTHER'})
+
 @pytest.fixture(name='workspace_metsDocumentID')
 def _fixture_metsDocumentID(tmp_path):
     resolver = Resolver()
@@ -740,5 +1052,65 @@ def test_agent_before_metsDocumentID(workspace_metsDocumentID):
     print(report.errors)
     assert report.is_valid
 
+def test_save_mets_journal(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_METS_JOURNAL', '5')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    journal = Path(ws.mets_target + '.journal')
+    ws.add_file('IMG', file_id='IMG_1', page_id='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    ws.add_file('IMG', file_id='IMG_2', page_id='PHYS_2', mimetype='image/tiff', local_filename='IMG/2.tif')
+    ws.save_mets()
+    # changes only in the journal
+    assert journal.exists()
+    assert not OcrdMets(filename=ws.mets_target).find_all_files()
+    # ... and replayed on load
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    assert [f.ID for f in ws.mets.find_files(pageId='PHYS_2')] == ['IMG_2']
+    next(ws.mets.find_files(ID='IMG_1')).url = 'http://example.org/1.tif'
+    ws.mets.remove_file('IMG_2')
+    ws.save_mets()
+    # incomplete last entry (e.g. after a crash) is ignored
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('["add_file", ["IMG"], {"ID": "IM')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    assert [(f.ID, f.url) for f in ws.mets.find_files()] == [('IMG_1', 'http://example.org/1.tif')]
+    # compaction once the threshold is reached
+    ws.mets.unique_identifier = 'foo'
+    ws.save_mets()
+    assert not journal.exists()
+    mets = OcrdMets(filename=ws.mets_target)
+    assert [(f.ID, f.url) for f in mets.find_files()] == [('IMG_1', 'http://example.org/1.tif')]
+    assert mets.unique_identifier == 'foo'
+
+def test_save_mets_journal_stale(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_METS_JOURNAL', '100')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    ws.add_file('IMG', file_id='IMG_1', page_id='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    ws.save_mets()
+    ws.save_mets(compact=True)
+    # journal left behind after the METS was written
+    Path(ws.mets_target + '.journal').write_text('{"size": 0, "mtime_ns": 0}\n["remove_file", ["IMG_1"], {}]\n')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    assert not Path(ws.mets_target + '.journal').exists()
+    assert [f.ID for f in ws.mets.find_files()] == ['IMG_1']
+
+def test_save_mets_index(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_METS_INDEX', 'true')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    ws.add_file('IMG', file_id='IMG_1', page_id='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    ws.save_mets()
+    index = OcrdMetsIndex(ws.mets_target).load()
+    assert [record[0] for record in index['files']] == ['IMG_1']
+    assert [f.pageId for f in ReadOnlyOcrdMets(filename=ws.mets_target).find_files()] == ['PHYS_1']
+
+def test_mets_backend_sqlite(plain_workspace, monkeypatch):
+    monkeypatch.setenv('OCRD_METS_BACKEND', 'sqlite')
+    ws = Workspace(Resolver(), directory=plain_workspace.directory)
+    assert isinstance(ws.mets, SqliteOcrdMets)
+    ws.add_file('IMG', file_id='IMG_1', page_id='PHYS_1', mimetype='image/tiff', local_filename='IMG/1.tif')
+    ws.save_mets()
+    assert [(f.ID, f.pageId) for f in OcrdMets(filename=ws.mets_target).find_files()] == [('IMG_1', 'PHYS_1')]
+    ws.reload_mets()
+    assert [f.local_filename for f in ws.mets.find_files(pageId='PHYS_1')] == ['IMG/1.tif']
+
 if __name__ == '__main__':
     main(__file__)
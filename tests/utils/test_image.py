@@ -1,6 +1,7 @@
-from pytest import main
+import numpy as np
+from pytest import main, mark
 from PIL import Image
-from ocrd_utils.image import rotate_image
+from ocrd_utils.image import crop_image, image_from_polygon, rotate_image, transpose_image
 
 def test_32bit_fill():
     img = Image.new('F', (200, 100), 1)
@@ -9,5 +10,27 @@ def test_32bit_fill():
 def test_max_image_pixels():
     assert Image.MAX_IMAGE_PIXELS == 40_000 ** 2
 
+@mark.parametrize('mode', ['1', 'L', 'RGB', 'RGBA'])
+def test_as_array(mode):
+    img = Image.fromarray(np.random.default_rng(0).integers(0, 255, (300, 200), dtype=np.uint8)).convert(mode)
+    arr = np.asarray(img)
+    polygon = np.array([[20, 10], [150, 30], [190, 250], [10, 200]])
+    for fill in ['background', 'white']:
+        for transparency in [False, True]:
+            result = image_from_polygon(arr, polygon, fill=fill, transparency=transparency)
+            assert isinstance(result, np.ndarray)
+            assert np.array_equal(result, np.asarray(image_from_polygon(img, polygon, fill=fill, transparency=transparency)))
+    for box in [(10, 20, 100, 200), (-10, -5, 50, 60), (150, 250, 260, 330)]:
+        assert np.array_equal(crop_image(arr, box=box), np.asarray(crop_image(img, box=box)))
+    assert np.array_equal(crop_image(img, box=(10, 20, 100, 200), as_array=True), np.asarray(crop_image(img, box=(10, 20, 100, 200))))
+    for method in [Image.FLIP_LEFT_RIGHT, Image.ROTATE_90, Image.ROTATE_270, Image.TRANSVERSE]:
+        assert np.array_equal(transpose_image(arr, method), np.asarray(transpose_image(img, method)))
+    for angle in [90, 1.5, -7.3]:
+        rotated = rotate_image(arr, angle, fill='background', transparency=True)
+        expected = np.asarray(rotate_image(img, angle, fill='background', transparency=True))
+        assert rotated.shape == expected.shape
+        # nearest neighbour sampling can differ at pixel boundaries
+        assert np.mean(rotated != expected) < 0.02
+
 if __name__ == '__main__':
     main([__file__])